@@ -0,0 +1,94 @@
+"""
+Micro-benchmark: vectorized CSV export (core.csv_export) against the former per-row csv.DictWriter path.
+
+    uv run python -m benchmarks.bench_csv_export [--pixels 2048] [--frames 100] [--precision 4]
+
+Exits with status 1 when the single-spectrum speedup is below --min-speedup.
+"""
+from core.csv_export import export_spectrum, export_run_wide
+from core.run_output import RunOutput
+from core.run_reader import open_run
+
+from pathlib import Path
+import argparse
+import csv
+import logging
+import sys
+import tempfile
+import time
+import numpy as np
+
+ENCODING = "utf-8"
+
+
+def dictwriter_spectrum(path, wavelength, intensity) -> None:
+    """
+    former RunOutput.save_spectrum
+    """
+    with open(path, 'w', encoding=ENCODING, newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=["wavelength", "intensity"])
+        writer.writeheader()
+        for w, i in zip(wavelength, intensity):
+            writer.writerow({"wavelength": w, "intensity": i})
+
+
+def dictwriter_wide(path, wavelength, spectra: np.ndarray, labels: list[str]) -> None:
+    with open(path, 'w', encoding=ENCODING, newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=["wavelength"] + labels)
+        writer.writeheader()
+        for pixel, w in enumerate(wavelength):
+            row = {"wavelength": w}
+            row.update(zip(labels, spectra[:, pixel]))
+            writer.writerow(row)
+
+
+def best_of(func, repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark CSV export of spectra")
+    parser.add_argument("--pixels", type=int, default=2048)
+    parser.add_argument("--frames", type=int, default=100, help="frames in the wide (whole run) export")
+    parser.add_argument("--precision", type=int, default=4, help="decimals")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--min-speedup", type=float, default=10.0)
+    args = parser.parse_args(argv)
+    logging.disable(logging.INFO)
+
+    rng = np.random.default_rng(0)
+    wavelength = np.linspace(200.0, 1100.0, args.pixels) + rng.normal(0, 1e-3, args.pixels)
+    spectra = rng.uniform(0, 65535, (args.frames, args.pixels))
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        legacy = best_of(lambda: dictwriter_spectrum(tmp / "legacy.csv", wavelength, spectra[0]), args.repeat)
+        fast = best_of(lambda: export_spectrum(tmp / "fast.csv", wavelength, spectra[0], args.precision), args.repeat)
+        speedup = legacy / fast
+        print(f"spectrum ({args.pixels} px):  DictWriter {legacy * 1e3:8.2f} ms, "
+              f"vectorized {fast * 1e3:8.2f} ms, x{speedup:.1f}")
+
+        run_output = RunOutput(tmp, name="bench")
+        for index, spectrum in enumerate(spectra):
+            run_output.append_frame(float(index), wavelength, spectrum)
+        run = open_run(run_output.frames_path)
+        labels = [f"{setpoint:.1f}K" for setpoint in run.setpoints]
+        repeat = max(args.repeat // 10, 1)
+        legacy_wide = best_of(lambda: dictwriter_wide(tmp / "legacy_wide.csv", wavelength, spectra, labels), repeat)
+        fast_wide = best_of(lambda: export_run_wide(run, tmp / "fast_wide.csv", args.precision), repeat)
+        print(f"run ({args.frames} x {args.pixels}): DictWriter {legacy_wide * 1e3:8.2f} ms, "
+              f"vectorized {fast_wide * 1e3:8.2f} ms, x{legacy_wide / fast_wide:.1f}")
+
+        # same numbers as the legacy file at the chosen precision
+        reference = np.loadtxt(tmp / "legacy.csv", delimiter=",", skiprows=1)
+        exported = np.loadtxt(tmp / "fast.csv", delimiter=",", skiprows=1)
+        assert np.allclose(reference, exported, rtol=0, atol=0.5 * 10.0 ** -args.precision + 1e-9)
+    return 0 if speedup >= args.min_speedup else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,310 @@
+"""
+PID / heater range auto-tuning from recorded temperature logs (core.temperature_log format).
+
+Every setpoint step in the logs is fitted with a first-order-plus-dead-time plant
+    y[k+1] = a*y[k] + b*u[k-d] + c      (u: heater power as fraction of the HIGH range, d: dead time)
+with one batched least-squares solve over all steps per candidate dead time. Steps are grouped into temperature bands; each band gets SIMC PI gains
+converted to Model335 units and the smallest heater range with enough power headroom. Every band is then
+validated in a closed-loop simulation of its fitted plant before the table may be used on hardware.
+
+    uv run python -m core.autotune <temperature_log_dir> [...] -o tuning.json
+"""
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Optional
+import argparse
+import json
+import logging
+import numpy as np
+from core.temperature_log import load_temperature_log
+
+ENCODING = "utf-8"
+RANGE_SCALE = {"LOW": 0.01, "MEDIUM": 0.1, "HIGH": 1.0} # Model335 ranges are power decades of HIGH
+RANGE_CODES = {1: "LOW", 2: "MEDIUM", 3: "HIGH"} # Model335.HeaterRange values
+P_LIMITS = (0.1, 1000.0)
+I_LIMITS = (0.1, 1000.0)
+
+
+@dataclass
+class StepModel:
+    setpoint: float
+    gain: float # K per unit power fraction of HIGH
+    tau: float # s
+    dead_time: float # s
+    offset: float # K, temperature with heater off
+    rms_error: float # K, one-step prediction error
+
+
+@dataclass
+class TuningEntry:
+    lower: float # K, inclusive
+    upper: float # K, exclusive
+    heater_range: str
+    P: float
+    I: float
+    D: float
+    gain: float
+    tau: float
+    dead_time: float
+    offset: float
+    validated: bool = False
+    settling_time: float = float("nan")
+    overshoot: float = float("nan")
+
+
+def _heater_power(log: np.ndarray, output: int) -> np.ndarray:
+    scale = np.array([RANGE_SCALE.get(RANGE_CODES.get(int(code), ""), 0.0) for code in range(4)])
+    codes = np.clip(log["heater_range"].astype(int), 0, 3)
+    return log[f"heater_output_{output}"] / 100.0 * scale[codes]
+
+
+def extract_steps(log: np.ndarray, output: int = 1, min_step: float = 1.0, min_duration: float = 60.0):
+    """
+    split a log at setpoint changes of at least min_step K; returns a list of (t, y, u, setpoint)
+    """
+    setpoint = log["setpoint"]
+    valid = np.isfinite(setpoint) & np.isfinite(log["temperature_A"]) & (log["heater_range"] > 0)
+    change = np.flatnonzero(np.abs(np.diff(setpoint)) >= min_step) + 1
+    bounds = np.concatenate((change, [len(log)])) # the segment before the first change has no step to fit
+    power = _heater_power(log, output)
+    steps = []
+    for start, stop in zip(bounds[:-1], bounds[1:]):
+        segment = slice(start, stop)
+        if not valid[segment].all():
+            continue
+        t = log["timestamp"][segment]
+        if t.size < 10 or t[-1] - t[0] < min_duration:
+            continue
+        steps.append((t - t[0], log["temperature_A"][segment], power[segment], float(setpoint[start])))
+    return steps
+
+
+def _block_mean(t: np.ndarray, values: np.ndarray, dt: float, length: int) -> np.ndarray:
+    """
+    average samples into bins of dt starting at t = 0 (empty bins are interpolated)
+    """
+    bins = (t / dt).astype(int)
+    keep = bins < length
+    counts = np.bincount(bins[keep], minlength=length)
+    sums = np.bincount(bins[keep], weights=values[keep], minlength=length)
+    filled = counts > 0
+    centers = np.arange(length) * dt
+    return np.interp(centers, centers[filled], sums[filled] / counts[filled])
+
+
+def fit_steps(steps, dt: Optional[float] = None, max_dead_time: float = 120.0) -> list[StepModel]:
+    """
+    fit all steps at once: bin to a common dt (the median sample interval by default), stack padded regressors and
+    solve the batched normal equations of every step for each candidate dead time; per step the dead time with the
+    smallest one-step prediction error wins. Steps that cannot be identified (constant heater output) get NaN
+    parameters and are left out by build_table.
+    """
+    if not steps:
+        return []
+    if dt is None:
+        dt = float(np.median(np.concatenate([np.diff(t) for t, _, _, _ in steps])))
+    lengths = np.array([int(t[-1] / dt) for t, _, _, _ in steps])
+    length = int(lengths.max())
+    n_steps = len(steps)
+    Y = np.zeros((n_steps, length))
+    U = np.zeros((n_steps, length))
+    for i, (t, y, u, _) in enumerate(steps):
+        Y[i, :lengths[i]] = _block_mean(t, y, dt, lengths[i])
+        U[i, :lengths[i]] = _block_mean(t, u, dt, lengths[i])
+    # centering each step keeps the normal equations well conditioned (a is close to 1)
+    samples = np.arange(length)
+    valid = samples[None, :] < lengths[:, None]
+    y_mean = (Y * valid).sum(axis=1) / lengths
+    Yc = (Y - y_mean[:, None]) * valid
+    target = Yc[:, 1:]
+
+    delays = np.arange(int(max_dead_time / dt) + 1)
+    theta = np.zeros((n_steps, 3))
+    rms = np.full(n_steps, np.inf)
+    best = np.zeros(n_steps, dtype=int)
+    for d in delays:
+        U_delayed = np.zeros_like(U)
+        U_delayed[:, d:] = U[:, :length - d]
+        # rows (y[k], u[k - d], 1) -> y[k + 1], only where both ends and the delayed input exist
+        weight = ((samples[None, :-1] >= d) & (samples[None, 1:] < lengths[:, None])).astype(np.float64)
+        X = np.stack([Yc[:, :-1], U_delayed[:, :-1], np.ones_like(target)], axis=2) # (steps, samples, 3)
+        XtX = np.einsum("snk,snl,sn->skl", X, X, weight)
+        Xty = np.einsum("snk,sn,sn->sk", X, target, weight)
+        # a step with constant heater output cannot separate gain from offset: rank deficient, skipped
+        identifiable = np.linalg.matrix_rank(XtX, rtol=1e-10) == 3
+        theta_d = np.einsum("skl,sl->sk", np.linalg.pinv(XtX), Xty)
+        residual = (np.einsum("snk,sk->sn", X, theta_d) - target) * weight
+        rms_d = np.sqrt((residual ** 2).sum(axis=1) / np.maximum(weight.sum(axis=1), 1))
+        better = identifiable & (rms_d < rms)
+        theta[better], rms[better], best[better] = theta_d[better], rms_d[better], d
+
+    fitted = np.isfinite(rms)
+    if not fitted.all():
+        logging.info(f"Skipped {np.count_nonzero(~fitted)} step(s) without heater output variation")
+    a = np.clip(theta[:, 0], 1e-6, 1 - 1e-9)
+    b, c = theta[:, 1], theta[:, 2]
+    tau = np.where(fitted, -dt / np.log(a), np.nan)
+    gain = np.where(fitted, b / (1 - a), np.nan)
+    offset = np.where(fitted, c / (1 - a) + y_mean, np.nan)
+    dead_time = np.maximum(best * dt, dt)
+    return [
+        StepModel(setpoint=steps[i][3], gain=float(gain[i]), tau=float(tau[i]), dead_time=float(dead_time[i]),
+                  offset=float(offset[i]), rms_error=float(rms[i]))
+        for i in range(n_steps)
+    ]
+
+
+def simc_pid(model_gain, tau, dead_time, heater_range: str, tau_c=None):
+    """
+    SIMC gain with the lambda/IMC integral time Ti = tau, in Model335 units: P in % of range per K, I = 1000 / Ti[s],
+    D = 0. Ti = tau cancels the plant pole, so setpoint steps do not overshoot (SIMC's shorter Ti trades that for
+    disturbance rejection). tau_c defaults to 3 x dead time (smooth rather than tight: overshooting a calibration
+    point costs a re-settle)
+    """
+    tau_c = 3 * dead_time if tau_c is None else tau_c
+    Kc = tau / (model_gain * (tau_c + dead_time)) # power fraction of HIGH per K
+    Ti = tau
+    P = np.clip(Kc * 100.0 / RANGE_SCALE[heater_range], *P_LIMITS)
+    I = np.clip(1000.0 / Ti, *I_LIMITS)
+    return float(P), float(I), 0.0
+
+
+def choose_range(setpoint: float, gain: float, offset: float, headroom: float = 0.6) -> str:
+    """
+    smallest range whose power holds the setpoint at <= headroom of the range
+    """
+    required = (setpoint - offset) / gain if gain > 0 else np.inf
+    for name in ("LOW", "MEDIUM", "HIGH"):
+        if required <= headroom * RANGE_SCALE[name]:
+            return name
+    return "HIGH"
+
+
+def build_table(models: list[StepModel], band_width: float = 50.0, max_rms: float = 0.5) -> list[TuningEntry]:
+    usable = [m for m in models if m.gain > 0 and np.isfinite(m.tau) and m.rms_error <= max_rms]
+    if not usable:
+        return []
+    setpoints = np.array([m.setpoint for m in usable])
+    params = np.array([[m.gain, m.tau, m.dead_time, m.offset] for m in usable])
+    band = np.floor(setpoints / band_width).astype(int)
+    table = []
+    for index in np.unique(band):
+        gain, tau, dead_time, offset = np.median(params[band == index], axis=0) # robust against single bad fits
+        lower, upper = index * band_width, (index + 1) * band_width
+        heater_range = choose_range(upper, gain, offset)
+        P, I, D = simc_pid(gain, tau, dead_time, heater_range)
+        table.append(TuningEntry(lower=float(lower), upper=float(upper), heater_range=heater_range, P=P, I=I, D=D,
+                                 gain=float(gain), tau=float(tau), dead_time=float(dead_time), offset=float(offset)))
+    return table
+
+
+def simulate(table: list[TuningEntry], step: float = 10.0, duration: float = 3600.0, dt: float = 1.0) -> tuple[np.ndarray, np.ndarray]:
+    """
+    closed-loop step response of every band at once: plant = fitted FOPDT, controller = Model335 PI with
+    output clamped to 0-100% of the range and conditional integration (anti-windup).
+    returns (time, temperatures[bands, samples]) for a step from band center - step to band center
+    """
+    gain = np.array([e.gain for e in table])
+    tau = np.array([e.tau for e in table])
+    offset = np.array([e.offset for e in table])
+    scale = np.array([RANGE_SCALE[e.heater_range] for e in table])
+    P = np.array([e.P for e in table])
+    Ti = 1000.0 / np.array([e.I for e in table])
+    target = np.array([(e.lower + e.upper) / 2 for e in table])
+    delay = np.maximum(np.round(np.array([e.dead_time for e in table]) / dt).astype(int), 1)
+
+    n_samples = int(duration / dt)
+    a = np.exp(-dt / tau)
+    start = target - step
+    power_start = np.clip((start - offset) / gain, 0, scale) # heater power that holds the start temperature
+    history = np.repeat(power_start[:, None], delay.max() + 1, axis=1) # ring of applied power for dead time
+    y = start.copy()
+    integral = (power_start / scale * 100.0) / P # integral state reproducing the start output
+    trajectory = np.empty((len(table), n_samples))
+    rows = np.arange(len(table))
+    for k in range(n_samples):
+        error = target - y
+        output = P * (error + integral)
+        winding_up = ((output >= 100.0) & (error > 0)) | ((output <= 0.0) & (error < 0))
+        integral = np.where(winding_up, integral, integral + error * dt / Ti)
+        power = np.clip(output, 0.0, 100.0) / 100.0 * scale
+        history[:, k % history.shape[1]] = power
+        delayed = history[rows, (k - delay) % history.shape[1]]
+        y = a * y + (1 - a) * (offset + gain * delayed)
+        trajectory[:, k] = y
+    return np.arange(n_samples) * dt, trajectory
+
+
+def validate(table: list[TuningEntry], step: float = 10.0, tolerance: float = 0.05, max_overshoot: float = 0.1,
+             max_settling_time: float = 1800.0) -> list[TuningEntry]:
+    """
+    mark entries validated when the simulated step settles within tolerance (K) in time and overshoots the target
+    by at most max_overshoot (K)
+    """
+    if not table:
+        return table
+    time, trajectory = simulate(table, step=step, duration=2 * max_settling_time)
+    target = np.array([(e.lower + e.upper) / 2 for e in table])
+    error = np.abs(trajectory - target[:, None])
+    outside = error > tolerance
+    # settling time: after the last sample outside the tolerance band
+    last_outside = np.where(outside.any(axis=1), outside.shape[1] - 1 - np.argmax(outside[:, ::-1], axis=1), -1)
+    settled = last_outside < outside.shape[1] - 1
+    settling_time = np.where(settled, time[np.minimum(last_outside + 1, len(time) - 1)], np.inf)
+    overshoot = np.maximum((trajectory - target[:, None]).max(axis=1), 0.0)
+    for entry, t_settle, over in zip(table, settling_time, overshoot):
+        entry.settling_time = float(t_settle)
+        entry.overshoot = float(over)
+        entry.validated = bool(np.isfinite(t_settle) and t_settle <= max_settling_time and over <= max_overshoot)
+    return table
+
+
+class TuningTable:
+    def __init__(self, entries: list[TuningEntry]):
+        self.entries = sorted(entries, key=lambda e: e.lower)
+
+
+    def lookup(self, setpoint: float, validated_only: bool = True) -> Optional[TuningEntry]:
+        for entry in self.entries:
+            if entry.lower <= setpoint < entry.upper and (entry.validated or not validated_only):
+                return entry
+        return None
+
+
+    def save(self, path) -> None:
+        with open(path, "w", encoding=ENCODING) as f:
+            json.dump([asdict(entry) for entry in self.entries], f, indent=2)
+
+
+    @classmethod
+    def load(cls, path) -> "TuningTable":
+        with open(path, encoding=ENCODING) as f:
+            return cls([TuningEntry(**entry) for entry in json.load(f)])
+
+
+def tune(log_dirs, output: int = 1, band_width: float = 50.0) -> TuningTable:
+    steps = []
+    for log_dir in log_dirs:
+        steps += extract_steps(load_temperature_log(log_dir), output=output)
+    models = fit_steps(steps)
+    logging.info(f"Fitted {len(models)} step responses")
+    return TuningTable(validate(build_table(models, band_width=band_width)))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fit heater range / PID table from temperature logs")
+    parser.add_argument("logs", nargs="+", help="temperature log directories (<name>_temperature_log)")
+    parser.add_argument("-o", "--output", default="tuning.json", help="output table (json)")
+    parser.add_argument("--heater-output", type=int, default=1, choices=[1, 2])
+    parser.add_argument("--band-width", type=float, default=50.0, help="temperature band width [K]")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    table = tune([Path(p) for p in args.logs], output=args.heater_output, band_width=args.band_width)
+    for e in table.entries:
+        logging.info(f"{e.lower:.0f}-{e.upper:.0f} K: {e.heater_range}, P={e.P:.1f}, I={e.I:.1f}, "
+                     f"settling {e.settling_time:.0f} s, overshoot {e.overshoot:.2f} K, validated={e.validated}")
+    table.save(args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+"""
+DLT calibration model: temperature as a polynomial of one spectral observable.
+
+The observable is either the centroid of a band (or of the whole frame) or the ratio of two band integrals. Band
+limits are stored in nm, so a model fitted on one run can be bound to the wavelength axis of any connected
+spectrometer; after binding, inference is two dot products per spectrum and batches are one matrix product.
+
+    model = fit_calibration(open_run("run.csv"), Observable("ratio", [(600, 650), (650, 700)]), degree=3)
+    model.save("dlt_model.npz")
+    temperature, sigma = load_calibration("dlt_model.npz").bind(wavelength).predict(spectra)
+
+    uv run python -m core.calibration <run> --ratio 600 650 650 700 -o dlt_model.npz [--validate <other run>]
+"""
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional
+import argparse
+import json
+import logging
+import numpy as np
+from core.spectral_axis import SpectralAxis
+from core.run_reader import open_run
+
+FORMAT_VERSION = 1
+OBSERVABLE_KINDS = ("centroid", "ratio")
+RANGE_TOLERANCE = 1e-6 # of x_scale, single spectra and batches round the observable differently
+
+
+@dataclass
+class Observable:
+    kind: str # "centroid": [band] or [] for the whole frame, "ratio": [numerator band, denominator band]
+    bands: list[tuple[float, float]] = field(default_factory=list) # nm
+
+
+    def __post_init__(self):
+        if self.kind not in OBSERVABLE_KINDS:
+            raise ValueError(f"Unknown observable {self.kind}, expected one of {OBSERVABLE_KINDS}")
+        expected = (0, 1) if self.kind == "centroid" else (2,)
+        if len(self.bands) not in expected:
+            raise ValueError(f"{self.kind} observable needs {' or '.join(map(str, expected))} bands")
+        self.bands = [(float(lower), float(upper)) for lower, upper in self.bands]
+
+
+    def describe(self) -> str:
+        bands = " / ".join(f"{lower:g}-{upper:g} nm" for lower, upper in self.bands) or "full frame"
+        return f"{self.kind} {bands}"
+
+
+class BoundObservable:
+    """
+    observable with pixel ranges and weights precomputed for one wavelength axis
+    """
+    def __init__(self, observable: Observable, wavelength: np.ndarray):
+        self.observable = observable
+        axis = SpectralAxis(wavelength)
+        if observable.kind == "centroid" and not observable.bands:
+            self._slices = [slice(0, len(axis))]
+            self._weights = [axis.weights]
+            self._weighted_wavelength = [axis.weighted_wavelength]
+        else:
+            bands = [axis.add_band(f"band{i}", lower, upper) for i, (lower, upper) in enumerate(observable.bands)]
+            self._slices = [slice(band.start, band.stop) for band in bands]
+            self._weights = [band.weights for band in bands]
+            self._weighted_wavelength = [band.weighted_wavelength for band in bands]
+        self.n_pixels = len(axis)
+
+
+    def __call__(self, spectra: np.ndarray) -> np.ndarray:
+        """
+        spectra (n, pixels) or (pixels,) -> observable (n,) or scalar array
+        """
+        spectra = np.asarray(spectra, dtype=np.float64)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            if self.observable.kind == "centroid":
+                segment = spectra[..., self._slices[0]]
+                return (segment @ self._weighted_wavelength[0]) / (segment @ self._weights[0])
+            numerator = spectra[..., self._slices[0]] @ self._weights[0]
+            denominator = spectra[..., self._slices[1]] @ self._weights[1]
+            return numerator / denominator
+
+
+class CalibrationModel:
+    """
+    T = polyval(coefficients, (x - x_center) / x_scale), x = observable.
+    sigma combines the coefficient covariance with the residual scatter of the fit (prediction interval).
+    Observables outside the calibrated range (widened by RANGE_TOLERANCE for rounding) give NaN (no extrapolation).
+    """
+    def __init__(self, observable: Observable, coefficients, covariance, residual_std: float,
+                 x_center: float, x_scale: float, x_range: tuple[float, float], metadata: Optional[dict] = None):
+        self.observable = observable
+        self.coefficients = np.asarray(coefficients, dtype=np.float64) # highest order first
+        self.covariance = np.asarray(covariance, dtype=np.float64)
+        self.residual_std = float(residual_std)
+        self.x_center = float(x_center)
+        self.x_scale = float(x_scale)
+        self.x_range = (float(x_range[0]), float(x_range[1]))
+        self.metadata = {} if metadata is None else metadata
+        self._bound = None
+
+
+    @property
+    def degree(self) -> int:
+        return self.coefficients.size - 1
+
+
+    def bind(self, wavelength: np.ndarray) -> "CalibrationModel":
+        self._bound = BoundObservable(self.observable, wavelength)
+        return self
+
+
+    def predict_observable(self, x) -> tuple[np.ndarray, np.ndarray]:
+        x = np.asarray(x, dtype=np.float64)
+        u = (x - self.x_center) / self.x_scale
+        powers = u[..., None] ** np.arange(self.degree, -1, -1) # Vandermonde rows, highest order first
+        temperature = powers @ self.coefficients
+        variance = np.einsum("...i,ij,...j->...", powers, self.covariance, powers) + self.residual_std ** 2
+        tolerance = RANGE_TOLERANCE * self.x_scale
+        outside = ~((x >= self.x_range[0] - tolerance) & (x <= self.x_range[1] + tolerance))
+        temperature = np.where(outside, np.nan, temperature)
+        sigma = np.where(outside, np.nan, np.sqrt(variance))
+        return temperature, sigma
+
+
+    def predict(self, spectra) -> tuple[np.ndarray, np.ndarray]:
+        """
+        (temperature, sigma) in K for spectra (n, pixels) or one spectrum (pixels,), dark-corrected
+        """
+        if self._bound is None:
+            raise RuntimeError("Model not bound to a wavelength axis. Call bind() first.")
+        return self.predict_observable(self._bound(spectra))
+
+
+    def save(self, path) -> Path:
+        path = Path(path)
+        metadata = dict(self.metadata, format_version=FORMAT_VERSION, kind=self.observable.kind,
+                        residual_std=self.residual_std, x_center=self.x_center, x_scale=self.x_scale,
+                        x_range=list(self.x_range))
+        with open(path, "wb") as f:
+            np.savez_compressed(f, coefficients=self.coefficients, covariance=self.covariance,
+                                bands=np.asarray(self.observable.bands, dtype=np.float64).reshape(-1, 2),
+                                metadata=np.array(json.dumps(metadata)))
+        return path
+
+
+def load_calibration(path) -> CalibrationModel:
+    with np.load(path, allow_pickle=False) as data:
+        metadata = json.loads(str(data["metadata"]))
+        if metadata.pop("format_version", None) != FORMAT_VERSION:
+            raise ValueError(f"Unsupported calibration model version in {path}")
+        observable = Observable(metadata.pop("kind"), [tuple(band) for band in data["bands"]])
+        return CalibrationModel(
+            observable,
+            data["coefficients"],
+            data["covariance"],
+            metadata.pop("residual_std"),
+            metadata.pop("x_center"),
+            metadata.pop("x_scale"),
+            tuple(metadata.pop("x_range")),
+            metadata,
+        )
+
+
+def run_observables(run, observable: Observable, rows=None, chunk_size: int = 256) -> np.ndarray:
+    """
+    observable of every selected frame of a core.run_reader.CalibrationRun, read in chunks
+    """
+    bound = BoundObservable(observable, np.asarray(run.wavelength))
+    rows = np.arange(len(run)) if rows is None else np.asarray(rows)
+    values = np.empty(rows.size)
+    position = 0
+    for _, block in run.iter_chunks(chunk_size, rows):
+        values[position:position + len(block)] = bound(block)
+        position += len(block)
+    return values
+
+
+def fit_calibration(run, observable: Observable, degree: int = 3, sensor: str = "temperature_A",
+                    rows=None) -> CalibrationModel:
+    x = run_observables(run, observable, rows)
+    temperature = np.asarray(run.index[sensor] if rows is None else run.index[sensor][rows], dtype=np.float64)
+    usable = np.isfinite(x) & np.isfinite(temperature)
+    x, temperature = x[usable], temperature[usable]
+    if x.size <= degree + 1:
+        raise ValueError(f"{x.size} usable frames are not enough for a degree {degree} fit")
+    x_center = float(np.mean(x))
+    x_scale = float(np.std(x)) or 1.0
+    powers = ((x - x_center) / x_scale)[:, None] ** np.arange(degree, -1, -1)
+    coefficients, _, _, _ = np.linalg.lstsq(powers, temperature, rcond=None)
+    residual = temperature - powers @ coefficients
+    dof = x.size - (degree + 1)
+    residual_std = float(np.sqrt(residual @ residual / dof))
+    covariance = np.linalg.inv(powers.T @ powers) * residual_std ** 2
+    metadata = {
+        "run": run.name,
+        "sensor": sensor,
+        "observable": observable.describe(),
+        "frames": int(x.size),
+        "temperature_range": [float(temperature.min()), float(temperature.max())],
+    }
+    logging.info(f"Calibration fitted on {x.size} frames: {observable.describe()}, degree {degree}, "
+                 f"residual {residual_std:.3f} K")
+    return CalibrationModel(observable, coefficients, covariance, residual_std, x_center, x_scale,
+                            (float(x.min()), float(x.max())), metadata)
+
+
+def validate(model: CalibrationModel, run, sensor: Optional[str] = None, rows=None) -> dict:
+    """
+    compare predictions with the Model335 sensor temperatures recorded in a run
+    """
+    sensor = model.metadata.get("sensor", "temperature_A") if sensor is None else sensor
+    x = run_observables(run, model.observable, rows)
+    reference = np.asarray(run.index[sensor] if rows is None else run.index[sensor][rows], dtype=np.float64)
+    predicted, sigma = model.predict_observable(x)
+    error = predicted - reference
+    valid = np.isfinite(error)
+    error, sigma = error[valid], sigma[valid]
+    if not error.size:
+        return {"frames": 0, "outside_range": int((~valid).sum())}
+    return {
+        "frames": int(error.size),
+        "outside_range": int((~valid).sum()),
+        "bias": float(error.mean()),
+        "rms": float(np.sqrt(np.mean(error ** 2))),
+        "max_abs": float(np.abs(error).max()),
+        "within_2_sigma": float(np.mean(np.abs(error) <= 2 * sigma)),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fit a DLT calibration model from a completed run")
+    parser.add_argument("run", help="run frames directory, summary .csv or folder with one run")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--centroid", nargs=2, type=float, metavar=("LOWER", "UPPER"), help="band centroid [nm]")
+    group.add_argument("--ratio", nargs=4, type=float, metavar=("L1", "U1", "L2", "U2"), help="band ratio [nm]")
+    parser.add_argument("--degree", type=int, default=3)
+    parser.add_argument("--sensor", default="temperature_A", choices=["temperature_A", "temperature_B"])
+    parser.add_argument("-o", "--output", default="dlt_model.npz")
+    parser.add_argument("--validate", nargs="*", default=[], help="other runs to validate the model against")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    if args.ratio is not None:
+        observable = Observable("ratio", [tuple(args.ratio[:2]), tuple(args.ratio[2:])])
+    elif args.centroid is not None:
+        observable = Observable("centroid", [tuple(args.centroid)])
+    else:
+        observable = Observable("centroid")
+    model = fit_calibration(open_run(args.run), observable, degree=args.degree, sensor=args.sensor)
+    model.save(args.output)
+    for path in [args.run] + args.validate:
+        logging.info(f"Validation against {path}: {validate(model, open_run(path))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Fast CSV export for consumers that still need text files.
+
+Whole columns are formatted at once: values are scaled to integers with a fixed number of decimals and turned into
+ASCII digits through a lookup table of 4-digit groups, so no Python object is created per value. Scaling rounds once
+more than printf does, so values within an ulp of a half-way point are rounded by Python's formatting instead. Non-finite
+or very large values fall back to printf-style formatting of the same precision.
+
+    write_csv("spectrum.csv", {"wavelength": wavelength, "intensity": intensity}, precision=4)
+    export_run_wide(open_run("path/to/<name>.csv"), "run_wide.csv")
+"""
+from pathlib import Path
+from typing import Optional
+import numpy as np
+
+ENCODING = "utf-8"
+DEFAULT_PRECISION = 4 # decimals
+MAX_SCALED = 2.0 ** 53 # above this the scaled float no longer holds an exact integer
+_GROUP = 10000
+_GROUP_DIGITS = np.array([[ord(c) for c in f"{i:04d}"] for i in range(_GROUP)], dtype=np.uint8)
+_PAD = 0 # placeholder byte, removed before writing
+
+
+def _format_printf(data: np.ndarray, precision: int, delimiter: str) -> bytes:
+    row = delimiter.join([f"%.{precision}f"] * data.shape[1]) + "\n"
+    return ((row * data.shape[0]) % tuple(data.ravel().tolist())).encode(ENCODING)
+
+
+def format_rows(data, precision: int = DEFAULT_PRECISION, delimiter: str = ",") -> bytes:
+    """
+    data (rows, columns) as CSV text, same output as "%.{precision}f" per value: the exact binary value is rounded
+    (exact ties to even) and negative values keep their sign when they round to zero ("-0.0000")
+    """
+    data = np.asarray(data, dtype=np.float64)
+    if data.ndim == 1:
+        data = data[:, None]
+    if data.size == 0:
+        return b""
+    magnitude = np.abs(data) * 10.0 ** precision
+    scaled = np.rint(magnitude)
+    if not np.isfinite(scaled).all() or scaled.max() >= MAX_SCALED:
+        return _format_printf(data, precision, delimiter)
+    # the product may have rounded onto or across the half-way point: let printf decide those few values
+    near_tie = np.abs(magnitude - np.floor(magnitude) - 0.5) <= magnitude * 2.0 ** -50
+    if near_tie.any():
+        scaled[near_tie] = [float(f"{value:.{precision}f}".replace(".", ""))
+                            for value in np.abs(data[near_tie]).tolist()]
+    scaled = scaled.astype(np.int64)
+    integer_part = scaled // 10 ** precision
+    n_int = len(str(int(integer_part.max())))
+    n_digits = n_int + precision
+    n_groups = -(-n_digits // 4)
+
+    # base-10000 groups, most significant first
+    groups = np.empty(data.shape + (n_groups,), dtype=np.int64)
+    rest = scaled
+    for g in range(n_groups - 1, -1, -1):
+        quotient = rest // _GROUP
+        groups[..., g] = rest - quotient * _GROUP
+        rest = quotient
+    digits = np.take(_GROUP_DIGITS, groups, axis=0).reshape(data.shape + (n_groups * 4,))[..., -n_digits:]
+
+    # field: sign, integer digits, ".", decimals, delimiter / newline
+    width = 1 + n_int + (1 + precision if precision else 0) + 1
+    chars = np.empty(data.shape + (width,), dtype=np.uint8)
+    chars[..., 0] = np.where(np.signbit(data), ord("-"), _PAD)
+    # leading zeros of the integer part are padding, its last digit is always kept
+    used = np.ones(integer_part.shape, dtype=np.intp)
+    for k in range(1, n_int):
+        used += integer_part >= 10 ** k
+    keep = (np.arange(n_int)[None, :] >= n_int - np.arange(n_int + 1)[:, None]).astype(np.uint8) # [used, position]
+    chars[..., 1:1 + n_int] = digits[..., :n_int] * np.take(keep, used, axis=0)
+    if precision:
+        chars[..., 1 + n_int] = ord(".")
+        chars[..., 2 + n_int:-1] = digits[..., n_int:]
+    chars[..., -1] = ord(delimiter)
+    chars[:, -1, -1] = ord("\n")
+    flat = chars.ravel()
+    return flat[flat != _PAD].tobytes()
+
+
+def write_csv(path, columns: dict, precision: int = DEFAULT_PRECISION, chunk_rows: int = 65536) -> Path:
+    """
+    columns: name -> 1D array (equal lengths), written in chunks of chunk_rows
+    """
+    path = Path(path)
+    data = np.column_stack([np.asarray(values, dtype=np.float64) for values in columns.values()])
+    with open(path, "wb") as f:
+        f.write((",".join(columns) + "\n").encode(ENCODING))
+        for start in range(0, data.shape[0], chunk_rows):
+            f.write(format_rows(data[start:start + chunk_rows], precision))
+    return path
+
+
+def export_spectrum(path, wavelength, intensity, precision: int = DEFAULT_PRECISION) -> Path:
+    return write_csv(path, {"wavelength": wavelength, "intensity": intensity}, precision)
+
+
+def export_run_wide(run, path, precision: int = DEFAULT_PRECISION, rows: Optional[np.ndarray] = None,
+                    chunk_pixels: int = 256) -> Path:
+    """
+    one CSV for a whole core.run_reader.CalibrationRun: a wavelength column and one intensity column per frame,
+    headed "<setpoint>K" ("<setpoint>K_<frame>" when a setpoint was recorded more than once).
+    frames are read in blocks of chunk_pixels wavelengths, so the run does not have to fit in memory.
+    """
+    path = Path(path)
+    rows = np.arange(len(run)) if rows is None else np.asarray(rows)
+    setpoints = run.setpoints[rows]
+    labels = [f"{setpoint:.1f}K" for setpoint in setpoints]
+    repeated = {label for label in labels if labels.count(label) > 1}
+    labels = [f"{label}_{row}" if label in repeated else label for label, row in zip(labels, rows)]
+    order = np.argsort(rows, kind="stable")
+    with open(path, "wb") as f:
+        f.write((",".join(["wavelength"] + labels) + "\n").encode(ENCODING))
+        for start in range(0, run.n_pixels, chunk_pixels):
+            stop = min(start + chunk_pixels, run.n_pixels)
+            block = np.empty((stop - start, rows.size + 1))
+            block[:, 0] = run.wavelength[start:stop]
+            # sorted frame access keeps reads sequential
+            block[:, 1 + order] = run.frames[rows[order], start:stop].T
+            f.write(format_rows(block, precision))
+    return path
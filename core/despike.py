@@ -0,0 +1,157 @@
+import numpy as np
+
+MAD_TO_SIGMA = 1.4826 # sigma of normal noise = 1.4826 * median absolute deviation
+
+
+class SpikeRejector:
+    """
+    Streaming cosmic-ray / hot-pixel rejection.
+    Each frame is compared with the per-pixel rolling median of the last `window` raw frames. Spikes only ever appear
+    in one frame, so they never dominate the median.
+
+    The noise is estimated from the frame-to-frame differences of the history, pooled over `neighbours` pixels on
+    either side: a per-pixel MAD of 5 frames is so noisy that a "6 sigma" limit is crossed by ~1 % of the pixels of
+    every spike-free frame, while (window - 1) x (2 neighbours + 1) pooled differences give a stable estimate that
+    still follows the shot noise along the spectrum. The pixel's own median difference is the lower bound, so narrow
+    lines that move are not clipped.
+
+    A pixel is a spike when its deviation from the median exceeds the median deviation of its neighbours (the local
+    baseline) by more than threshold * sigma (sigma at least min_sigma). A spectrum that changed as a whole
+    (temperature, integration time) moves the baseline with it, so spikes keep being replaced in such frames;
+    they are replaced by the median plus the local baseline.
+    All buffers are allocated once per pixel count; process() works in place.
+    """
+    def __init__(self, window: int = 5, threshold: float = 6.0, min_sigma: float = 5.0, neighbours: int = 8):
+        if window < 3:
+            raise ValueError("window must hold at least 3 frames")
+        if neighbours < 1:
+            raise ValueError("neighbours must be at least 1")
+        self.window = window
+        self.threshold = threshold
+        self.min_sigma = min_sigma # counts, floor for pixels without measurable noise (saturated / dark)
+        self.neighbours = neighbours # pixels on either side pooled into sigma and the local baseline
+        self.rejected_pixels = 0
+        self.rejected_frames = 0
+        self._n_pixels = None
+
+
+    def _allocate(self, n_pixels: int) -> None:
+        span = 2 * self.neighbours + 1
+        self._n_pixels = n_pixels
+        self._ring = np.empty((self.window, n_pixels))
+        self._scratch = np.empty((self.window, n_pixels))
+        self._median = np.empty(n_pixels)
+        self._deviation = np.empty(n_pixels + span - 1) # edge padded
+        self._differences = np.empty((self.window - 1, n_pixels + span - 1)) # edge padded
+        self._local = np.empty((n_pixels, span))
+        self._pool = np.empty((n_pixels, (self.window - 1) * span))
+        self._baseline = np.empty(n_pixels)
+        self._limit = np.empty(n_pixels)
+        self._own = np.empty(n_pixels) # median frame-to-frame difference of each pixel
+        self._spikes = np.empty(n_pixels, dtype=bool)
+        self._count = 0
+        self._position = 0
+
+
+    def clear(self) -> None:
+        """
+        forget the history (after integration time changes, reconnects or dark capture)
+        """
+        self._count = 0
+        self._position = 0
+
+
+    @property
+    def ready(self) -> bool:
+        return self._count >= 3
+
+
+    @property
+    def last_spikes(self) -> np.ndarray:
+        """
+        mask of the pixels replaced in the last frame (valid until the next call)
+        """
+        return self._spikes
+
+
+    def _pad_edges(self, padded: np.ndarray) -> None:
+        k = self.neighbours
+        padded[..., :k] = padded[..., k:k + 1]
+        padded[..., -k:] = padded[..., -k - 1:-k]
+
+
+    @staticmethod
+    def _sorted_median(values: np.ndarray, axis: int, out: np.ndarray) -> None:
+        """
+        median along a short axis, sorting values in place (several times faster than np.median here)
+        """
+        values.sort(axis=axis)
+        m = values.shape[axis]
+        lower = values[(m - 1) // 2] if axis == 0 else values[:, (m - 1) // 2]
+        upper = values[m // 2] if axis == 0 else values[:, m // 2]
+        np.add(lower, upper, out=out)
+        np.multiply(out, 0.5, out=out)
+
+
+    def _neighbourhood(self, padded: np.ndarray) -> np.ndarray:
+        """
+        (..., pixels, 2 neighbours + 1) view of an edge padded array
+        """
+        return np.lib.stride_tricks.sliding_window_view(padded, 2 * self.neighbours + 1, axis=-1)
+
+
+    def _update_limit(self) -> None:
+        """
+        median of the history and sigma pooled from its frame-to-frame differences
+        """
+        k, n = self.neighbours, self._n_pixels
+        history = self._scratch[:self._count]
+        np.copyto(history, self._ring[:self._count])
+        self._sorted_median(history, 0, self._median)
+        # storage order pairs frames that are consecutive in time, except the pair across the write position
+        differences = self._differences[:self._count - 1]
+        np.subtract(self._ring[1:self._count], self._ring[:self._count - 1], out=differences[:, k:k + n])
+        np.abs(differences, out=differences)
+        self._pad_edges(differences)
+        span = 2 * k + 1
+        np.copyto(self._pool.reshape(n, self.window - 1, span)[:, :self._count - 1],
+                  self._neighbourhood(differences).transpose(1, 0, 2))
+        self._sorted_median(self._pool[:, :(self._count - 1) * span], 1, self._limit)
+        # never below the pixel's own spread: a narrow line that moves changes faster than its flat neighbours
+        self._sorted_median(differences[:, k:k + n], 0, self._own)
+        np.maximum(self._limit, self._own, out=self._limit)
+        # a difference of two frames has sqrt(2) x the noise of one
+        np.multiply(self._limit, MAD_TO_SIGMA / np.sqrt(2.0), out=self._limit)
+        np.maximum(self._limit, self.min_sigma, out=self._limit)
+        np.multiply(self._limit, self.threshold, out=self._limit)
+
+
+    def process(self, frame: np.ndarray) -> int:
+        """
+        replace spikes of frame (float array, modified in place), returns the number of replaced pixels
+        """
+        if frame.size != self._n_pixels:
+            self._allocate(frame.size)
+        replaced = 0
+        self._spikes[:] = False
+        if self.ready:
+            k, n = self.neighbours, self._n_pixels
+            self._update_limit()
+            deviation = self._deviation[k:k + n]
+            np.subtract(frame, self._median, out=deviation)
+            self._pad_edges(self._deviation)
+            np.copyto(self._local, self._neighbourhood(self._deviation))
+            self._sorted_median(self._local, 1, self._baseline)
+            np.subtract(deviation, self._baseline, out=deviation)
+            np.greater(deviation, self._limit, out=self._spikes)
+            replaced = int(np.count_nonzero(self._spikes))
+        # the raw frame enters the history, a spike is outvoted by the median of the others
+        self._ring[self._position] = frame
+        self._position = (self._position + 1) % self.window
+        self._count = min(self._count + 1, self.window)
+        if replaced:
+            np.add(self._median, self._baseline, out=self._median)
+            np.copyto(frame, self._median, where=self._spikes)
+            self.rejected_pixels += replaced
+            self.rejected_frames += 1
+        return replaced
@@ -0,0 +1,124 @@
+"""
+Cache of spectrometer capabilities by serial number (wavelength axis, integration time limits, non-linearity
+coefficients, model), so reconnecting a known device skips the EEPROM queries beyond what opening it needs.
+"""
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+import json
+import logging
+import numpy as np
+
+ENCODING = "utf-8"
+DEFAULT_CACHE_PATH = Path.home() / ".dlt_calibration" / "device_cache.json"
+
+
+@dataclass
+class SpectrometerCapabilities:
+    serial_number: str
+    model: str
+    wavelength: np.ndarray
+    integration_time_limits: tuple[int, int] # us
+    nonlinearity_coefficients: Optional[np.ndarray] = None
+
+
+    def to_json(self) -> dict:
+        return {
+            "model": self.model,
+            "wavelength": self.wavelength.tolist(),
+            "integration_time_limits": list(self.integration_time_limits),
+            "nonlinearity_coefficients": None if self.nonlinearity_coefficients is None
+                                         else self.nonlinearity_coefficients.tolist(),
+        }
+
+
+    @classmethod
+    def from_json(cls, serial_number: str, data: dict) -> "SpectrometerCapabilities":
+        coefficients = data.get("nonlinearity_coefficients")
+        return cls(
+            serial_number=serial_number,
+            model=data["model"],
+            wavelength=np.asarray(data["wavelength"], dtype=np.float64),
+            integration_time_limits=tuple(int(limit) for limit in data["integration_time_limits"]),
+            nonlinearity_coefficients=None if coefficients is None else np.asarray(coefficients, dtype=np.float64),
+        )
+
+
+def read_nonlinearity_coefficients(spectrometer) -> Optional[np.ndarray]:
+    try:
+        feature = spectrometer.f.nonlinearity_coefficients
+        return np.asarray(feature.get_nonlinearity_coefficients(), dtype=np.float64)
+    except (AttributeError, Exception) as e:
+        logging.info(f"Non-linearity coefficients not available: {e}")
+        return None
+
+
+def query_capabilities(spectrometer) -> SpectrometerCapabilities:
+    return SpectrometerCapabilities(
+        serial_number=spectrometer.serial_number,
+        model=spectrometer.model,
+        wavelength=np.asarray(spectrometer.wavelengths(), dtype=np.float64),
+        integration_time_limits=tuple(int(limit) for limit in spectrometer.integration_time_micros_limits),
+        nonlinearity_coefficients=read_nonlinearity_coefficients(spectrometer),
+    )
+
+
+class DeviceCache:
+    """
+    refresh: query every device again once in this session (after a spectrometer was re-calibrated)
+    """
+    def __init__(self, path=DEFAULT_CACHE_PATH, refresh: bool = False):
+        self.path = Path(path)
+        self.refresh = refresh
+        self._refreshed = set()
+        self.spectrometers: dict[str, dict] = {}
+        try:
+            with open(self.path, encoding=ENCODING) as f:
+                self.spectrometers = json.load(f).get("spectrometers", {})
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, AttributeError) as e:
+            logging.warning(f"Ignoring unreadable device cache {self.path}: {e}")
+
+
+    def spectrometer(self, serial_number: str) -> Optional[SpectrometerCapabilities]:
+        data = self.spectrometers.get(serial_number)
+        if data is None:
+            return None
+        try:
+            return SpectrometerCapabilities.from_json(serial_number, data)
+        except (KeyError, TypeError, ValueError) as e:
+            logging.warning(f"Ignoring invalid cache entry for {serial_number}: {e}")
+            return None
+
+
+    def store_spectrometer(self, capabilities: SpectrometerCapabilities) -> None:
+        self.spectrometers[capabilities.serial_number] = capabilities.to_json()
+        self.save()
+
+
+    def save(self) -> None:
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            with open(tmp, "w", encoding=ENCODING) as f:
+                json.dump({"spectrometers": self.spectrometers}, f)
+            tmp.replace(self.path)
+        except OSError as e:
+            logging.warning(f"Failed to write device cache {self.path}: {e}")
+
+
+    def capabilities(self, spectrometer) -> SpectrometerCapabilities:
+        """
+        cached capabilities of a connected spectrometer, queried (and cached) on first use or with refresh
+        """
+        serial_number = spectrometer.serial_number
+        stale = self.refresh and serial_number not in self._refreshed
+        cached = None if stale else self.spectrometer(serial_number)
+        if cached is not None:
+            logging.info(f"Using cached capabilities of spectrometer {serial_number}")
+            return cached
+        capabilities = query_capabilities(spectrometer)
+        self.store_spectrometer(capabilities)
+        self._refreshed.add(serial_number)
+        return capabilities
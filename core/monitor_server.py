@@ -0,0 +1,244 @@
+import asyncio
+import struct
+import threading
+import time
+import logging
+from collections import deque
+import numpy as np
+
+# message = header + payload, header: magic, version, kind, timestamp [unix s], payload length
+HEADER = struct.Struct("<4sBBdI")
+MAGIC = b"DLTM"
+VERSION = 1
+
+KIND_TEMPERATURE = 1 # <5d: temperature_A, temperature_B, heater_output_1, heater_output_2, setpoint
+KIND_AXIS = 2 # float32[n]: downsampled wavelength grid, sent before spectra and to every new client
+KIND_SPECTRUM = 3 # float32[n]: downsampled intensity on the last axis
+KIND_PROGRESS = 4 # <IId: index, total, setpoint (index == total when the sweep is finished/stopped)
+
+TEMPERATURE = struct.Struct("<5d")
+PROGRESS = struct.Struct("<IId")
+
+
+def encode(kind: int, timestamp: float, payload: bytes) -> bytes:
+    return HEADER.pack(MAGIC, VERSION, kind, timestamp, len(payload)) + payload
+
+
+def downsample(array: np.ndarray, max_points: int) -> np.ndarray:
+    """
+    block mean down to at most max_points samples (float32)
+    """
+    array = np.asarray(array, dtype=np.float32)
+    factor = -(-array.size // max_points) # ceil
+    if factor <= 1:
+        return array
+    usable = array.size // factor * factor
+    return array[:usable].reshape(-1, factor).mean(axis=1, dtype=np.float32)
+
+
+def decode_payload(kind: int, payload: bytes):
+    if kind == KIND_TEMPERATURE:
+        return dict(zip(["temperature_A", "temperature_B", "heater_output_1", "heater_output_2", "setpoint"],
+                        TEMPERATURE.unpack(payload)))
+    if kind in (KIND_AXIS, KIND_SPECTRUM):
+        return np.frombuffer(payload, dtype="<f4")
+    if kind == KIND_PROGRESS:
+        return dict(zip(["index", "total", "setpoint"], PROGRESS.unpack(payload)))
+    return payload
+
+
+async def read_message(reader: asyncio.StreamReader) -> tuple[int, float, object]:
+    magic, version, kind, timestamp, length = HEADER.unpack(await reader.readexactly(HEADER.size))
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Not a DLT monitor stream")
+    payload = await reader.readexactly(length)
+    return kind, timestamp, decode_payload(kind, payload)
+
+
+class _Client:
+    def __init__(self, writer: asyncio.StreamWriter, history: int):
+        self.writer = writer
+        self.temperatures = deque(maxlen=history) # every reading is kept (bounded)
+        self.latest = {} # kind -> message, only the newest spectrum/progress matters
+        self.wake = asyncio.Event()
+
+
+    def push(self, kind: int, message: bytes) -> None:
+        if kind == KIND_TEMPERATURE:
+            self.temperatures.append(message)
+        else:
+            if kind == KIND_AXIS:
+                self.latest.pop(KIND_SPECTRUM, None) # stale spectrum belongs to the old axis
+            self.latest[kind] = message
+        self.wake.set()
+
+
+    def take(self) -> list[bytes]:
+        messages = list(self.temperatures)
+        self.temperatures.clear()
+        for kind in (KIND_PROGRESS, KIND_AXIS, KIND_SPECTRUM):
+            message = self.latest.pop(kind, None)
+            if message is not None:
+                messages.append(message)
+        self.wake.clear()
+        return messages
+
+
+class MonitorServer:
+    """
+    Read-only live monitor.
+    Runs its own asyncio loop in a daemon thread. publish_*() only hands references over to that loop, so encoding,
+    downsampling and socket I/O never run on the acquisition threads. Each message is encoded once and fanned out to
+    all clients; slow clients skip intermediate spectra instead of buffering them.
+    """
+    def __init__(self, host: str = "127.0.0.1", port: int = 8765, max_points: int = 512,
+                 max_spectrum_rate: float = 5.0, history: int = 1000):
+        self.host = host
+        self.port = port
+        self.max_points = max_points
+        self.min_spectrum_period = 1.0 / max_spectrum_rate if max_spectrum_rate > 0 else 0.0
+        self.history = history
+        self._clients: set[_Client] = set()
+        self._loop = None
+        self._server = None
+        self._thread = None
+        self._started = threading.Event()
+        self._last_spectrum_time = 0.0
+        self._wavelength_source = None
+        self._axis_message = None
+        self._progress_message = None
+
+
+    @property
+    def client_count(self) -> int:
+        return len(self._clients)
+
+
+    def start(self) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._run, name="MonitorServer", daemon=True)
+        self._thread.start()
+        self._started.wait(5.0)
+
+
+    def stop(self) -> None:
+        if self._loop is None:
+            return
+        if self._loop.is_running():
+            asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop)
+        self._thread.join(5.0)
+        self._thread = None
+        self._loop = None
+
+
+    def _run(self) -> None:
+        self._loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self._loop)
+        try:
+            self._server = self._loop.run_until_complete(asyncio.start_server(self._handle, self.host, self.port))
+            self.port = self._server.sockets[0].getsockname()[1]
+            logging.info(f"Monitor server listening on {self.host}:{self.port}")
+        except OSError as e:
+            logging.error(f"Failed to start monitor server: {e}")
+            self._started.set()
+            return
+        self._started.set()
+        try:
+            self._loop.run_forever()
+        finally:
+            self._loop.close()
+
+
+    async def _shutdown(self) -> None:
+        self._server.close()
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        asyncio.get_running_loop().stop()
+
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        client = _Client(writer, self.history)
+        if self._progress_message is not None:
+            client.latest[KIND_PROGRESS] = self._progress_message
+        if self._axis_message is not None:
+            client.latest[KIND_AXIS] = self._axis_message
+        client.wake.set()
+        self._clients.add(client)
+        try:
+            while True:
+                await client.wake.wait()
+                writer.writelines(client.take())
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError): # client gone or server shutting down
+            pass
+        finally:
+            self._clients.discard(client)
+            writer.close()
+
+
+    def _broadcast(self, kind: int, message: bytes) -> None:
+        for client in self._clients:
+            client.push(kind, message)
+
+
+    def _call(self, func, *args) -> None:
+        if self._loop is not None and self._loop.is_running():
+            self._loop.call_soon_threadsafe(func, *args)
+
+
+    def publish_temperature(self, data: dict, setpoint: float = float("nan")) -> None:
+        self._call(self._publish_temperature, time.time(), data, setpoint)
+
+
+    def _publish_temperature(self, timestamp: float, data: dict, setpoint: float) -> None:
+        payload = TEMPERATURE.pack(
+            float(data.get("temperature_A", float("nan"))),
+            float(data.get("temperature_B", float("nan"))),
+            float(data.get("heater_output_1", float("nan"))),
+            float(data.get("heater_output_2", float("nan"))),
+            float(setpoint),
+        )
+        self._broadcast(KIND_TEMPERATURE, encode(KIND_TEMPERATURE, timestamp, payload))
+
+
+    def publish_spectrum(self, wavelength: np.ndarray, intensity: np.ndarray) -> None:
+        now = time.monotonic()
+        if now - self._last_spectrum_time < self.min_spectrum_period:
+            return
+        self._last_spectrum_time = now
+        self._call(self._publish_spectrum, time.time(), wavelength, intensity)
+
+
+    def _publish_spectrum(self, timestamp: float, wavelength: np.ndarray, intensity: np.ndarray) -> None:
+        if wavelength is not self._wavelength_source:
+            self._wavelength_source = wavelength
+            self._axis_message = encode(KIND_AXIS, timestamp, downsample(wavelength, self.max_points).tobytes())
+            self._broadcast(KIND_AXIS, self._axis_message)
+        if not self._clients:
+            return
+        payload = downsample(intensity, self.max_points).tobytes()
+        self._broadcast(KIND_SPECTRUM, encode(KIND_SPECTRUM, timestamp, payload))
+
+
+    def publish_progress(self, index: int, total: int, setpoint: float) -> None:
+        self._call(self._publish_progress, time.time(), index, total, setpoint)
+
+
+    def _publish_progress(self, timestamp: float, index: int, total: int, setpoint: float) -> None:
+        self._progress_message = encode(KIND_PROGRESS, timestamp, PROGRESS.pack(index, total, float(setpoint)))
+        self._broadcast(KIND_PROGRESS, self._progress_message)
+
+
+async def stream(host: str = "127.0.0.1", port: int = 8765):
+    """
+    async generator of (kind, timestamp, payload) decoded from a monitor server
+    """
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while True:
+            yield await read_message(reader)
+    finally:
+        writer.close()
@@ -0,0 +1,622 @@
+import asyncio
+from typing import Callable, Optional
+import logging
+import time
+import numpy as np
+from core.stability import ThermalStability, SpectralDrift, Readiness
+from core.watchdog import DeadlineCaller, Backoff
+
+DEFAULT_CALL_TIMEOUT = 5.0 # sec, per blocking driver call
+DEFAULT_RECONNECT_TIMEOUT = 10.0 # sec, for reopening a device
+KINDS = ("spectrum", "temperature") # data kinds, one per instrument
+
+
+class AsyncInstrument:
+    """
+    Async adapter around a blocking driver.
+    Calls are serialized on one worker thread (drivers are not thread-safe) in the order they were issued and bounded
+    by a deadline; a hung call raises CallTimeout and its worker is abandoned instead of blocking shutdown; later calls
+    fail fast with CallTimeout until the hung call has left the driver.
+    With open_driver (blocking, returns a new driver) reconnect() replaces the driver, with exponential backoff between
+    failed attempts; the old driver is closed unless a hung call still uses it. Once the instrument is closed no
+    reconnect is started, and a driver opened by a reconnect under way (or returning after its deadline) is closed.
+    """
+    def __init__(self, driver, name: str, timeout: float = DEFAULT_CALL_TIMEOUT,
+                 open_driver: Optional[Callable] = None, reconnect_timeout: float = DEFAULT_RECONNECT_TIMEOUT):
+        self.driver = driver
+        self.name = name
+        self.timeout = timeout
+        self.open_driver = open_driver
+        self.reconnect_timeout = reconnect_timeout
+        self.backoff = Backoff(initial=1.0, maximum=60.0)
+        self.closed = False
+        self._caller = DeadlineCaller(name, timeout)
+        self._order = asyncio.Lock() # FIFO, e.g. the last of several integration times wins
+
+
+    async def call(self, func: Callable, *args, timeout: Optional[float] = None, **kwargs):
+        async with self._order:
+            return await asyncio.to_thread(self._caller.call, func, *args, timeout=timeout, **kwargs)
+
+
+    async def reconnect(self) -> bool:
+        """
+        reopen the device through open_driver; False without open_driver, once closed, while backing off or on failure
+        """
+        if self.open_driver is None or self.closed or not self.backoff.ready():
+            return False
+        abandon = self._caller.busy # a hung call still uses the old driver: do not close it under that call
+        attempt = asyncio.ensure_future(asyncio.to_thread(self._caller.recover, self._reopen, self.driver, abandon,
+                                                          timeout=self.reconnect_timeout, on_late=self.close_driver))
+        try:
+            driver = await asyncio.shield(attempt)
+        except asyncio.CancelledError:
+            # the worker carries on, a driver it opens now is nobody's
+            attempt.add_done_callback(self._close_orphan)
+            raise
+        except Exception as e:
+            delay = self.backoff.failed()
+            logging.error(f"Reconnecting {self.name} failed, retry in {delay:.0f} s: {e}")
+            return False
+        if self.closed:
+            logging.info(f"{self.name} closed during reconnect, closing the new driver")
+            self.close_driver(driver)
+            return False
+        self.driver = driver
+        self.backoff.reset()
+        logging.info(f"{self.name} reconnected")
+        return True
+
+
+    def _reopen(self, driver, abandon: bool):
+        if abandon:
+            logging.warning(f"Leaving the stalled {self.name} handle to its hung call")
+        else:
+            self.close_driver(driver)
+        driver = self.open_driver()
+        self.restore(driver)
+        return driver
+
+
+    def _close_orphan(self, attempt: asyncio.Future) -> None:
+        if not attempt.cancelled() and attempt.exception() is None:
+            self.close_driver(attempt.result())
+
+
+    def restore(self, driver) -> None:
+        """
+        settings of the replaced driver onto a reopened one (runs on the worker)
+        """
+        pass
+
+
+    def close_driver(self, driver) -> None:
+        """
+        close a driver (blocking), failures are logged
+        """
+        pass
+
+
+    async def disconnect(self) -> None:
+        """
+        close the driver (unless a hung call still uses it) and the worker, no reconnect after this
+        """
+        self.closed = True
+        if not self._caller.busy:
+            try:
+                await self.call(self.close_driver, self.driver)
+            except Exception as e:
+                logging.error(f"Closing {self.name} failed: {e}")
+        self.close()
+
+
+    def close(self) -> None:
+        self.closed = True
+        self._caller.close()
+
+
+class SpectrometerAdapter(AsyncInstrument):
+    def __init__(self, spectrometer, timeout: float = DEFAULT_CALL_TIMEOUT, open_driver: Optional[Callable] = None):
+        super().__init__(spectrometer, "spectrometer", timeout, open_driver)
+        self.integration_time = None # us, restored on a reopened device
+
+
+    async def wavelengths(self) -> np.ndarray:
+        return await self.call(self.driver.wavelengths)
+
+
+    async def intensities(self) -> np.ndarray:
+        return await self.call(self.driver.intensities)
+
+
+    async def set_integration_time(self, micros: int) -> None:
+        await self.call(self.driver.integration_time_micros, micros)
+        self.integration_time = micros
+
+
+    def restore(self, driver) -> None:
+        if self.integration_time is not None:
+            driver.integration_time_micros(self.integration_time)
+
+
+    def close_driver(self, driver) -> None:
+        try:
+            driver.close()
+        except Exception as e:
+            logging.info(f"Closing spectrometer failed: {e}")
+
+
+class Model335Adapter(AsyncInstrument):
+    def __init__(self, controller, output: int = 1, timeout: float = DEFAULT_CALL_TIMEOUT,
+                 open_driver: Optional[Callable] = None):
+        super().__init__(controller, "model335", timeout, open_driver)
+        self.output = output
+        self.heater_range = -1 # Model335.HeaterRange value of the active range, -1 if unknown
+
+
+    def _read(self) -> dict:
+        heater_output1 = self.driver.get_heater_output(1)
+        heater_output2 = self.driver.get_heater_output(2)
+        temperature_reading = self.driver.get_all_kelvin_reading()
+        return {
+            "temperature_A": temperature_reading[0],
+            "temperature_B": temperature_reading[1],
+            "heater_output_1": heater_output1,
+            "heater_output_2": heater_output2,
+        }
+
+
+    async def read(self) -> dict:
+        return await self.call(self._read)
+
+
+    async def identify(self) -> str:
+        return await self.call(self.driver.query, "*IDN?")
+
+
+    async def read_setpoint(self) -> float:
+        return float(await self.call(self.driver.get_control_setpoint, self.output))
+
+
+    async def set_setpoint(self, value: float) -> None:
+        await self.call(self.driver.set_control_setpoint, output=self.output, value=value)
+
+
+    async def heater_on(self, heater_range: str = "HIGH") -> None:
+        value = self.driver.HeaterRange[heater_range]
+        await self.call(self.driver.set_heater_range, output=self.output, heater_range=value)
+        self.heater_range = value.value
+
+
+    async def set_ramp(self, rate: float) -> None:
+        """
+        setpoint ramp in K/min, 0 disables ramping
+        """
+        await self.call(self.driver.set_setpoint_ramp_parameter, output=self.output, ramp_enable=rate > 0,
+                        rate_value=rate)
+
+
+    async def apply_tuning(self, entry) -> None:
+        """
+        PID gains and heater range of a core.autotune.TuningEntry
+        """
+        await self.call(self.driver.set_heater_pid, output=self.output, gain=entry.P, integral=entry.I,
+                        derivative=entry.D)
+        value = self.driver.HeaterRange[entry.heater_range]
+        await self.call(self.driver.set_heater_range, output=self.output, heater_range=value)
+        self.heater_range = value.value
+
+
+    async def heaters_off(self) -> None:
+        await self.call(self.driver.all_heaters_off)
+        self.heater_range = self.driver.HeaterRange.OFF.value
+
+
+    def close_driver(self, driver) -> None:
+        try:
+            driver.disconnect_usb()
+        except Exception as e:
+            logging.info(f"Closing Model335 failed: {e}")
+
+
+class Orchestrator:
+    """
+    Acquisition core of both the GUI (main.py, on the Qt event loop through qasync) and headless.py.
+    Polls the instruments concurrently, publishes readings to subscribers and drives the setpoint sweep from
+    stability events instead of timer ticks. Instruments can be attached while the loop runs (the GUI connects them
+    one by one), and each kind of polling ("spectrum", "temperature") is started and stopped on its own.
+
+    Events are (kind, timestamp, payload) tuples with kind in
+    "spectrum", "temperature", "stale", "reconnected", "setpoint", "progress", "record", "done".
+    A device whose polls failed reconnect_after times in a row is reopened (AsyncInstrument.reconnect).
+    While a device is stale (no data for stale_after seconds) the stability window is discarded and no record is made.
+    Spectra are published as raw counts until a dark is captured (capture_dark) or given; after that they are
+    dark-subtracted and, with nonlinearity_correction and coefficients in the spectral_axis, non-linearity corrected
+    (the correction is only valid for dark-subtracted counts). With a spectral_axis, readiness additionally requires
+    the spectral observables to stop drifting.
+    With a spike_rejector (core.despike.SpikeRejector), spikes are replaced before features, events and averaging.
+    With a tuning table (core.autotune.TuningTable), the validated PID gains / heater range of each setpoint's band
+    are applied before the setpoint is issued.
+    """
+    def __init__(self, spectrometer: Optional[SpectrometerAdapter] = None, controller: Optional[Model335Adapter] = None,
+                 polling_interval: float = 0.5, stability: Optional[ThermalStability] = None,
+                 stale_after: float = 10.0, spectral_axis=None, spectral_drift: Optional[SpectralDrift] = None,
+                 tuning=None, spike_rejector=None, dark: Optional[np.ndarray] = None,
+                 nonlinearity_correction: bool = True, reconnect_after: int = 3):
+        self.spectrometer = spectrometer
+        self.controller = controller
+        self.polling_interval = polling_interval
+        self.stability = ThermalStability() if stability is None else stability
+        self.spectral_axis = spectral_axis
+        self.spectral_drift = SpectralDrift() if spectral_drift is None else spectral_drift
+        self.tuning = tuning
+        self.spike_rejector = spike_rejector
+        self.dark = None if dark is None else np.asarray(dark, dtype=np.float64)
+        self.nonlinearity_correction = nonlinearity_correction
+        self.reconnect_after = reconnect_after
+        self.tuning_entry = None
+        self.features = {}
+        self.setpoint = float("nan")
+        self.last_spectrum = None
+        self.last_temperature = None
+        self._subscribers: list[asyncio.Queue] = []
+        self._tasks: dict[str, asyncio.Task] = {}
+        self._stable = asyncio.Event()
+        self._sweep = None
+        self._record_error = None
+        self.stale_after = stale_after
+        self._last_data_time = {kind: time.monotonic() for kind in KINDS}
+        self.stale = {kind: False for kind in KINDS}
+
+
+    @property
+    def readiness(self) -> Readiness:
+        return Readiness(self.stability, self.spectral_drift)
+
+
+    def subscribe(self, maxsize: int = 100) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=maxsize)
+        self._subscribers.append(queue)
+        return queue
+
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        if queue in self._subscribers:
+            self._subscribers.remove(queue)
+
+
+    def publish(self, kind: str, payload) -> None:
+        event = (kind, time.time(), payload)
+        for queue in self._subscribers:
+            if queue.full(): # slow consumer: drop oldest event
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+
+    def instrument(self, kind: str) -> Optional[AsyncInstrument]:
+        return self.spectrometer if kind == "spectrum" else self.controller
+
+
+    def polling(self, kind: str) -> bool:
+        return kind in self._tasks
+
+
+    def start(self, kind: Optional[str] = None) -> None:
+        """
+        poll the instrument of kind (default: every attached instrument)
+        """
+        for kind in KINDS if kind is None else (kind,):
+            if self.polling(kind) or self.instrument(kind) is None:
+                continue
+            self._last_data_time[kind] = time.monotonic()
+            if kind == "spectrum":
+                poll = self._poll(kind, self.spectrometer.intensities, self._received_spectrum)
+            else:
+                poll = self._poll(kind, self.controller.read, self._received_temperature)
+            self._tasks[kind] = asyncio.create_task(poll, name=f"poll_{kind}")
+
+
+    async def stop(self, kind: Optional[str] = None) -> None:
+        kinds = KINDS if kind is None else (kind,)
+        tasks = [self._tasks.pop(kind) for kind in kinds if kind in self._tasks]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for kind in kinds:
+            if self.stale[kind]: # nobody waits for its data any more
+                self.stale[kind] = False
+                self.publish("stale", (kind, False))
+
+
+    async def detach(self, kind: str) -> None:
+        """
+        stop polling and disconnect the instrument of kind
+        """
+        await self.stop(kind)
+        instrument = self.instrument(kind)
+        if kind == "spectrum":
+            self.spectrometer = None
+        else:
+            self.controller = None
+        if instrument is not None:
+            await instrument.disconnect()
+
+
+    async def close(self) -> None:
+        for kind in KINDS:
+            await self.detach(kind)
+
+
+    def _received(self, kind: str) -> None:
+        self._last_data_time[kind] = time.monotonic()
+        if self.stale[kind]:
+            self.stale[kind] = False
+            logging.info(f"{kind} data flow recovered")
+            self.publish("stale", (kind, False))
+
+
+    def _check_stale(self, kind: str) -> None:
+        if self.stale[kind] or time.monotonic() - self._last_data_time[kind] <= self.stale_after:
+            return
+        self.stale[kind] = True
+        self._stable.clear()
+        self.readiness.clear()
+        logging.warning(f"No {kind} data for more than {self.stale_after:.1f} s")
+        self.publish("stale", (kind, True))
+
+
+    async def _poll(self, kind: str, read: Callable, received: Callable) -> None:
+        failures = 0
+        while True:
+            instrument = self.instrument(kind)
+            try:
+                data = await read()
+                failures = 0
+                instrument.backoff.reset()
+                received(data)
+            except Exception as e:
+                failures += 1
+                logging.error(f"Polling {kind} failed: {e}")
+                if failures >= self.reconnect_after and await instrument.reconnect():
+                    failures = 0
+                    if kind == "spectrum" and self.spike_rejector is not None:
+                        self.spike_rejector.clear()
+                    self.publish("reconnected", kind)
+            self._check_stale(kind)
+            await asyncio.sleep(self.polling_interval)
+
+
+    @property
+    def dark_corrected(self) -> bool:
+        return self.dark is not None
+
+
+    @property
+    def nonlinearity_corrected(self) -> bool:
+        return (self.dark is not None and self.nonlinearity_correction and self.spectral_axis is not None
+                and self.spectral_axis.nonlinearity_coefficients is not None)
+
+
+    def _process(self, spectrum: np.ndarray) -> np.ndarray:
+        if self.spike_rejector is not None:
+            self.spike_rejector.process(spectrum)
+        if self.dark is None:
+            return spectrum
+        spectrum = spectrum - self.dark
+        if self.nonlinearity_correction and self.spectral_axis is not None:
+            spectrum = self.spectral_axis.correct(spectrum)
+        return spectrum
+
+
+    async def capture_dark(self, frames: int = 1) -> np.ndarray:
+        """
+        average the next `frames` spectra as the dark (light source blocked), later spectra are dark-subtracted
+        """
+        self.dark = None
+        dark = await self.acquire(frames)
+        self.dark = dark
+        # dark frames are neither part of the drift window nor a history for the spike rejector
+        self.spectral_drift.clear()
+        if self.spike_rejector is not None:
+            self.spike_rejector.clear()
+        logging.info(f"Captured dark from {frames} frames")
+        return dark
+
+
+    def _received_spectrum(self, raw: np.ndarray) -> None:
+        self.last_spectrum = self._process(np.asarray(raw, dtype=np.float64))
+        self._received("spectrum")
+        if self.spectral_axis is not None:
+            self.features = self.spectral_axis.features(self.last_spectrum)
+            self.spectral_drift.append(time.monotonic(), self.features)
+        self.publish("spectrum", self.last_spectrum)
+        self._update_ready()
+
+
+    def _received_temperature(self, data: dict) -> None:
+        self.last_temperature = data
+        self._received("temperature")
+        self.stability.append(data["temperature_A"], data["temperature_B"])
+        self.publish("temperature", data)
+        self._update_ready()
+
+
+    def log_row(self, timestamp: float, data: dict) -> dict:
+        """
+        TemperatureLogger.append arguments for a "temperature" event
+        """
+        return {
+            "timestamp": timestamp,
+            "temperature_A": data["temperature_A"],
+            "temperature_B": data["temperature_B"],
+            "heater_output_1": data["heater_output_1"],
+            "heater_output_2": data["heater_output_2"],
+            "setpoint": self.setpoint,
+            "heater_range": -1 if self.controller is None else self.controller.heater_range,
+        }
+
+
+    async def log_temperatures(self, logger) -> None:
+        """
+        append every temperature reading to a core.temperature_log.TemperatureLogger until cancelled
+        """
+        queue = self.subscribe()
+        try:
+            while True:
+                kind, timestamp, payload = await queue.get()
+                if kind != "temperature":
+                    continue
+                try:
+                    logger.append(**self.log_row(timestamp, payload))
+                except Exception as e:
+                    logging.error(f"Failed to append temperature log: {e}")
+        finally:
+            self.unsubscribe(queue)
+
+
+    @property
+    def is_temperature_stable(self) -> bool:
+        return self.stability.is_stable(self.setpoint)
+
+
+    def _update_ready(self) -> None:
+        if any(self.stale.values()):
+            return
+        if self.spectral_axis is None:
+            ready = self.stability.is_stable(self.setpoint)
+        else:
+            ready = self.readiness.is_ready(self.setpoint)
+        if ready:
+            self._stable.set()
+
+
+    async def go_to(self, setpoint: float) -> None:
+        self._stable.clear()
+        self.readiness.clear()
+        self.setpoint = setpoint
+        await self._apply_tuning(setpoint)
+        await self.controller.set_setpoint(setpoint)
+        self.publish("setpoint", setpoint)
+
+
+    async def _apply_tuning(self, setpoint: float) -> None:
+        entry = None if self.tuning is None else self.tuning.lookup(setpoint)
+        if entry is None or entry is self.tuning_entry:
+            return
+        await self.controller.apply_tuning(entry)
+        self.tuning_entry = entry
+        logging.info(f"Applied tuning for {setpoint:.1f} K: {entry.heater_range}, P={entry.P:.1f}, I={entry.I:.1f}")
+
+
+    async def wait_stable(self, timeout: Optional[float] = None) -> None:
+        await asyncio.wait_for(self._stable.wait(), timeout)
+
+
+    async def acquire(self, frames: int = 1) -> np.ndarray:
+        """
+        average the next `frames` spectra
+        """
+        queue = self.subscribe()
+        try:
+            total = None
+            count = 0
+            while count < frames:
+                kind, timestamp, payload = await queue.get()
+                if kind != "spectrum":
+                    continue
+                total = np.array(payload, dtype=np.float64) if total is None else total + payload
+                count += 1
+            return total / count
+        finally:
+            self.unsubscribe(queue)
+
+
+    @property
+    def running(self) -> bool:
+        return self._sweep is not None
+
+
+    async def _record(self, previous: Optional[asyncio.Task], on_record: Callable, temperatures, index: int,
+                      spectrum: np.ndarray, temperature: dict) -> None:
+        if previous is not None:
+            await previous # keep records in order
+        setpoint = float(temperatures[index])
+        await asyncio.to_thread(on_record, setpoint, spectrum, temperature)
+        self.publish("record", setpoint)
+        next_setpoint = float(temperatures[index + 1]) if index + 1 < len(temperatures) else float("nan")
+        self.publish("progress", (index + 1, len(temperatures), next_setpoint))
+
+
+    def _check_record(self, record: asyncio.Task) -> None:
+        if record.cancelled() or record.exception() is None or self._record_error is not None:
+            return
+        # a failed save stops the sweep right away instead of at the next setpoint
+        self._record_error = record.exception()
+        if self._sweep is not None:
+            self._sweep.cancel()
+
+
+    async def run_sweep(self, temperatures, on_record: Callable, heater_range: str = "HIGH",
+                        settle_timeout: Optional[float] = None, frames_per_point: int = 1,
+                        ramp_rate: float = 0.0) -> None:
+        """
+        visit every setpoint, wait for readiness (asyncio.TimeoutError after settle_timeout seconds), average
+        frames_per_point spectra and call on_record(setpoint, spectrum, temperature_dict) on a worker thread.
+        The next setpoint is issued as soon as the frames are in, so saving overlaps the heater transition; a failed
+        record stops the sweep and is raised here. However the sweep ends, the heaters are switched off.
+        """
+        if self.running:
+            raise RuntimeError("A sweep is already running")
+        self.start()
+        self._record_error = None
+        self._sweep = asyncio.ensure_future(self._run_setpoints(temperatures, on_record, heater_range, settle_timeout,
+                                                                frames_per_point, ramp_rate))
+        finished = False
+        try:
+            await self._sweep
+            finished = True
+        except asyncio.CancelledError:
+            if self._record_error is None:
+                raise
+        finally:
+            self._sweep = None
+            if not finished:
+                self.publish("progress", (len(temperatures), len(temperatures), float("nan")))
+            try:
+                await self.controller.heaters_off()
+            except Exception as e:
+                logging.error(f"Failed to switch heaters off: {e}")
+        if self._record_error is not None:
+            raise self._record_error
+
+
+    async def _run_setpoints(self, temperatures, on_record: Callable, heater_range: str,
+                             settle_timeout: Optional[float], frames_per_point: int, ramp_rate: float) -> None:
+        pending = None
+        try:
+            await self.controller.set_ramp(ramp_rate)
+            self.tuning_entry = None
+            self.publish("progress", (0, len(temperatures), float(temperatures[0])))
+            await self.go_to(float(temperatures[0]))
+            if self.tuning_entry is None: # a tuned band already switched its heater range on
+                await self.controller.heater_on(heater_range)
+            for index, setpoint in enumerate(temperatures):
+                logging.info(f"Waiting for {setpoint:.1f} K")
+                await self.wait_stable(settle_timeout)
+                while any(self.stale.values()): # went stale after the stability event
+                    self._stable.clear()
+                    await self.wait_stable(settle_timeout)
+                spectrum = await self.acquire(frames_per_point)
+                temperature = dict(self.last_temperature)
+                if index + 1 < len(temperatures):
+                    await self.go_to(float(temperatures[index + 1]))
+                pending = asyncio.create_task(self._record(pending, on_record, temperatures, index, spectrum,
+                                                           temperature))
+                pending.add_done_callback(self._check_record)
+            if pending is not None:
+                await pending
+            logging.info(f"Finish scanning target temperatures")
+            self.publish("done", None)
+        finally:
+            if pending is not None and not pending.done():
+                await asyncio.gather(pending, return_exceptions=True)
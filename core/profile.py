@@ -0,0 +1,149 @@
+"""
+Declarative run profiles (TOML), shared by the GUI (main.py --profile) and headless.py --profile.
+Every key is optional; missing keys keep the defaults below. See profiles/example.toml.
+"""
+from dataclasses import dataclass, field, fields, is_dataclass
+from pathlib import Path
+from typing import Optional
+import tomllib
+import numpy as np
+from core.spectral_axis import RESERVED_NAMES
+
+
+@dataclass
+class DeviceProfile:
+    serial_number: str = "" # empty: first available device
+    com_port: str = "" # Model335 only, used when no serial number is given
+
+
+@dataclass
+class DevicesProfile:
+    spectrometer: DeviceProfile = field(default_factory=DeviceProfile)
+    temperature_controller: DeviceProfile = field(default_factory=DeviceProfile)
+
+
+@dataclass
+class AcquisitionProfile:
+    integration_time_us: int = 300
+    polling_interval: float = 0.5 # sec
+    frames_per_point: int = 1
+    spike_threshold: float = 6.0 # MAD sigma, 0 = off
+    dark_frames: int = 0 # frames averaged into a dark (headless: before the sweep, 0 = raw counts; GUI: "Capture Dark")
+
+
+@dataclass
+class SpectralProfile:
+    bands: dict = field(default_factory=dict) # name -> [lower, upper] nm, integrated live on every frame
+    nonlinearity_correction: bool = True # apply the spectrometer's non-linearity coefficients
+    ratio: list = field(default_factory=list) # [numerator, denominator] band names, tracked for stability
+
+
+@dataclass
+class StabilityProfile:
+    window: int = 60 # temperature polls
+    tol_A: float = 0.02 # K
+    std_tol: float = 0.01 # K
+    spectral_window: float = 120.0 # sec, drift fit window (see core.stability.SpectralDrift for the slope noise)
+    mean_wavelength_drift: float = 0.01 # nm/min
+    band_ratio_drift: float = 0.001 # 1/min, |drift| / ratio, with [spectral] ratio
+    settle_timeout: float = 0.0 # sec per setpoint, 0 = no limit
+
+
+@dataclass
+class ScheduleProfile:
+    start: float = 50.0 # K
+    stop: float = 310.0 # K
+    step: float = 10.0 # K
+    heater_output: int = 1
+    heater_range: str = "HIGH"
+    ramp_rate: float = 0.0 # K/min, 0 = off
+    tuning: str = "" # core.autotune table (json), empty: none
+
+
+    def temperatures(self) -> np.ndarray:
+        num = int(abs(self.stop - self.start) / self.step) + 1
+        return np.linspace(self.start, self.stop, num)
+
+
+@dataclass
+class OutputProfile:
+    folder: str = "" # empty: ask (GUI) / command line (headless)
+    csv_precision: int = 4 # decimals
+    wide_csv: bool = False
+
+
+@dataclass
+class RunProfile:
+    devices: DevicesProfile = field(default_factory=DevicesProfile)
+    acquisition: AcquisitionProfile = field(default_factory=AcquisitionProfile)
+    spectral: SpectralProfile = field(default_factory=SpectralProfile)
+    stability: StabilityProfile = field(default_factory=StabilityProfile)
+    schedule: ScheduleProfile = field(default_factory=ScheduleProfile)
+    output: OutputProfile = field(default_factory=OutputProfile)
+    path: Optional[Path] = None
+
+
+    def resolve(self, value: str) -> Optional[Path]:
+        """
+        path from the profile, relative to the profile file; None for empty values
+        """
+        if not value:
+            return None
+        path = Path(value).expanduser()
+        if not path.is_absolute() and self.path is not None:
+            path = self.path.parent / path
+        return path
+
+
+def _build(cls, data: dict, section: str):
+    if not isinstance(data, dict):
+        raise ValueError(f"[{section}] must be a table")
+    label = f"[{section}]" if section else "profile"
+    defaults = cls()
+    names = {f.name for f in fields(cls)} - {"path"}
+    unknown = set(data) - names
+    if unknown:
+        raise ValueError(f"Unknown key(s) in {label}: {', '.join(sorted(unknown))}")
+    values = {}
+    for name, value in data.items():
+        default = getattr(defaults, name)
+        if is_dataclass(default):
+            values[name] = _build(type(default), value, f"{section}.{name}" if section else name)
+        elif type(value) is type(default):
+            values[name] = value
+        elif type(default) is float and type(value) is int: # TOML "50" for a float setting
+            values[name] = float(value)
+        else:
+            raise ValueError(f"{label} {name} must be {type(default).__name__}, got {value!r}")
+    return cls(**values)
+
+
+def _check_bands(bands: dict) -> dict:
+    checked = {}
+    for name, limits in bands.items():
+        if name in RESERVED_NAMES:
+            raise ValueError(f"[spectral.bands] {name} is reserved, use another band name")
+        if (not isinstance(limits, list) or len(limits) != 2
+                or not all(type(limit) in (int, float) for limit in limits) or limits[0] >= limits[1]):
+            raise ValueError(f"[spectral.bands] {name} must be [lower, upper] in nm, got {limits!r}")
+        checked[name] = (float(limits[0]), float(limits[1]))
+    return checked
+
+
+def load_profile(path) -> RunProfile:
+    path = Path(path)
+    with open(path, "rb") as f:
+        data = tomllib.load(f)
+    profile = _build(RunProfile, data, "")
+    profile.path = path
+    if profile.schedule.heater_range not in ("HIGH", "MEDIUM", "LOW"):
+        raise ValueError(f"[schedule] heater_range must be HIGH, MEDIUM or LOW, got {profile.schedule.heater_range}")
+    if profile.schedule.heater_output not in (1, 2):
+        raise ValueError(f"[schedule] heater_output must be 1 or 2, got {profile.schedule.heater_output}")
+    profile.spectral.bands = _check_bands(profile.spectral.bands)
+    ratio = profile.spectral.ratio
+    if ratio and (len(ratio) != 2 or any(name not in profile.spectral.bands for name in ratio)):
+        raise ValueError(f"[spectral] ratio must name two bands of [spectral.bands], got {ratio!r}")
+    if profile.stability.spectral_window <= 0:
+        raise ValueError("[stability] spectral_window must be positive")
+    return profile
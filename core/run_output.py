@@ -0,0 +1,131 @@
+from pathlib import Path
+from datetime import datetime
+from typing import Optional
+import numpy as np
+from core.csv_export import export_spectrum, export_run_wide, DEFAULT_PRECISION
+from core.run_reader import CalibrationRun
+import json
+import time
+import csv
+import os
+import logging
+
+ENCODING = "utf-8"
+FRAME_DTYPE = np.dtype("<f8")
+INDEX_DTYPE = np.dtype([
+    ("timestamp", "<f8"), # unix time [s]
+    ("setpoint", "<f8"),
+    ("temperature_A", "<f8"),
+    ("temperature_B", "<f8"),
+])
+
+
+def default_run_name() -> str:
+    now = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return f"{now}_DLT-calibration"
+
+
+class RunOutput:
+    """
+    Files of one calibration run:
+    <folder>/<name>.csv (temperatures per setpoint), <folder>/spectra/<setpoint>K.csv, <folder>/<name>_temperature_log/
+    and <folder>/<name>_frames/ with binary frames for memory-mapped reading (see core.run_reader):
+    metadata.json, wavelength.npy, frames.bin (float64 rows of n_pixels), index.bin (INDEX_DTYPE records)
+    """
+    def __init__(self, folder, name: Optional[str] = None, csv_precision: int = DEFAULT_PRECISION):
+        self.folder = Path(folder)
+        self.name = default_run_name() if name is None else name
+        self.csv_precision = csv_precision # decimals in spectrum CSV files
+        self.csv_path = self.folder / f"{self.name}.csv"
+        self.spectra_path = self.folder / "spectra"
+        self.spectra_path.mkdir(parents=True, exist_ok=True)
+        self.frames_path = self.folder / f"{self.name}_frames"
+        self.metadata = {"name": self.name, "created": datetime.now().isoformat(timespec="seconds")}
+        self.n_pixels = None
+
+
+    @property
+    def temperature_log_path(self) -> Path:
+        return self.folder / f"{self.name}_temperature_log"
+
+
+    def update_metadata(self, **info) -> None:
+        self.metadata.update(info)
+        if self.frames_path.exists():
+            self._write_metadata()
+
+
+    def _write_metadata(self) -> None:
+        with open(self.frames_path / "metadata.json", "w", encoding=ENCODING) as f:
+            json.dump(self.metadata, f, indent=2)
+
+
+    def append_frame(self, setpoint: float, wavelength, intensity,
+                     temperature_A: float = float("nan"), temperature_B: float = float("nan")) -> int:
+        """
+        append one frame to frames.bin and its record to index.bin, returns the frame number
+        """
+        intensity = np.ascontiguousarray(intensity, dtype=FRAME_DTYPE)
+        if self.n_pixels is None:
+            self.frames_path.mkdir(parents=True, exist_ok=True)
+            self.n_pixels = intensity.size
+            np.save(self.frames_path / "wavelength.npy", np.asarray(wavelength, dtype=FRAME_DTYPE))
+            self.metadata.update(
+                n_pixels=self.n_pixels,
+                frame_dtype=FRAME_DTYPE.str,
+                index_dtype=[(name, INDEX_DTYPE[name].str) for name in INDEX_DTYPE.names],
+                temperature_log=self.temperature_log_path.name,
+            )
+            self._write_metadata()
+        elif intensity.size != self.n_pixels:
+            raise ValueError(f"Frame has {intensity.size} pixels, run has {self.n_pixels}")
+        with open(self.frames_path / "frames.bin", "ab") as f:
+            f.write(intensity.tobytes())
+        record = np.array([(time.time(), setpoint, temperature_A, temperature_B)], dtype=INDEX_DTYPE)
+        # index is written after the frame, so a partially written frame is never referenced
+        with open(self.frames_path / "index.bin", "ab") as f:
+            f.write(record.tobytes())
+            frame_number = f.tell() // INDEX_DTYPE.itemsize - 1
+        return frame_number
+
+
+    def save_spectrum(self, setpoint: float, wavelength, intensity,
+                      temperature_A: float = float("nan"), temperature_B: float = float("nan")) -> Path:
+        self.append_frame(setpoint, wavelength, intensity, temperature_A, temperature_B)
+        filepath = self.spectra_path / f"{setpoint:.1f}K.csv"
+        export_spectrum(filepath, wavelength, intensity, self.csv_precision)
+        logging.info(f"Saved spectrum to {filepath}")
+        return filepath
+
+
+    def write_temperatures(self, setpoint: float, temperature_A: float, temperature_B: float) -> None:
+        temp_dict = {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "setpoint": setpoint,
+            "temperature_A": temperature_A,
+            "temperature_B": temperature_B,
+        }
+        # if file not existing
+        if not os.path.exists(self.csv_path):
+            with open(self.csv_path, "w", newline="", encoding=ENCODING) as f_csv:
+                writer = csv.DictWriter(f_csv, fieldnames=temp_dict.keys())
+                writer.writeheader()
+        # add data
+        with open(self.csv_path, "a", newline="", encoding=ENCODING) as f_csv:
+            writer = csv.DictWriter(f_csv, fieldnames=temp_dict.keys())
+            writer.writerow(temp_dict)
+
+
+    def export_wide_csv(self, path=None) -> Path:
+        """
+        all frames of the run in one CSV (wavelength + one column per frame), default <folder>/<name>_wide.csv
+        """
+        path = self.folder / f"{self.name}_wide.csv" if path is None else Path(path)
+        export_run_wide(CalibrationRun(self.frames_path), path, self.csv_precision)
+        logging.info(f"Exported run to {path}")
+        return path
+
+
+    def record(self, setpoint: float, wavelength, intensity, temperature_A: float, temperature_B: float) -> None:
+        self.save_spectrum(setpoint, wavelength, intensity, temperature_A, temperature_B)
+        self.write_temperatures(setpoint, temperature_A, temperature_B)
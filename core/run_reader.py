@@ -0,0 +1,149 @@
+"""
+Reader for completed calibration runs (numpy only, no Qt).
+
+    run = open_run("path/to/20250101_120000_DLT-calibration_frames")
+    rows = run.select(temperature=(100, 150))
+    spectra = run.frames[rows] # only these rows are read from disk
+    for index, block in run.iter_chunks(256):
+        ...
+"""
+from pathlib import Path
+from typing import Iterator, Optional
+import json
+import numpy as np
+from core.temperature_log import load_temperature_log, LOG_DTYPE
+
+ENCODING = "utf-8"
+FRAMES_SUFFIX = "_frames"
+
+
+def find_runs(folder) -> list[Path]:
+    return sorted(path for path in Path(folder).glob(f"*{FRAMES_SUFFIX}") if (path / "metadata.json").exists())
+
+
+def open_run(path) -> "CalibrationRun":
+    """
+    path: frames directory, the run's summary .csv, or a folder containing exactly one run
+    """
+    path = Path(path)
+    if path.suffix == ".csv":
+        path = path.with_name(f"{path.stem}{FRAMES_SUFFIX}")
+    elif not (path / "metadata.json").exists():
+        runs = find_runs(path)
+        if len(runs) != 1:
+            raise FileNotFoundError(f"Expected exactly one run in {path}, found {len(runs)}")
+        path = runs[0]
+    return CalibrationRun(path)
+
+
+class CalibrationRun:
+    """
+    Frames of a run as a read-only memory map; nothing is loaded until it is sliced.
+    frames: (n_frames, n_pixels) float64, index: structured array (timestamp, setpoint, temperature_A, temperature_B)
+    """
+    def __init__(self, frames_path):
+        self.path = Path(frames_path)
+        with open(self.path / "metadata.json", encoding=ENCODING) as f:
+            self.metadata = json.load(f)
+        self.name = self.metadata["name"]
+        self.n_pixels = int(self.metadata["n_pixels"])
+        self.wavelength = np.load(self.path / "wavelength.npy", mmap_mode="r")
+        frame_dtype = np.dtype(self.metadata["frame_dtype"])
+        index_dtype = np.dtype([tuple(field) for field in self.metadata["index_dtype"]])
+        index = self._map(self.path / "index.bin", index_dtype, None)
+        frames = self._map(self.path / "frames.bin", frame_dtype, self.n_pixels)
+        # a run interrupted mid-write may hold one more frame than index records
+        n_frames = min(len(index), len(frames))
+        self.index = index[:n_frames]
+        self.frames = frames[:n_frames]
+        self._temperature_log = None
+
+
+    @staticmethod
+    def _map(path: Path, dtype: np.dtype, row_length: Optional[int]) -> np.ndarray:
+        item_size = dtype.itemsize * (row_length or 1)
+        size = path.stat().st_size if path.exists() else 0
+        count = size // item_size
+        shape = (count,) if row_length is None else (count, row_length)
+        if count == 0:
+            return np.zeros(shape, dtype=dtype)
+        return np.memmap(path, dtype=dtype, mode="r", shape=shape)
+
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        return self.index["timestamp"]
+
+
+    @property
+    def setpoints(self) -> np.ndarray:
+        return self.index["setpoint"]
+
+
+    @property
+    def temperatures(self) -> np.ndarray:
+        return self.index["temperature_A"]
+
+
+    @property
+    def temperature_log(self) -> np.ndarray:
+        """
+        full temperature time series of the run (memory-mapped when consolidated)
+        """
+        if self._temperature_log is None:
+            log_path = self.path.parent / self.metadata.get("temperature_log", f"{self.name}_temperature_log")
+            self._temperature_log = load_temperature_log(log_path) if log_path.exists() else np.zeros(0, dtype=LOG_DTYPE)
+        return self._temperature_log
+
+
+    def select(self, temperature: Optional[tuple[float, float]] = None, setpoint: Optional[tuple[float, float]] = None,
+               time: Optional[tuple[float, float]] = None, sensor: str = "temperature_A") -> np.ndarray:
+        """
+        frame numbers whose sensor temperature / setpoint / timestamp lie within the given closed ranges
+        """
+        mask = np.ones(len(self.index), dtype=bool)
+        for column, bounds in ((sensor, temperature), ("setpoint", setpoint), ("timestamp", time)):
+            if bounds is not None:
+                values = self.index[column]
+                mask &= (values >= bounds[0]) & (values <= bounds[1])
+        return np.flatnonzero(mask)
+
+
+    def read(self, rows) -> np.ndarray:
+        """
+        copy the selected frames into memory (sorted access keeps reads sequential)
+        """
+        rows = np.asarray(rows)
+        order = np.argsort(rows, kind="stable")
+        out = np.empty((rows.size, self.n_pixels), dtype=self.frames.dtype)
+        out[order] = self.frames[rows[order]]
+        return out
+
+
+    def iter_chunks(self, chunk_size: int = 256, rows=None) -> Iterator[tuple[np.ndarray, np.ndarray]]:
+        """
+        yield (frame numbers, frames) blocks of at most chunk_size for out-of-core processing
+        """
+        if rows is None:
+            for start in range(0, len(self), chunk_size):
+                stop = min(start + chunk_size, len(self))
+                yield np.arange(start, stop), np.asarray(self.frames[start:stop])
+        else:
+            rows = np.asarray(rows)
+            for start in range(0, rows.size, chunk_size):
+                block = rows[start:start + chunk_size]
+                yield block, self.read(block)
+
+
+    def temperature_log_between(self, start: float, stop: float) -> np.ndarray:
+        """
+        temperature log rows with start <= timestamp <= stop (a closed range, like select())
+        """
+        timestamps = self.temperature_log["timestamp"]
+        lower = np.searchsorted(timestamps, start, side="left")
+        upper = np.searchsorted(timestamps, stop, side="right")
+        return self.temperature_log[lower:upper]
@@ -0,0 +1,144 @@
+import numpy as np
+from dataclasses import dataclass
+from typing import Optional
+
+# names of the whole-frame features; band integrals share the features() dict and may not take them
+RESERVED_NAMES = ("peak_wavelength", "mean_wavelength", "integral", "band_ratio")
+
+
+@dataclass(frozen=True)
+class Band:
+    name: str
+    start: int # first pixel index (inclusive)
+    stop: int # last pixel index (exclusive)
+    weights: np.ndarray # trapezoid d(lambda) weights for pixels start:stop
+    weighted_wavelength: np.ndarray # wavelength * weights for centroid
+
+
+class SpectralAxis:
+    """
+    Wavelength axis of a connected spectrometer with everything that can be precomputed once per connection:
+    trapezoid integration weights, pixel index ranges of user-defined bands and optional non-linearity correction.
+    Per-frame feature extraction reduces to dot products over slices.
+    """
+    def __init__(self, wavelength: np.ndarray, nonlinearity_coefficients: Optional[np.ndarray] = None):
+        self.wavelength = np.ascontiguousarray(wavelength, dtype=np.float64)
+        if self.wavelength.ndim != 1 or self.wavelength.size < 2:
+            raise ValueError("wavelength must be a 1D array with at least two pixels")
+        # trapezoid rule: w_i = (lambda_{i+1} - lambda_{i-1}) / 2, half intervals at both edges
+        dl = np.diff(self.wavelength)
+        self.weights = np.empty_like(self.wavelength)
+        self.weights[0] = dl[0] / 2
+        self.weights[-1] = dl[-1] / 2
+        self.weights[1:-1] = (dl[:-1] + dl[1:]) / 2
+        self.weighted_wavelength = self.wavelength * self.weights
+        self.nonlinearity_coefficients = None
+        if nonlinearity_coefficients is not None and len(nonlinearity_coefficients) > 0:
+            # stored highest order first for np.polyval
+            self.nonlinearity_coefficients = np.asarray(nonlinearity_coefficients, dtype=np.float64)[::-1].copy()
+        self.bands: dict[str, Band] = {}
+        self.ratio: Optional[tuple[str, str]] = None # (numerator, denominator) band names for "band_ratio"
+
+
+    def __len__(self) -> int:
+        return self.wavelength.size
+
+
+    def index_range(self, lower: float, upper: float) -> tuple[int, int]:
+        """
+        pixel index range [start, stop) covering lower <= wavelength <= upper
+        """
+        if lower > upper:
+            lower, upper = upper, lower
+        start = int(np.searchsorted(self.wavelength, lower, side="left"))
+        stop = int(np.searchsorted(self.wavelength, upper, side="right"))
+        if stop - start < 1:
+            raise ValueError(f"Band {lower}-{upper} nm contains no pixels")
+        return start, stop
+
+
+    def add_band(self, name: str, lower: float, upper: float) -> Band:
+        if name in RESERVED_NAMES:
+            raise ValueError(f"Band name {name} is reserved for a frame feature")
+        start, stop = self.index_range(lower, upper)
+        band = Band(
+            name=name,
+            start=start,
+            stop=stop,
+            weights=self.weights[start:stop].copy(),
+            weighted_wavelength=self.weighted_wavelength[start:stop].copy(),
+        )
+        self.bands[name] = band
+        return band
+
+
+    def remove_band(self, name: str) -> None:
+        self.bands.pop(name, None)
+        if self.ratio is not None and name in self.ratio:
+            self.ratio = None
+
+
+    def set_ratio(self, ratio: Optional[tuple[str, str]]) -> None:
+        """
+        report numerator / denominator band integral as "band_ratio" in features() (None: off)
+        """
+        if ratio is not None:
+            missing = [name for name in ratio if name not in self.bands]
+            if missing:
+                raise ValueError(f"Ratio band(s) not defined: {', '.join(missing)}")
+            ratio = tuple(ratio)
+        self.ratio = ratio
+
+
+    def correct(self, intensity: np.ndarray) -> np.ndarray:
+        """
+        apply non-linearity correction (no-op when coefficients are not available)
+        """
+        if self.nonlinearity_coefficients is None:
+            return intensity
+        return intensity / np.polyval(self.nonlinearity_coefficients, intensity)
+
+
+    def peak_wavelength(self, intensity: np.ndarray) -> float:
+        return float(self.wavelength[np.argmax(intensity)])
+
+
+    def integral(self, intensity: np.ndarray) -> float:
+        return float(self.weights @ intensity)
+
+
+    def centroid(self, intensity: np.ndarray) -> float:
+        return float(self.weighted_wavelength @ intensity) / float(self.weights @ intensity)
+
+
+    def band_integral(self, name: str, intensity: np.ndarray) -> float:
+        band = self.bands[name]
+        return float(band.weights @ intensity[band.start:band.stop])
+
+
+    def band_centroid(self, name: str, intensity: np.ndarray) -> float:
+        band = self.bands[name]
+        segment = intensity[band.start:band.stop]
+        return float(band.weighted_wavelength @ segment) / float(band.weights @ segment)
+
+
+    def band_ratio(self, numerator: str, denominator: str, intensity: np.ndarray) -> float:
+        return self.band_integral(numerator, intensity) / self.band_integral(denominator, intensity)
+
+
+    def features(self, intensity: np.ndarray) -> dict[str, float]:
+        """
+        peak, centroid and integral of the whole frame, integral of every defined band and the band ratio if set
+        """
+        total = float(self.weights @ intensity)
+        features = {
+            "peak_wavelength": self.peak_wavelength(intensity),
+            "mean_wavelength": float(self.weighted_wavelength @ intensity) / total if total != 0 else float("nan"),
+            "integral": total,
+        }
+        for name, band in self.bands.items():
+            features[name] = float(band.weights @ intensity[band.start:band.stop])
+        if self.ratio is not None:
+            numerator, denominator = self.ratio
+            features["band_ratio"] = features[numerator] / features[denominator] if features[denominator] else float("nan")
+        return features
@@ -0,0 +1,180 @@
+from collections import deque
+import numpy as np
+
+
+class ThermalStability:
+    """
+    Rolling window of sensor A/B readings.
+    Stable when the window is full, sensor A is within tol_A of the target and both standard deviations are below std_tol.
+    """
+    def __init__(self, window: int = 60, tol_A: float = 0.02, std_tol: float = 0.01):
+        self.window = window
+        self.tol_A = tol_A
+        self.std_tol = std_tol
+        self._buffer_A = deque(maxlen=window)
+        self._buffer_B = deque(maxlen=window)
+
+
+    def append(self, temperature_A: float, temperature_B: float) -> None:
+        self._buffer_A.append(temperature_A)
+        self._buffer_B.append(temperature_B)
+
+
+    def clear(self) -> None:
+        self._buffer_A.clear()
+        self._buffer_B.clear()
+
+
+    def is_stable(self, target_A: float) -> bool:
+        if len(self._buffer_A) < self.window:
+            return False
+        std_A = np.std(np.fromiter(self._buffer_A, dtype=np.float64, count=len(self._buffer_A)))
+        std_B = np.std(np.fromiter(self._buffer_B, dtype=np.float64, count=len(self._buffer_B)))
+        return (abs(self._buffer_A[-1] - target_A) < self.tol_A) and (std_A < self.std_tol) and (std_B < self.std_tol)
+
+
+class SpectralDrift:
+    """
+    Rolling least-squares drift (slope per minute) of spectral observables over the last `duration` seconds.
+    Running sums of t, t^2, y and t*y are updated on insert/evict, so each frame costs O(number of observables).
+    The window is a time span, so its meaning does not change with integration time or polling interval; drifts are
+    reported once the observables have been followed for the whole window.
+
+    A threshold has to sit above the slope noise of its observable: n frames with frame-to-frame scatter sigma spread
+    evenly over T minutes give a slope scatter of about sigma * sqrt(12 / n) / T. A centroid with 0.005 nm scatter
+    polled every 0.5 s scatters by 0.0005 nm/min over the default 120 s, but by 0.02 nm/min over 10 s.
+
+    thresholds: absolute drift limits per minute, relative_thresholds: limits on slope / mean per minute
+    """
+    def __init__(self, duration: float = 120.0, thresholds: dict = None, relative_thresholds: dict = None,
+                 max_samples: int = 4096):
+        self.duration = duration # sec
+        self.max_samples = max_samples # ring capacity, the oldest frames are dropped early beyond this
+        self.thresholds = {"mean_wavelength": 0.01} if thresholds is None else dict(thresholds) # nm/min
+        self.relative_thresholds = {} if relative_thresholds is None else dict(relative_thresholds)
+        self.names = list(self.thresholds) + [name for name in self.relative_thresholds if name not in self.thresholds]
+        self._times = np.zeros(max_samples)
+        self._values = np.zeros((max_samples, len(self.names)))
+        self.clear()
+
+
+    def clear(self) -> None:
+        self._count = 0
+        self._start = 0 # ring index of the oldest sample
+        self._first = None # timestamp of the first sample since clear()
+        self._latest = None
+        self._t0 = None
+        self._y0 = np.zeros(len(self.names)) # offsets keep the running sums well conditioned
+        self._reset_sums()
+
+
+    def _reset_sums(self) -> None:
+        self._sum_t = 0.0
+        self._sum_tt = 0.0
+        self._sum_y = np.zeros(len(self.names))
+        self._sum_ty = np.zeros(len(self.names))
+
+
+    def _evict_oldest(self) -> None:
+        old_t = self._times[self._start]
+        old_y = self._values[self._start]
+        self._sum_t -= old_t
+        self._sum_tt -= old_t * old_t
+        self._sum_y -= old_y
+        self._sum_ty -= old_t * old_y
+        self._start = (self._start + 1) % self.max_samples
+        self._count -= 1
+
+
+    def _rebase(self, timestamp: float) -> None:
+        """
+        move the time origin to the oldest sample and recompute the sums (keeps t small in long sessions)
+        """
+        order = (self._start + np.arange(self._count)) % self.max_samples
+        shift = self._times[order[0]] if self._count else (timestamp - self._t0) / 60.0
+        self._times[order] -= shift
+        self._t0 += shift * 60.0
+        self._reset_sums()
+        t, y = self._times[order], self._values[order]
+        self._sum_t = float(t.sum())
+        self._sum_tt = float(t @ t)
+        self._sum_y = y.sum(axis=0)
+        self._sum_ty = t @ y
+
+
+    def append(self, timestamp: float, observables: dict) -> None:
+        values = np.array([observables.get(name, np.nan) for name in self.names], dtype=np.float64)
+        if not np.all(np.isfinite(values)):
+            return
+        if self._t0 is None:
+            self._t0 = timestamp
+            self._first = timestamp
+            self._y0 = values.copy()
+        elif timestamp - self._t0 > 10 * self.duration:
+            self._rebase(timestamp)
+        t = (timestamp - self._t0) / 60.0 # minutes
+        values -= self._y0
+        horizon = t - self.duration / 60.0
+        while self._count and self._times[self._start] < horizon:
+            self._evict_oldest()
+        if self._count == self.max_samples:
+            self._evict_oldest()
+        index = (self._start + self._count) % self.max_samples
+        self._times[index] = t
+        self._values[index] = values
+        self._sum_t += t
+        self._sum_tt += t * t
+        self._sum_y += values
+        self._sum_ty += t * values
+        self._count += 1
+        self._latest = timestamp
+
+
+    @property
+    def covered(self) -> bool:
+        """
+        observables have been followed for the whole window since the last clear()
+        """
+        return self._first is not None and self._latest - self._first >= self.duration
+
+
+    def drifts(self) -> dict[str, float]:
+        """
+        slope of every observable per minute (nan until the window is covered)
+        """
+        n = self._count
+        denominator = n * self._sum_tt - self._sum_t ** 2
+        if not self.covered or n < 3 or denominator <= 0:
+            return {name: float("nan") for name in self.names}
+        slopes = (n * self._sum_ty - self._sum_t * self._sum_y) / denominator
+        return dict(zip(self.names, slopes.tolist()))
+
+
+    def is_stable(self) -> bool:
+        drifts = self.drifts()
+        means = dict(zip(self.names, (self._y0 + self._sum_y / max(self._count, 1)).tolist()))
+        for name, limit in self.thresholds.items():
+            if not abs(drifts[name]) < limit:
+                return False
+        for name, limit in self.relative_thresholds.items():
+            if means[name] == 0 or not abs(drifts[name] / means[name]) < limit:
+                return False
+        return True
+
+
+class Readiness:
+    """
+    Record when both the sensor temperatures and the spectral observables have stopped drifting.
+    """
+    def __init__(self, thermal: ThermalStability, spectral: SpectralDrift):
+        self.thermal = thermal
+        self.spectral = spectral
+
+
+    def clear(self) -> None:
+        self.thermal.clear()
+        self.spectral.clear()
+
+
+    def is_ready(self, target_A: float) -> bool:
+        return self.thermal.is_stable(target_A) and self.spectral.is_stable()
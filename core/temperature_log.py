@@ -0,0 +1,163 @@
+import numpy as np
+from pathlib import Path
+from typing import Optional
+import logging
+
+LOG_DTYPE = np.dtype([
+    ("timestamp", "f8"), # unix time [s]
+    ("temperature_A", "f8"),
+    ("temperature_B", "f8"),
+    ("heater_output_1", "f8"),
+    ("heater_output_2", "f8"),
+    ("setpoint", "f8"),
+    ("heater_range", "i1"), # Model335.HeaterRange value, -1 if unknown
+])
+CHUNK_PATTERN = "chunk_*.npy"
+CONSOLIDATED_NAME = "temperature_log.npy"
+MERGED_DIRECTORY = "merged_chunks" # chunks already contained in the merged file, deleted after the merge
+ENCODING = "utf-8"
+
+
+class TemperatureLogger:
+    """
+    Buffered temperature time-series logger.
+    Rows are appended into a preallocated structured array and flushed as chunked .npy files once the block is full.
+    close() merges all chunks into one file that load_temperature_log() can memory-map.
+    """
+    def __init__(self, directory, block_size: int = 4096):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._buffer = np.zeros(block_size, dtype=LOG_DTYPE)
+        self._count = 0
+        self._chunk_index = len(list(self.directory.glob(CHUNK_PATTERN)))
+        self.rows = 0
+        self.closed = False
+
+
+    def append(self, timestamp: float, temperature_A: float, temperature_B: float,
+               heater_output_1: float = np.nan, heater_output_2: float = np.nan,
+               setpoint: float = np.nan, heater_range: int = -1) -> None:
+        if self.closed:
+            raise RuntimeError("TemperatureLogger is closed")
+        self._buffer[self._count] = (
+            timestamp, temperature_A, temperature_B, heater_output_1, heater_output_2, setpoint, heater_range
+        )
+        self._count += 1
+        self.rows += 1
+        if self._count == self._buffer.size:
+            self.flush()
+
+
+    def flush(self) -> None:
+        if self._count == 0:
+            return
+        path = self.directory / f"chunk_{self._chunk_index:06d}.npy"
+        np.save(path, self._buffer[:self._count])
+        self._chunk_index += 1
+        self._count = 0
+
+
+    def close(self) -> Optional[Path]:
+        """
+        flush remaining rows and merge chunks into a single file
+        """
+        if self.closed:
+            return None
+        self.flush()
+        self.closed = True
+        try:
+            return consolidate(self.directory)
+        except Exception as e:
+            logging.error(f"Failed to consolidate temperature log: {e}")
+            return None
+
+
+    def export_csv(self, path, precision: int = 6) -> None:
+        export_csv(self.directory, path, precision)
+
+
+def consolidate(directory) -> Optional[Path]:
+    """
+    merge all chunks (and an earlier consolidated file) into CONSOLIDATED_NAME.
+    Chunks are moved aside before the merged file replaces the target and deleted afterwards, so an interrupted or
+    failed merge never leaves rows that are counted twice; calling it again finishes or repeats the merge.
+    """
+    directory = Path(directory)
+    target = directory / CONSOLIDATED_NAME
+    tmp = directory / f"{CONSOLIDATED_NAME}.tmp"
+    merged = directory / MERGED_DIRECTORY
+    _finish_merge(target, tmp, merged)
+    chunks = sorted(directory.glob(CHUNK_PATTERN))
+    if not chunks:
+        return target if target.exists() else None
+    parts = [np.load(target, mmap_mode="r")] if target.exists() else []
+    parts += [np.load(chunk, mmap_mode="r") for chunk in chunks]
+    total = sum(part.size for part in parts)
+    out = np.lib.format.open_memmap(tmp, mode="w+", dtype=LOG_DTYPE, shape=(total,))
+    position = 0
+    for part in parts:
+        out[position:position + part.size] = part
+        position += part.size
+    out.flush()
+    # every map has to be released before the files can be moved or replaced on Windows
+    del out, part, parts
+    merged.mkdir(exist_ok=True)
+    moved = []
+    try:
+        for chunk in chunks:
+            chunk.replace(merged / chunk.name)
+            moved.append(chunk)
+    except OSError:
+        for chunk in moved:
+            (merged / chunk.name).replace(chunk)
+        tmp.unlink(missing_ok=True)
+        raise
+    _finish_merge(target, tmp, merged)
+    return target
+
+
+def _finish_merge(target: Path, tmp: Path, merged: Path) -> None:
+    """
+    complete a merge whose chunks were already moved aside: the merged file holds their rows
+    """
+    if not merged.is_dir():
+        return
+    leftovers = list(merged.iterdir())
+    if leftovers and tmp.exists():
+        tmp.replace(target)
+    for chunk in leftovers:
+        try:
+            chunk.unlink()
+        except OSError as e:
+            logging.warning(f"Failed to remove merged chunk {chunk}: {e}")
+    try:
+        merged.rmdir()
+    except OSError:
+        pass
+
+
+def load_temperature_log(directory, mmap: bool = True) -> np.ndarray:
+    """
+    load a temperature log directory as a structured array (memory-mapped when consolidated)
+    """
+    directory = Path(directory)
+    target = directory / CONSOLIDATED_NAME
+    _finish_merge(target, directory / f"{CONSOLIDATED_NAME}.tmp", directory / MERGED_DIRECTORY)
+    chunks = sorted(directory.glob(CHUNK_PATTERN))
+    parts = []
+    if target.exists():
+        parts.append(np.load(target, mmap_mode="r" if mmap else None))
+    parts += [np.load(chunk) for chunk in chunks]
+    if not parts:
+        return np.zeros(0, dtype=LOG_DTYPE)
+    if len(parts) == 1:
+        return parts[0]
+    return np.concatenate(parts)
+
+
+def export_csv(directory, path, precision: int = 6) -> None:
+    data = load_temperature_log(directory)
+    columns = [data[name].astype(np.float64) for name in LOG_DTYPE.names]
+    fmt = ["%.3f"] + [f"%.{precision}g"] * (len(columns) - 2) + ["%d"]
+    np.savetxt(path, np.column_stack(columns) if columns[0].size else np.zeros((0, len(columns))),
+               fmt=fmt, delimiter=",", header=",".join(LOG_DTYPE.names), comments="", encoding=ENCODING)
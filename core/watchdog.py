@@ -0,0 +1,165 @@
+import queue
+import threading
+import time
+from typing import Callable, Optional
+
+
+class CallTimeout(TimeoutError):
+    pass
+
+
+class _Job:
+    def __init__(self, func: Callable, args: tuple, kwargs: dict):
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.on_late = None # called with the result when it arrives after the deadline
+        self._lock = threading.Lock()
+
+
+    def run(self) -> None:
+        try:
+            self.result = self.func(*self.args, **self.kwargs)
+        except BaseException as e:
+            self.error = e
+        finally:
+            with self._lock:
+                self.done.set()
+                on_late = self.on_late
+        if on_late is not None and self.error is None:
+            on_late(self.result)
+
+
+    def expire(self, on_late: Optional[Callable]) -> bool:
+        """
+        mark the job as timed out, False if it finished in the meantime
+        """
+        with self._lock:
+            if self.done.is_set():
+                return False
+            self.on_late = on_late
+            return True
+
+
+class _Worker(threading.Thread):
+    def __init__(self, name: str):
+        super().__init__(name=name, daemon=True)
+        self.jobs = queue.SimpleQueue()
+        self.abandoned = False
+
+
+    def run(self) -> None:
+        while not self.abandoned:
+            job = self.jobs.get()
+            if job is None:
+                return
+            job.run()
+
+
+class DeadlineCaller:
+    """
+    Runs blocking driver calls on a daemon worker thread with a deadline.
+    A call that misses its deadline raises CallTimeout; the hung worker is abandoned (it exits whenever the driver
+    returns), so neither the caller nor interpreter shutdown can block on it. Drivers are not thread-safe, so later
+    calls raise CallTimeout right away while the abandoned call is still inside the driver, until it returns or
+    recover() has opened a replacement device.
+    """
+    def __init__(self, name: str, timeout: float = 5.0):
+        self.name = name
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._worker = None
+        self._hung: list[_Worker] = [] # abandoned workers, possibly still inside the driver
+        self.hung_workers = 0
+
+
+    @property
+    def busy(self) -> bool:
+        """
+        an abandoned call has not returned from the driver yet
+        """
+        self._hung = [worker for worker in self._hung if worker.is_alive()]
+        return bool(self._hung)
+
+
+    def call(self, func: Callable, *args, timeout: Optional[float] = None, **kwargs):
+        with self._lock:
+            if self.busy:
+                raise CallTimeout(f"{self.name}: previous call still hung in the driver")
+            job = self._run(func, args, kwargs, timeout)
+        if job.error is not None:
+            raise job.error
+        return job.result
+
+
+    def recover(self, func: Callable, *args, timeout: Optional[float] = None, on_late: Optional[Callable] = None,
+                **kwargs):
+        """
+        run func (reopening the device) on a fresh worker even while an abandoned call is hung.
+        On success the hung call keeps the old device handle to itself and later calls are accepted again.
+        on_late: called on the worker with the result of a func that returns after its deadline (to close a device
+        nobody will use)
+        """
+        with self._lock:
+            job = self._run(func, args, kwargs, timeout, on_late)
+            if job.error is None:
+                self._hung = []
+        if job.error is not None:
+            raise job.error
+        return job.result
+
+
+    def _run(self, func: Callable, args: tuple, kwargs: dict, timeout: Optional[float],
+             on_late: Optional[Callable] = None) -> _Job:
+        timeout = self.timeout if timeout is None else timeout
+        job = _Job(func, args, kwargs)
+        if self._worker is None:
+            self._worker = _Worker(f"{self.name}-worker")
+            self._worker.start()
+        worker = self._worker
+        worker.jobs.put(job)
+        if not job.done.wait(timeout) and job.expire(on_late):
+            worker.abandoned = True
+            worker.jobs.put(None)
+            self._worker = None
+            self._hung.append(worker)
+            self.hung_workers += 1
+            raise CallTimeout(f"{self.name}: {getattr(func, '__name__', func)} did not return within {timeout} s")
+        return job
+
+
+    def close(self) -> None:
+        with self._lock:
+            if self._worker is not None:
+                self._worker.jobs.put(None)
+                self._worker = None
+
+
+class Backoff:
+    """
+    exponential backoff delays: initial, initial*factor, ... capped at maximum
+    """
+    def __init__(self, initial: float = 1.0, maximum: float = 60.0, factor: float = 2.0):
+        self.initial = initial
+        self.maximum = maximum
+        self.factor = factor
+        self.reset()
+
+
+    def reset(self) -> None:
+        self._delay = self.initial
+        self.next_attempt = 0.0 # monotonic time
+
+
+    def ready(self) -> bool:
+        return time.monotonic() >= self.next_attempt
+
+
+    def failed(self) -> float:
+        delay = self._delay
+        self.next_attempt = time.monotonic() + delay
+        self._delay = min(self._delay * self.factor, self.maximum)
+        return delay
@@ -0,0 +1,201 @@
+from core.orchestrator import Orchestrator, SpectrometerAdapter, Model335Adapter
+from core.run_output import RunOutput
+from core.temperature_log import TemperatureLogger
+from core.spectral_axis import SpectralAxis
+from core.monitor_server import MonitorServer
+from core.autotune import TuningTable
+from core.despike import SpikeRejector
+from core.profile import RunProfile, ScheduleProfile, load_profile
+from core.device_cache import DeviceCache
+from core.stability import ThermalStability, SpectralDrift
+
+import argparse
+import asyncio
+import functools
+import numpy as np
+import logging
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+BAUD_RATE = 57600 # fixed baud rate for Model 335
+
+
+def find_lakeshore_model335():
+    import serial.tools.list_ports
+    ports = serial.tools.list_ports.comports()
+    for port in ports:
+        if "Lake Shore Model 335" in port.description:
+            return port
+
+
+def profile_defaults(profile: RunProfile) -> dict:
+    """
+    command line defaults from a run profile (explicit options still win)
+    """
+    return {
+        "folder": profile.resolve(profile.output.folder),
+        "start": profile.schedule.start,
+        "stop": profile.schedule.stop,
+        "step": profile.schedule.step,
+        "integration_time": profile.acquisition.integration_time_us,
+        "heater_output": profile.schedule.heater_output,
+        "heater_range": profile.schedule.heater_range,
+        "frames_per_point": profile.acquisition.frames_per_point,
+        "ramp_rate": profile.schedule.ramp_rate,
+        "polling_interval": profile.acquisition.polling_interval,
+        "settle_timeout": profile.stability.settle_timeout or None,
+        "spike_threshold": profile.acquisition.spike_threshold,
+        "dark_frames": profile.acquisition.dark_frames,
+        "csv_precision": profile.output.csv_precision,
+        "wide_csv": profile.output.wide_csv,
+        "tuning": profile.resolve(profile.schedule.tuning),
+        "spectrometer_serial": profile.devices.spectrometer.serial_number or None,
+        "controller_serial": profile.devices.temperature_controller.serial_number or None,
+        "controller_port": profile.devices.temperature_controller.com_port or None,
+    }
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run a DLT calibration sweep without the GUI")
+    parser.add_argument("folder", nargs="?", default=None, help="folder to save data and spectra")
+    parser.add_argument("--profile", default=None, help="run profile (toml), options given here override it")
+    parser.add_argument("--start", type=float, default=50.0, help="start temperature [K]")
+    parser.add_argument("--stop", type=float, default=310.0, help="stop temperature [K]")
+    parser.add_argument("--step", type=float, default=10.0, help="temperature step [K]")
+    parser.add_argument("--integration-time", type=int, default=300, help="integration time [us]")
+    parser.add_argument("--heater-output", type=int, default=1, choices=[1, 2])
+    parser.add_argument("--heater-range", default="HIGH", choices=["HIGH", "MEDIUM", "LOW"])
+    parser.add_argument("--frames-per-point", type=int, default=1, help="spectra averaged per setpoint")
+    parser.add_argument("--ramp-rate", type=float, default=0.0, help="setpoint ramp [K/min], 0 = off")
+    parser.add_argument("--polling-interval", type=float, default=0.5, help="polling interval [sec]")
+    parser.add_argument("--settle-timeout", type=float, default=None, help="max wait per setpoint [sec]")
+    parser.add_argument("--dark-frames", type=int, default=0,
+                        help="capture a dark averaged over this many frames before the sweep (asks to block the light), "
+                             "0 = raw counts without non-linearity correction")
+    parser.add_argument("--spike-threshold", type=float, default=6.0, help="spike rejection threshold [MAD sigma], 0 = off")
+    parser.add_argument("--csv-precision", type=int, default=4, help="decimals in spectrum CSV files")
+    parser.add_argument("--wide-csv", action="store_true", help="also export all spectra of the run into one CSV")
+    parser.add_argument("--tuning", default=None, help="PID / heater range table from core.autotune (json)")
+    parser.add_argument("--spectrometer-serial", default=None, help="spectrometer serial number (default: first found)")
+    parser.add_argument("--controller-serial", default=None, help="Model335 serial number")
+    parser.add_argument("--controller-port", default=None, help="Model335 COM port")
+    parser.add_argument("--refresh-cache", action="store_true", help="query spectrometer capabilities again")
+    parser.add_argument("--monitor-port", type=int, default=None, help="serve live data to monitor clients on this port")
+    parser.add_argument("--monitor-host", default="127.0.0.1", help="use 0.0.0.0 to accept clients from other PCs")
+    profile_path = parser.parse_known_args(argv)[0].profile
+    profile = RunProfile() if profile_path is None else load_profile(profile_path)
+    if profile_path is not None:
+        parser.set_defaults(**profile_defaults(profile))
+    args = parser.parse_args(argv)
+    if args.folder is None:
+        parser.error("folder is required (argument or [output] folder in the profile)")
+    args.stability = profile.stability
+    args.spectral = profile.spectral
+    return args
+
+
+async def forward_to_monitor(orchestrator: Orchestrator, monitor: MonitorServer, wavelength: np.ndarray) -> None:
+    queue = orchestrator.subscribe()
+    try:
+        while True:
+            kind, timestamp, payload = await queue.get()
+            if kind == "temperature":
+                monitor.publish_temperature(payload, orchestrator.setpoint)
+            elif kind == "spectrum":
+                monitor.publish_spectrum(wavelength, payload)
+            elif kind == "progress":
+                monitor.publish_progress(*payload)
+    finally:
+        orchestrator.unsubscribe(queue)
+
+
+async def capture_dark(orchestrator: Orchestrator, frames: int) -> None:
+    orchestrator.start()
+    await asyncio.to_thread(input, "Block the light source and press Enter to capture the dark spectrum ")
+    await orchestrator.capture_dark(frames)
+    await asyncio.to_thread(input, "Unblock the light source and press Enter to start the sweep ")
+
+
+async def run(args) -> None:
+    from seabreeze.spectrometers import Spectrometer
+    from lakeshore import Model335
+
+    if args.controller_serial or args.controller_port:
+        model335 = Model335(baud_rate=BAUD_RATE, serial_number=args.controller_serial, com_port=args.controller_port)
+    else:
+        port = find_lakeshore_model335()
+        if port is None:
+            raise RuntimeError("No Lakeshore device found")
+        model335 = Model335(com_port=port.device, baud_rate=BAUD_RATE)
+    if args.spectrometer_serial:
+        device = Spectrometer.from_serial_number(args.spectrometer_serial)
+    else:
+        device = Spectrometer.from_first_available()
+    capabilities = DeviceCache(refresh=args.refresh_cache).capabilities(device)
+    # reopened by the orchestrator after repeated failures
+    spectrometer = SpectrometerAdapter(device, open_driver=functools.partial(Spectrometer.from_serial_number,
+                                                                             capabilities.serial_number))
+    port = getattr(getattr(model335, "device_serial", None), "port", None)
+    reopen = None if port is None else functools.partial(Model335, com_port=port, baud_rate=BAUD_RATE)
+    controller = Model335Adapter(model335, output=args.heater_output, open_driver=reopen)
+    await spectrometer.set_integration_time(args.integration_time)
+    wavelength = capabilities.wavelength
+
+    run_output = RunOutput(args.folder, csv_precision=args.csv_precision)
+    logger = TemperatureLogger(run_output.temperature_log_path)
+    tuning = None if args.tuning is None else TuningTable.load(args.tuning)
+    spike_rejector = SpikeRejector(threshold=args.spike_threshold) if args.spike_threshold > 0 else None
+    stability = args.stability
+    spectral_axis = SpectralAxis(wavelength, capabilities.nonlinearity_coefficients)
+    for name, (lower, upper) in args.spectral.bands.items():
+        spectral_axis.add_band(name, lower, upper)
+    relative_thresholds = {}
+    if args.spectral.ratio:
+        spectral_axis.set_ratio(tuple(args.spectral.ratio))
+        relative_thresholds["band_ratio"] = stability.band_ratio_drift
+    orchestrator = Orchestrator(spectrometer, controller, polling_interval=args.polling_interval,
+                                stability=ThermalStability(stability.window, stability.tol_A, stability.std_tol),
+                                spectral_axis=spectral_axis,
+                                spectral_drift=SpectralDrift(stability.spectral_window,
+                                                             thresholds={"mean_wavelength": stability.mean_wavelength_drift},
+                                                             relative_thresholds=relative_thresholds),
+                                tuning=tuning, spike_rejector=spike_rejector,
+                                nonlinearity_correction=args.spectral.nonlinearity_correction)
+
+    def record(setpoint: float, spectrum: np.ndarray, temperature: dict) -> None:
+        run_output.record(setpoint, wavelength, spectrum, temperature["temperature_A"], temperature["temperature_B"])
+
+    temperatures = ScheduleProfile(start=args.start, stop=args.stop, step=args.step).temperatures()
+    tasks = [asyncio.create_task(orchestrator.log_temperatures(logger))]
+    monitor = None
+    if args.monitor_port is not None:
+        monitor = MonitorServer(host=args.monitor_host, port=args.monitor_port)
+        monitor.start()
+        tasks.append(asyncio.create_task(forward_to_monitor(orchestrator, monitor, wavelength)))
+    try:
+        if args.dark_frames > 0:
+            await capture_dark(orchestrator, args.dark_frames)
+        else:
+            logging.warning("No dark captured: spectra are saved as raw counts without non-linearity correction")
+        run_output.update_metadata(integration_time_us=args.integration_time,
+                                   dark_corrected=orchestrator.dark_corrected,
+                                   nonlinearity_corrected=orchestrator.nonlinearity_corrected)
+        await orchestrator.run_sweep(temperatures, record, heater_range=args.heater_range,
+                                     settle_timeout=args.settle_timeout, frames_per_point=args.frames_per_point,
+                                     ramp_rate=args.ramp_rate)
+        if args.wide_csv:
+            await asyncio.to_thread(run_output.export_wide_csv)
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        logger.close()
+        if monitor is not None:
+            monitor.stop()
+        await orchestrator.close()
+
+
+def main(argv=None):
+    asyncio.run(run(parse_args(argv)))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,39 +1,71 @@
 from PyQt6.QtWidgets import (
     QApplication, QWidget, QHBoxLayout, QVBoxLayout, QFormLayout, QSpinBox,
-    QPushButton, QMessageBox, QGroupBox, QLabel, QFileDialog
+    QDoubleSpinBox, QPushButton, QMessageBox, QGroupBox, QLabel, QFileDialog
 )
-from PyQt6.QtCore import QLocale, QTimer
+from PyQt6.QtCore import QLocale
 from widgets.ocean_spectrometer_widget import OceanSpectrometerWidget
 from widgets.lakeshore_model335_widget import LakeShoreModel335Widget
 from widgets.temperature_chart_widget import TemperatureChartWidget
+from widgets.event_bridge import OrchestratorBridge, spawn, notify
+from core.orchestrator import Orchestrator
+from core.temperature_log import TemperatureLogger
+from core.run_output import RunOutput
+from core.csv_export import DEFAULT_PRECISION
+from core.monitor_server import MonitorServer
+from core.autotune import TuningTable
+from core.profile import RunProfile, ScheduleProfile, load_profile
+from core.device_cache import DeviceCache
+from core.stability import ThermalStability, SpectralDrift
 
-import os
+import argparse
+import asyncio
+import qasync
 import numpy as np
-from datetime import datetime
 from pathlib import Path
-import csv
 import logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
-ENCODING = "utf-8"
 
 
-def main():
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="DLT Calibration App")
+    parser.add_argument("--monitor-port", type=int, default=None, help="serve live data to monitor clients on this port")
+    parser.add_argument("--monitor-host", default="127.0.0.1", help="use 0.0.0.0 to accept clients from other PCs")
+    parser.add_argument("--profile", default=None, help="run profile (toml): settings and devices to connect")
+    parser.add_argument("--refresh-cache", action="store_true", help="query spectrometer capabilities again")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
     app = QApplication([])
 
     QLocale.setDefault(QLocale.c())
+    # the window closing ends run(), which still has to stop the sweep and close the devices on the loop
+    app.setQuitOnLastWindowClosed(False)
+    qasync.run(run(args, app))
 
+
+async def run(args, app) -> None:
+    """
+    the GUI on the Qt event loop (qasync): the widgets share one Orchestrator, as headless.py does
+    """
     win = QWidget()
     win.setWindowTitle("DLT Calibration App")
     win.resize(1200, 1000)
 
-    polling_interval = 0.5 # sec
+    profile = RunProfile() if args.profile is None else load_profile(args.profile)
+    orchestrator = Orchestrator(polling_interval=profile.acquisition.polling_interval)
+    bridge = OrchestratorBridge(orchestrator)
 
-    spectrometer_widget = OceanSpectrometerWidget(polling_interval=polling_interval)
-    temperature_controller_widget = LakeShoreModel335Widget(polling_interval=polling_interval)
-    temperature_chart_widget = TemperatureChartWidget(temperature_controller_widget)
-    process_widget = MeasurementProcessWidget(spectrometer_widget, temperature_controller_widget)
+    spectrometer_widget = OceanSpectrometerWidget(orchestrator, bridge)
+    spectrometer_widget.device_cache = DeviceCache(refresh=args.refresh_cache)
+    temperature_controller_widget = LakeShoreModel335Widget(orchestrator, bridge)
+    temperature_chart_widget = TemperatureChartWidget(orchestrator, bridge)
+    process_widget = MeasurementProcessWidget(orchestrator, bridge, spectrometer_widget, temperature_controller_widget)
 
     spectrometer_widget.setFixedWidth(600)
+    # live check of the DLT temperature against the Model335 sensor
+    bridge.temperature.connect(spectrometer_widget.set_reference_temperature)
 
     layout = QVBoxLayout()
     sub_layout = QHBoxLayout()
@@ -44,27 +76,127 @@ def main():
     sub_layout.addLayout(subsub_layout)
     layout.addLayout(sub_layout)
     layout.addWidget(process_widget)
-    
+
+    monitor = None
+    if args.monitor_port is not None:
+        monitor = MonitorServer(host=args.monitor_host, port=args.monitor_port)
+        monitor.start()
+        connect_monitor(monitor, orchestrator, bridge, spectrometer_widget)
+
+    closed = asyncio.Event()
+    app.lastWindowClosed.connect(closed.set)
+    bridge.start()
     win.setLayout(layout)
     win.show()
-    app.exec()
+    try:
+        if args.profile is not None:
+            await apply_profile(profile, orchestrator, spectrometer_widget, temperature_controller_widget,
+                                process_widget)
+        await closed.wait()
+    finally:
+        await process_widget.stop_process()
+        temperature_chart_widget.close_log()
+        await bridge.stop()
+        await orchestrator.close()
+        if monitor is not None:
+            monitor.stop()
+
+
+def reject_profile(profile: RunProfile, parent, error: ValueError) -> None:
+    logging.error(f"Rejected profile {profile.path}: {error}")
+    notify(parent, "Error", f"Rejected profile {profile.path}:\n{error}", QMessageBox.Icon.Critical)
+
+
+async def apply_profile(profile: RunProfile, orchestrator: Orchestrator, spectrometer_widget,
+                        temperature_controller_widget, process_widget) -> None:
+    """
+    fill in the settings of a run profile and connect its devices; a profile the widgets cannot represent, or a
+    device that fails to connect, is reported and stops here
+    """
+    try:
+        process_widget.check_profile(profile)
+    except ValueError as e:
+        reject_profile(profile, process_widget, e)
+        return
+    stability = profile.stability
+    orchestrator.stability = ThermalStability(window=stability.window, tol_A=stability.tol_A,
+                                              std_tol=stability.std_tol)
+    orchestrator.spectral_drift = SpectralDrift(duration=stability.spectral_window,
+                                                thresholds={"mean_wavelength": stability.mean_wavelength_drift})
+    acquisition = profile.acquisition
+    if acquisition.spike_threshold > 0:
+        spectrometer_widget.spike_rejector.threshold = acquisition.spike_threshold
+    spectrometer_widget.spike_rejection_check.setChecked(acquisition.spike_threshold > 0)
+    spectrometer_widget.nonlinearity_check.setChecked(profile.spectral.nonlinearity_correction)
+    if acquisition.dark_frames > 0:
+        spectrometer_widget.dark_frames = acquisition.dark_frames
+    for name, (lower, upper) in profile.spectral.bands.items():
+        spectrometer_widget.set_band(name, lower, upper)
+    if profile.spectral.ratio:
+        spectrometer_widget.set_ratio_bands(tuple(profile.spectral.ratio), stability.band_ratio_drift)
+    temperature_controller_widget.heater_channel_spin.setValue(profile.schedule.heater_output)
+    temperature_controller_widget.heater_range_combo.setCurrentText(profile.schedule.heater_range)
+    process_widget.apply_profile(profile)
+
+    devices = profile.devices
+    controller = devices.temperature_controller
+    if not await temperature_controller_widget.connect_controller(serial_number=controller.serial_number,
+                                                                  com_port=controller.com_port):
+        notify(process_widget, "Error", "Failed to connect the temperature controller of the profile.",
+               QMessageBox.Icon.Critical)
+        return
+    if not await spectrometer_widget.connect_spectrometer(devices.spectrometer.serial_number):
+        notify(process_widget, "Error", "Failed to connect the spectrometer of the profile.", QMessageBox.Icon.Critical)
+        return
+    try:
+        check_spin_value(spectrometer_widget.integration_time_spin, acquisition.integration_time_us,
+                         "[acquisition] integration_time_us")
+    except ValueError as e:
+        reject_profile(profile, process_widget, e)
+        return
+    spectrometer_widget.integration_time_spin.setValue(acquisition.integration_time_us)
+    spectrometer_widget.start()
+
+
+def check_spin_value(spin, value: float, name: str) -> None:
+    """
+    raise ValueError for a value the spin box would round or clamp
+    """
+    decimals = spin.decimals() if isinstance(spin, QDoubleSpinBox) else 0
+    if not spin.minimum() <= value <= spin.maximum() or round(value, decimals) != value:
+        raise ValueError(f"{name} must be within {spin.minimum()}..{spin.maximum()} with {decimals} decimals, "
+                         f"got {value}")
+
+
+def connect_monitor(monitor, orchestrator: Orchestrator, bridge, spectrometer_widget) -> None:
+    bridge.temperature.connect(lambda timestamp, data: monitor.publish_temperature(data, orchestrator.setpoint))
+    bridge.spectrum.connect(lambda intensity: monitor.publish_spectrum(spectrometer_widget.wavelength, intensity))
+    bridge.progress.connect(monitor.publish_progress)
 
 
 class MeasurementProcessWidget(QGroupBox):
-    def __init__(self, spectrometer_widget, temperature_controller_widget, parent=None):
+    """
+    Settings and start / stop of the setpoint sweep, which Orchestrator.run_sweep drives exactly as in headless.py
+    """
+    def __init__(self, orchestrator: Orchestrator, bridge, spectrometer_widget, temperature_controller_widget,
+                 parent=None):
         super().__init__("Process", parent)
+        self.orchestrator = orchestrator
         self.spectrometer_widget = spectrometer_widget
         self.temperature_controller_widget = temperature_controller_widget
-        self.timer = None
-        self.csv_path = None
-        self.spectra_path = None
-        self.temperature_list = []
-        self.temperature_index = None
+        self.run_output = None
+        self.sweep = None # asyncio.Task of the running sweep
+        self.tuning_table = None
+        self.csv_precision = DEFAULT_PRECISION
+        self.wide_csv = False
 
         # UI elements
         self.path_label = QLabel("----------")
         self.path_btn = QPushButton("Select Save Path")
         self.path_btn.clicked.connect(self.set_save_path)
+        self.tuning_label = QLabel("no tuning table")
+        self.tuning_btn = QPushButton("Load Tuning")
+        self.tuning_btn.clicked.connect(self.load_tuning)
         self.start_temperature_spin = QSpinBox()
         self.start_temperature_spin.setRange(10, 350)
         self.start_temperature_spin.setSingleStep(5)
@@ -80,6 +212,22 @@ class MeasurementProcessWidget(QGroupBox):
         self.step_temperature_spin.setSingleStep(1)
         self.step_temperature_spin.setSuffix("K")
         self.step_temperature_spin.setValue(10)
+        self.frames_per_point_spin = QSpinBox()
+        self.frames_per_point_spin.setRange(1, 1000)
+        self.frames_per_point_spin.setValue(1)
+        self.ramp_rate_spin = QDoubleSpinBox()
+        self.ramp_rate_spin.setRange(0.0, 100.0)
+        self.ramp_rate_spin.setDecimals(1)
+        self.ramp_rate_spin.setSuffix(" K/min")
+        self.ramp_rate_spin.setSpecialValueText("OFF")
+        self.ramp_rate_spin.setValue(0.0)
+        self.settle_timeout_spin = QSpinBox()
+        self.settle_timeout_spin.setRange(0, 86400) # sec
+        self.settle_timeout_spin.setSingleStep(60)
+        self.settle_timeout_spin.setSuffix(" s")
+        self.settle_timeout_spin.setSpecialValueText("no limit")
+        self.settle_timeout_spin.setValue(0)
+        self.progress_label = QLabel("---")
         self.start_btn = QPushButton("Start Process")
         self.start_btn.setStyleSheet("background-color: green; color: white; font-weight:bold")
         self.start_btn.clicked.connect(self.toggle_start_stop)
@@ -89,167 +237,223 @@ class MeasurementProcessWidget(QGroupBox):
         form.addRow("Start Temperature:", self.start_temperature_spin)
         form.addRow("Stop Temperature:", self.stop_temperature_spin)
         form.addRow("Step:", self.step_temperature_spin)
+        form.addRow("Frames per Point:", self.frames_per_point_spin)
+        form.addRow("Setpoint Ramp:", self.ramp_rate_spin)
+        form.addRow("Settle Timeout:", self.settle_timeout_spin)
+        form.addRow("Progress:", self.progress_label)
         layout = QVBoxLayout()
         layout1 = QHBoxLayout()
         layout1.addWidget(self.path_btn)
         layout1.addWidget(self.path_label)
+        layout_tuning = QHBoxLayout()
+        layout_tuning.addWidget(self.tuning_btn)
+        layout_tuning.addWidget(self.tuning_label)
         layout2 = QHBoxLayout()
         layout2.addWidget(self.start_btn)
         layout.addLayout(form)
         layout.addLayout(layout1)
+        layout.addLayout(layout_tuning)
         layout.addLayout(layout2)
         self.setLayout(layout)
 
+        bridge.progress.connect(self.show_progress)
+
+
+    @property
+    def running(self) -> bool:
+        return self.sweep is not None
+
+
+    def check_profile(self, profile: RunProfile) -> None:
+        """
+        raise ValueError if the schedule does not fit the spin boxes exactly
+        """
+        schedule = profile.schedule
+        check_spin_value(self.start_temperature_spin, schedule.start, "[schedule] start")
+        check_spin_value(self.stop_temperature_spin, schedule.stop, "[schedule] stop")
+        check_spin_value(self.step_temperature_spin, schedule.step, "[schedule] step")
+        check_spin_value(self.ramp_rate_spin, schedule.ramp_rate, "[schedule] ramp_rate")
+        check_spin_value(self.frames_per_point_spin, profile.acquisition.frames_per_point,
+                         "[acquisition] frames_per_point")
+        check_spin_value(self.settle_timeout_spin, profile.stability.settle_timeout, "[stability] settle_timeout")
+
+
+    def apply_profile(self, profile: RunProfile) -> None:
+        """
+        profile settings into the widgets, after check_profile
+        """
+        schedule = profile.schedule
+        self.start_temperature_spin.setValue(int(schedule.start))
+        self.stop_temperature_spin.setValue(int(schedule.stop))
+        self.step_temperature_spin.setValue(int(schedule.step))
+        self.ramp_rate_spin.setValue(schedule.ramp_rate)
+        self.frames_per_point_spin.setValue(profile.acquisition.frames_per_point)
+        self.settle_timeout_spin.setValue(int(profile.stability.settle_timeout))
+        self.csv_precision = profile.output.csv_precision
+        self.wide_csv = profile.output.wide_csv
+        tuning = profile.resolve(schedule.tuning)
+        if tuning is not None:
+            self.set_tuning_table(tuning)
+        folder = profile.resolve(profile.output.folder)
+        if folder is not None:
+            self.set_output_folder(folder)
+
 
     def set_save_path(self):
         folder = QFileDialog.getExistingDirectory(self, "Select Folder to Save Data and Spectra")
         if not folder:
             QMessageBox.warning(self, "Warning", "No folder selected.")
             return
-        folder_path = Path(folder)
-        now = datetime.now().strftime("%Y%m%d_%H%M%S")
-        default_name = f"{now}_DLT-calibration"
-        self.csv_path = folder_path / f"{default_name}.csv"
+        self.set_output_folder(Path(folder))
+
+
+    def set_output_folder(self, folder: Path) -> None:
         try:
-            spectra_dir = folder_path / "spectra"
-            spectra_dir.mkdir(parents=True, exist_ok=True)
-            self.spectra_path = spectra_dir
-            self.path_label.setText(str(self.csv_path))
-            logging.info(f"Save paths set: csv={self.csv_path}, spectra_dir={self.spectra_path}")
+            self.run_output = RunOutput(folder, csv_precision=self.csv_precision)
+            self.path_label.setText(str(self.run_output.csv_path))
+            logging.info(f"Save paths set: csv={self.run_output.csv_path}, spectra_dir={self.run_output.spectra_path}")
         except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to create spectra folder:\n{e}")
+            notify(self, "Error", f"Failed to create spectra folder:\n{e}", QMessageBox.Icon.Critical)
             logging.error(f"Failed to create spectra folder: {e}")
-            self.csv_path = None
-            self.spectra_path = None
+            self.run_output = None
+
+
+    def load_tuning(self):
+        """
+        PID / heater range table made by `python -m core.autotune`; only bands validated in simulation are applied
+        """
+        path, _ = QFileDialog.getOpenFileName(self, "Select Tuning Table", "", "Tuning table (*.json)")
+        if not path:
+            self.tuning_table = None
+            self.tuning_label.setText("no tuning table")
+            return
+        self.set_tuning_table(path)
+
+
+    def set_tuning_table(self, path) -> None:
+        try:
+            self.tuning_table = TuningTable.load(path)
+        except (OSError, ValueError, TypeError) as e:
+            notify(self, "Error", f"Failed to load tuning table:\n{e}", QMessageBox.Icon.Critical)
+            logging.error(f"Failed to load tuning table: {e}")
+            self.tuning_table = None
+            self.tuning_label.setText("no tuning table")
+            return
+        validated = sum(entry.validated for entry in self.tuning_table.entries)
+        self.tuning_label.setText(f"{Path(path).name} ({validated}/{len(self.tuning_table.entries)} bands validated)")
+        logging.info(f"Loaded tuning table {path}")
 
 
     def toggle_start_stop(self):
-        if self.timer is None:
+        if not self.running:
             self.start_process()
         else:
-            self.stop_process()
-    
+            spawn(self.stop_process(), "stop the process")
+
 
     def start_process(self):
         if self.spectrometer_widget.spectrometer is None:
             QMessageBox.warning(self, "Warning", "Spectrometer not connected.")
             return
+        if not self.orchestrator.polling("spectrum"):
+            QMessageBox.warning(self, "Warning", "Spectrum acquisition not started.")
+            return
         if self.temperature_controller_widget.controller is None:
             QMessageBox.warning(self, "Warning", "Temperature controller not connected.")
             return
-        if self.csv_path is None:
+        if self.run_output is None:
             QMessageBox.warning(self, "Warning", "Save path not selected.")
             return
-        
-        self.timer = QTimer(self)
-        self.timer.timeout.connect(self.record)
-        Tstart = self.start_temperature_spin.value()
-        Tstop = self.stop_temperature_spin.value()
-        Tstep = self.step_temperature_spin.value()
-        num = int(abs(Tstop - Tstart) / Tstep) + 1
-        self.temperature_list = np.linspace(Tstart, Tstop, num)
-        self.temperature_index = 0
-        try:
-            self.temperature_controller_widget.set_target(float(self.temperature_list[self.temperature_index]))
-            self.temperature_controller_widget.heater_on()
-            self.timer.start(10 * 1000) # check temperature stability every 10 sec -> 10000 ms
-        except (TypeError, Exception) as e:
-            logging.error(f"Failed to start process: {e}")
-            self.timer = None
-            return
+
+        schedule = ScheduleProfile(start=self.start_temperature_spin.value(), stop=self.stop_temperature_spin.value(),
+                                   step=self.step_temperature_spin.value())
+        temperatures = schedule.temperatures()
+        self.run_output.update_metadata(
+            spectrometer_model=self.spectrometer_widget.model_type_label.text(),
+            spectrometer_serial_number=self.spectrometer_widget.serial_number_label.text(),
+            integration_time_us=self.spectrometer_widget.integration_time_spin.value(),
+            dark_corrected=self.orchestrator.dark_corrected,
+            nonlinearity_corrected=self.orchestrator.nonlinearity_corrected,
+            setpoints=[float(t) for t in temperatures],
+        )
+        if not self.orchestrator.dark_corrected:
+            logging.warning("No dark captured: spectra are saved as raw counts without non-linearity correction")
+        self.orchestrator.tuning = self.tuning_table
         self.start_btn.setText("Stop Process")
         self.start_btn.setStyleSheet("background-color: red; color: white; font-weight:bold")
         self.spectrometer_widget.enable_widget(False)
         self.temperature_controller_widget.enable_widget(False)
-        QMessageBox.information(self, "Information", "Process Start")
+        self.tuning_btn.setEnabled(False)
+        self.sweep = spawn(self.run_process(temperatures), "run the process")
         logging.info("Process started")
 
 
-    def stop_process(self):
-        if self.timer is None:
-            return
-        self.timer.stop()
-        self.timer = None
-        self.start_btn.setText("Start Process")
-        self.start_btn.setStyleSheet("background-color: green; color: white; font-weight:bold")
-        self.temperature_list = []
-        self.temperature_index = None
-        self.spectrometer_widget.enable_widget(True)
-        self.temperature_controller_widget.enable_widget(True)
-        QMessageBox.information(self, "Information", "Process Stop")
-        logging.info("Process stopped")
-    
-
-    def go_next_temperature(self) -> None:
-        if self.timer is None:
-            return
+    async def run_process(self, temperatures: np.ndarray) -> None:
+        run_output = self.run_output
+        wavelength = self.spectrometer_widget.wavelength
         try:
-            self.temperature_index += 1
-            self.temperature_controller_widget.set_target(float(self.temperature_list[self.temperature_index]))
-        except IndexError:
-            logging.info(f"Finish scanning target temperatures")
-            self.stop_process() # index error -> stop process
-        except (TypeError, AttributeError, Exception) as e:
-            logging.error(f"Error: failed to set the target temprature, {e}")
-            self.stop_process() # index error -> stop process
-
-
-    # this is connected to timer
-    def record(self):
-        if not self.temperature_controller_widget.is_temperature_stable:
-            logging.info("Temperature not stabilized yet")
-            return
-        self.save_spectrum()
-        self.write_temperatures()
-        self.go_next_temperature()
+            temperature_logger = TemperatureLogger(run_output.temperature_log_path)
+        except OSError as e:
+            logging.error(f"Failed to create temperature log: {e}")
+            temperature_logger = None
+        log_task = None
+        if temperature_logger is not None:
+            log_task = asyncio.ensure_future(self.orchestrator.log_temperatures(temperature_logger))
 
+        def record(setpoint: float, spectrum: np.ndarray, temperature: dict) -> None:
+            run_output.record(setpoint, wavelength, spectrum, temperature["temperature_A"], temperature["temperature_B"])
 
-    def save_spectrum(self):
-        if self.timer is None:
-            return
-        spectrum_dict = self.spectrometer_widget.spectrum_dict
-        if spectrum_dict and self.spectra_path:
+        heater_range = self.temperature_controller_widget.heater_range_combo.currentText()
+        try:
+            await self.orchestrator.run_sweep(temperatures, record, heater_range=heater_range,
+                                              settle_timeout=self.settle_timeout_spin.value() or None,
+                                              frames_per_point=self.frames_per_point_spin.value(),
+                                              ramp_rate=self.ramp_rate_spin.value())
+            notify(self, "Information", "Process finished")
+        except asyncio.CancelledError:
+            notify(self, "Information", "Process Stop")
+        except asyncio.TimeoutError:
+            logging.error("Setpoint not reached within the settle timeout")
+            notify(self, "Error", "Setpoint not reached within the settle timeout.", QMessageBox.Icon.Critical)
+        except Exception as e:
+            logging.error(f"Process failed: {e}")
+            notify(self, "Error", f"Process failed:\n{e}", QMessageBox.Icon.Critical)
+        finally:
+            if log_task is not None:
+                log_task.cancel()
+                await asyncio.gather(log_task, return_exceptions=True)
+            if temperature_logger is not None:
+                temperature_logger.close()
+            self.orchestrator.tuning = None
+            self.sweep = None
+            self.start_btn.setText("Start Process")
+            self.start_btn.setStyleSheet("background-color: green; color: white; font-weight:bold")
+            self.spectrometer_widget.enable_widget(True)
+            self.temperature_controller_widget.enable_widget(True)
+            self.tuning_btn.setEnabled(True)
+            logging.info("Process stopped")
+        if self.wide_csv and run_output.n_pixels is not None:
             try:
-                temperature = self.temperature_list[self.temperature_index]
-                filename = f"{temperature:.1f}K.csv"
-                filepath = self.spectra_path / filename
-                with open(filepath, 'w', encoding=ENCODING, newline="") as f:
-                    writer = csv.DictWriter(f, fieldnames=spectrum_dict.keys())
-                    writer.writeheader()
-                    for w, i in zip(spectrum_dict["wavelength"], spectrum_dict["intensity"]):
-                        writer.writerow({"wavelength": w, "intensity": i})
-                logging.info(f"Saved spectrum to {filepath}")
+                await asyncio.to_thread(run_output.export_wide_csv)
             except Exception as e:
-                logging.error(f"Failed to save spectrum: {e}")
-                self.stop_process()
+                logging.error(f"Failed to export wide CSV: {e}")
 
 
-    def write_temperatures(self):
-        if self.timer is None:
-            return
-        try:
-            temp_A, temp_B = self.temperature_controller_widget.temperatures
-            temp_dict = {"temperature_A": temp_A, "temperature_B": temp_B}
-            # if file not existing
-            if not os.path.exists(self.csv_path):
-                with open(self.csv_path, "w", newline="", encoding=ENCODING) as f_csv:
-                    writer = csv.DictWriter(f_csv, fieldnames=temp_dict.keys())
-                    writer.writeheader()
-            # add data
-            with open(self.csv_path, "a", newline="", encoding=ENCODING) as f_csv:
-                writer = csv.DictWriter(f_csv, fieldnames=temp_dict.keys())
-                writer.writerow(temp_dict)
-        except Exception as e:
-            logging.error(f"Fail to write data to csv: {e}")
-            return
+    def show_progress(self, index: int, total: int, setpoint: float) -> None:
+        text = f"{index}/{total}" if index == total else f"{index}/{total}, next {setpoint:.1f} K"
+        self.progress_label.setText(text)
 
 
-    def __del__(self):
-        try:
-            self.timer.stop()
-        except Exception:
-            pass
-        
+    async def stop_process(self) -> None:
+        """
+        stop the sweep (heaters off) and wait until it has wound down
+        """
+        sweep = self.sweep
+        if sweep is None:
+            return
+        sweep.cancel()
+        await asyncio.gather(sweep, return_exceptions=True)
+
 
 if __name__ == "__main__":
     main()
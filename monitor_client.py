@@ -0,0 +1,39 @@
+from core.monitor_server import stream, KIND_TEMPERATURE, KIND_AXIS, KIND_SPECTRUM, KIND_PROGRESS
+
+import argparse
+import asyncio
+from datetime import datetime
+import numpy as np
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Read-only client for the DLT calibration monitor server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    return parser.parse_args(argv)
+
+
+async def run(args) -> None:
+    wavelength = np.array([])
+    async for kind, timestamp, payload in stream(args.host, args.port):
+        time_text = datetime.fromtimestamp(timestamp).strftime("%H:%M:%S")
+        if kind == KIND_TEMPERATURE:
+            print(f"{time_text} A: {payload['temperature_A']:.3f} K, B: {payload['temperature_B']:.3f} K, "
+                  f"heater: {payload['heater_output_1']:.1f}%, setpoint: {payload['setpoint']:.2f} K")
+        elif kind == KIND_AXIS:
+            wavelength = payload
+        elif kind == KIND_SPECTRUM and wavelength.size == payload.size:
+            print(f"{time_text} spectrum peak: {wavelength[np.argmax(payload)]:.2f} nm, max: {payload.max():.0f}")
+        elif kind == KIND_PROGRESS:
+            print(f"{time_text} progress: {payload['index']}/{payload['total']} ({payload['setpoint']:.1f} K)")
+
+
+def main(argv=None):
+    try:
+        asyncio.run(run(parse_args(argv)))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
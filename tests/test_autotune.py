@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+from core import autotune
+from core.temperature_log import LOG_DTYPE
+
+GAIN, TAU, OFFSET, DEAD_TIME = 200.0, 300.0, 20.0, 10.0 # K per HIGH power, s, K, s
+
+
+def plant_log(setpoints, closed_loop: bool = True, dt: float = 1.0, duration: float = 1200.0,
+              heater_range: int = 3) -> np.ndarray:
+    """
+    first-order-plus-dead-time plant under a PI controller (or with constant power per step)
+    """
+    rng = np.random.default_rng(0)
+    a = np.exp(-dt / TAU)
+    delay = int(DEAD_TIME / dt)
+    y = setpoints[0]
+    history = [(y - OFFSET) / GAIN] * (delay + 1)
+    P, Ti = 50.0, 200.0
+    integral = history[0] * 100.0 / P
+    rows = []
+    t = 0.0
+    for setpoint in setpoints:
+        for _ in range(int(duration / dt)):
+            if closed_loop:
+                error = setpoint - y
+                output = P * (error + integral)
+                if not ((output >= 100 and error > 0) or (output <= 0 and error < 0)):
+                    integral += error * dt / Ti
+                u = np.clip(output, 0.0, 100.0) / 100.0
+            else:
+                u = (setpoint - OFFSET) / GAIN
+            history.append(u)
+            y = a * y + (1 - a) * (OFFSET + GAIN * history[-1 - delay]) + rng.normal(0.0, 0.002)
+            rows.append((t, y, y, u * 100.0, 0.0, setpoint, heater_range))
+            t += dt
+    return np.array(rows, dtype=LOG_DTYPE)
+
+
+def test_fit_recovers_closed_loop_plant():
+    models = autotune.fit_steps(autotune.extract_steps(plant_log([60.0, 70.0, 80.0, 90.0])))
+    assert len(models) == 3
+    for model in models:
+        assert model.gain == pytest.approx(GAIN, rel=0.05)
+        assert model.tau == pytest.approx(TAU, rel=0.05)
+        assert model.dead_time == pytest.approx(DEAD_TIME, abs=2.0)
+        assert model.offset == pytest.approx(OFFSET, abs=2.0)
+
+
+def test_constant_heater_output_is_skipped():
+    # open loop: power is constant within every step, gain and offset cannot be separated
+    models = autotune.fit_steps(autotune.extract_steps(plant_log([60.0, 70.0, 80.0], closed_loop=False)))
+    assert len(models) == 2
+    assert all(np.isnan(model.gain) for model in models)
+    assert autotune.build_table(models) == []
+
+
+def test_unidentifiable_step_does_not_spoil_others():
+    steps = autotune.extract_steps(plant_log([60.0, 70.0, 80.0]))
+    steps += autotune.extract_steps(plant_log([60.0, 70.0], closed_loop=False))
+    models = autotune.fit_steps(steps)
+    assert [np.isfinite(model.gain) for model in models] == [True, True, False]
+
+
+def test_steps_without_heater_range_are_ignored():
+    assert autotune.extract_steps(plant_log([60.0, 70.0], heater_range=-1)) == []
+
+
+def test_validated_bands_do_not_overshoot():
+    models = autotune.fit_steps(autotune.extract_steps(plant_log([60.0, 70.0, 80.0, 110.0, 120.0])))
+    table = autotune.validate(autotune.build_table(models))
+    assert table and all(entry.validated for entry in table)
+    assert max(entry.overshoot for entry in table) <= 0.1
+
+
+def test_choose_range_uses_headroom():
+    assert autotune.choose_range(21.0, GAIN, OFFSET) == "LOW" # 0.5 % of HIGH
+    assert autotune.choose_range(30.0, GAIN, OFFSET) == "MEDIUM" # 5 %
+    assert autotune.choose_range(150.0, GAIN, OFFSET) == "HIGH"
+
+
+def test_table_round_trip(tmp_path):
+    entry = autotune.TuningEntry(lower=50.0, upper=100.0, heater_range="HIGH", P=4.0, I=3.3, D=0.0, gain=GAIN,
+                                 tau=TAU, dead_time=DEAD_TIME, offset=OFFSET, validated=True, settling_time=600.0,
+                                 overshoot=0.0)
+    rejected = autotune.TuningEntry(lower=100.0, upper=150.0, heater_range="HIGH", P=4.0, I=3.3, D=0.0, gain=GAIN,
+                                    tau=TAU, dead_time=DEAD_TIME, offset=OFFSET, validated=False,
+                                    settling_time=900.0, overshoot=0.5)
+    autotune.TuningTable([rejected, entry]).save(tmp_path / "tuning.json")
+    table = autotune.TuningTable.load(tmp_path / "tuning.json")
+    assert table.lookup(75.0) == entry
+    assert table.lookup(120.0) is None
+    assert table.lookup(120.0, validated_only=False) == rejected
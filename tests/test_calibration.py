@@ -0,0 +1,75 @@
+import numpy as np
+import pytest
+from core import calibration
+from core.run_output import RunOutput
+from core.run_reader import open_run
+
+WAVELENGTH = np.linspace(600.0, 700.0, 512)
+
+
+def spectrum(temperature: float) -> np.ndarray:
+    """
+    peak shifting by 0.05 nm/K
+    """
+    center = 640.0 + 0.05 * (temperature - 100.0)
+    return 1000.0 * np.exp(-0.5 * ((WAVELENGTH - center) / 4.0) ** 2) + 10.0
+
+
+@pytest.fixture
+def run(tmp_path):
+    rng = np.random.default_rng(0)
+    run_output = RunOutput(tmp_path, name="synthetic")
+    for temperature in np.linspace(50.0, 300.0, 60):
+        reading = temperature + rng.normal(0.0, 0.01)
+        run_output.append_frame(float(temperature), WAVELENGTH, spectrum(reading), temperature_A=reading)
+    return open_run(run_output.frames_path)
+
+
+def test_fit_recovers_temperature(run):
+    model = calibration.fit_calibration(run, calibration.Observable("centroid", [(610.0, 690.0)]), degree=2)
+    report = calibration.validate(model, run)
+    assert report["frames"] == len(run) and report["outside_range"] == 0
+    assert report["rms"] < 0.1
+
+
+def test_single_frames_at_range_ends_are_predicted(run):
+    model = calibration.fit_calibration(run, calibration.Observable("ratio", [(620.0, 640.0), (640.0, 660.0)]))
+    model.bind(run.wavelength)
+    frames = np.asarray(run.frames[:])
+    # one spectrum at a time takes a different matmul path than the batched fit
+    temperature = np.array([model.predict(frame)[0] for frame in frames])
+    assert np.isfinite(temperature).all()
+
+
+def test_rounding_at_range_ends_is_tolerated(run):
+    model = calibration.fit_calibration(run, calibration.Observable("centroid", [(610.0, 690.0)]), degree=2)
+    low, high = model.x_range
+    # a few ulps beyond the fitted extremes, as a single-frame matmul may round them
+    x = [low - 4 * np.spacing(low), high + 4 * np.spacing(high)]
+    temperature, sigma = model.predict_observable(x)
+    assert np.isfinite(temperature).all() and np.isfinite(sigma).all()
+
+
+def test_outside_range_is_nan(run):
+    model = calibration.fit_calibration(run, calibration.Observable("centroid", [(610.0, 690.0)]), degree=2)
+    low, high = model.x_range
+    temperature, sigma = model.predict_observable([low - 0.01 * model.x_scale, high + 0.01 * model.x_scale])
+    assert np.isnan(temperature).all() and np.isnan(sigma).all()
+
+
+def test_save_load_round_trip(run, tmp_path):
+    model = calibration.fit_calibration(run, calibration.Observable("ratio", [(620.0, 640.0), (640.0, 660.0)]))
+    loaded = calibration.load_calibration(model.save(tmp_path / "model.npz"))
+    assert loaded.observable == model.observable
+    assert loaded.x_range == model.x_range
+    assert loaded.metadata == model.metadata
+    frames = np.asarray(run.frames[:])
+    np.testing.assert_array_equal(loaded.bind(run.wavelength).predict(frames)[0],
+                                  model.bind(run.wavelength).predict(frames)[0])
+
+
+def test_observable_validation():
+    with pytest.raises(ValueError):
+        calibration.Observable("ratio", [(600.0, 650.0)])
+    with pytest.raises(ValueError):
+        calibration.Observable("peak")
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+from core import csv_export
+
+
+def printf(data: np.ndarray, precision: int) -> bytes:
+    return "".join(",".join(f"%.{precision}f" % value for value in row) + "\n" for row in data).encode("utf-8")
+
+
+@pytest.mark.parametrize("precision", [0, 1, 2, 4, 6])
+def test_random_values_match_printf(precision):
+    rng = np.random.default_rng(precision)
+    data = rng.uniform(-70000, 70000, (500, 3))
+    data[:, 1] = rng.normal(0, 1e-3, 500)
+    assert csv_export.format_rows(data, precision) == printf(data, precision)
+
+
+@pytest.mark.parametrize("precision", [0, 1, 2, 3, 4])
+def test_half_way_values_match_printf(precision):
+    # k + 0.5 in the last digit: exact binary ties, values just off a tie and the products that round onto one
+    values = (np.arange(-2000, 2000) + 0.5) / 10.0 ** precision
+    data = np.column_stack([values, np.nextafter(values, np.inf), np.nextafter(values, -np.inf)])
+    assert csv_export.format_rows(data, precision) == printf(data, precision)
+
+
+def test_negative_zero_keeps_sign():
+    data = np.array([[-0.0, -1e-9, 0.0, -0.00004, 0.00004]])
+    assert csv_export.format_rows(data, 4) == b"-0.0000,-0.0000,0.0000,-0.0000,0.0000\n"
+    assert csv_export.format_rows(data, 4) == printf(data, 4)
+
+
+def test_non_finite_and_large_values_fall_back():
+    data = np.array([[np.nan, 1.5], [np.inf, -np.inf], [1e300, -2.5]])
+    assert csv_export.format_rows(data, 2) == printf(data, 2)
+
+
+def test_write_csv(tmp_path):
+    path = csv_export.write_csv(tmp_path / "spectrum.csv", {"wavelength": [500.0, 500.5], "intensity": [1.0, -2.25]},
+                                precision=1, chunk_rows=1)
+    assert path.read_text(encoding="utf-8") == "wavelength,intensity\n500.0,1.0\n500.5,-2.2\n"
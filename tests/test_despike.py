@@ -0,0 +1,107 @@
+import numpy as np
+import pytest
+from core.despike import SpikeRejector
+
+
+def frames(n: int, n_pixels: int = 1024, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    return 1000.0 + rng.normal(0.0, 3.0, (n, n_pixels))
+
+
+def test_spike_replaced_by_median():
+    rejector = SpikeRejector(window=5)
+    history = frames(6)
+    for frame in history[:5]:
+        assert rejector.process(frame.copy()) == 0
+    frame = history[5].copy()
+    frame[100] += 5000.0
+    assert rejector.process(frame) == 1
+    assert rejector.last_spikes[100] and rejector.last_spikes.sum() == 1
+    # median of the history plus the local baseline (median deviation of the neighbours, within the noise)
+    assert frame[100] == pytest.approx(np.median(history[:5, 100]), abs=3.0)
+    assert rejector.rejected_pixels == 1 and rejector.rejected_frames == 1
+
+
+def test_no_rejection_before_three_frames():
+    rejector = SpikeRejector()
+    for frame in frames(2):
+        frame[10] += 5000.0
+        assert rejector.process(frame) == 0
+    assert not rejector.ready
+
+
+def test_broad_change_is_kept():
+    rejector = SpikeRejector(window=5)
+    for frame in frames(5):
+        rejector.process(frame)
+    changed = frames(1, seed=1)[0] + 500.0 # the whole spectrum moved (temperature step)
+    original = changed.copy()
+    assert rejector.process(changed) == 0
+    np.testing.assert_array_equal(changed, original)
+
+
+def test_spike_replaced_in_changed_frame():
+    rejector = SpikeRejector(window=5)
+    for frame in frames(5):
+        rejector.process(frame)
+    changed = frames(1, seed=1)[0] + 500.0
+    changed[300] += 5000.0
+    assert rejector.process(changed) == 1
+    assert changed[300] == pytest.approx(1500.0, abs=30.0) # median shifted by the local baseline
+
+
+@pytest.mark.parametrize("level, sigma", [(1000.0, 20.0), (200.0, 14.0), (50000.0, 100.0)])
+def test_detection_and_false_positive_rates(level, sigma):
+    # noise above min_sigma: the noise estimate, not its floor, sets the limit
+    rng = np.random.default_rng(0)
+    rejector = SpikeRejector(window=5, threshold=6.0)
+    n_frames, n_pixels = 300, 2048
+    detected = false_positives = 0
+    for index in range(n_frames):
+        frame = level + rng.normal(0.0, sigma, n_pixels)
+        pixel = rng.integers(n_pixels)
+        frame[pixel] += 3000.0
+        rejector.process(frame)
+        if rejector.ready:
+            spikes = rejector.last_spikes.copy()
+            detected += spikes[pixel]
+            spikes[pixel] = False
+            false_positives += np.count_nonzero(spikes)
+    checked = n_frames - 3
+    assert detected >= 0.95 * checked
+    assert false_positives <= 1e-4 * checked * n_pixels
+
+
+def test_moving_narrow_line_is_kept():
+    rng = np.random.default_rng(0)
+    rejector = SpikeRejector(window=5)
+    pixels = np.arange(1024.0)
+    replaced = 0
+    for index in range(100):
+        clean = 500.0 + 20000.0 * np.exp(-0.5 * ((pixels - 500.0 - 0.05 * index) / 2.0) ** 2)
+        replaced += rejector.process(clean + rng.normal(0.0, np.sqrt(clean + 100.0)))
+    assert replaced <= 5
+
+
+def test_clear_forgets_history():
+    rejector = SpikeRejector()
+    for frame in frames(5):
+        rejector.process(frame)
+    rejector.clear()
+    assert not rejector.ready
+    frame = frames(1, seed=2)[0]
+    frame[0] += 5000.0
+    assert rejector.process(frame) == 0
+
+
+def test_pixel_count_change_reallocates():
+    rejector = SpikeRejector()
+    for frame in frames(5):
+        rejector.process(frame)
+    assert rejector.process(frames(1, n_pixels=512)[0]) == 0
+    assert rejector.last_spikes.size == 512
+
+
+def test_window_must_hold_three_frames():
+    with pytest.raises(ValueError):
+        SpikeRejector(window=2)
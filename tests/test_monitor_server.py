@@ -0,0 +1,85 @@
+import asyncio
+import time
+import numpy as np
+import pytest
+from core.monitor_server import MonitorServer, stream, KIND_TEMPERATURE, KIND_AXIS, KIND_SPECTRUM, KIND_PROGRESS
+
+WAVELENGTH = np.linspace(500.0, 700.0, 64)
+
+
+@pytest.fixture
+def server():
+    server = MonitorServer(port=0, max_spectrum_rate=0) # no rate limit
+    server.start()
+    yield server
+    server.stop()
+
+
+async def wait_for_clients(server: MonitorServer, count: int) -> None:
+    for _ in range(200):
+        if server.client_count == count:
+            return
+        await asyncio.sleep(0.01)
+    raise TimeoutError(f"{count} clients did not connect")
+
+
+def test_messages_fan_out_to_every_client(server):
+    async def scenario():
+        clients = [stream(port=server.port) for _ in range(2)]
+        received = [asyncio.ensure_future(anext(client)) for client in clients]
+        await wait_for_clients(server, 2)
+        server.publish_temperature({"temperature_A": 80.0, "temperature_B": 81.0}, setpoint=80.0)
+        try:
+            return await asyncio.wait_for(asyncio.gather(*received), 5.0)
+        finally:
+            for client in clients:
+                await client.aclose()
+
+    for kind, timestamp, payload in asyncio.run(scenario()):
+        assert kind == KIND_TEMPERATURE
+        assert payload["temperature_A"] == 80.0
+        assert payload["setpoint"] == 80.0
+
+
+def test_new_client_gets_axis_and_progress(server):
+    server.publish_progress(2, 10, 70.0)
+    server.publish_spectrum(WAVELENGTH, np.ones(WAVELENGTH.size))
+
+    async def scenario():
+        client = stream(port=server.port)
+        try:
+            return [await asyncio.wait_for(anext(client), 5.0) for _ in range(2)]
+        finally:
+            await client.aclose()
+
+    (progress_kind, _, progress), (axis_kind, _, axis) = asyncio.run(scenario())
+    assert progress_kind == KIND_PROGRESS
+    assert (progress["index"], progress["total"], progress["setpoint"]) == (2, 10, 70.0)
+    assert axis_kind == KIND_AXIS
+    assert axis == pytest.approx(WAVELENGTH.astype(np.float32))
+
+
+def test_spectra_are_conflated_for_slow_reader(server):
+    async def scenario():
+        client = stream(port=server.port)
+        first = asyncio.ensure_future(anext(client))
+        await wait_for_clients(server, 1)
+        server.publish_temperature({"temperature_A": 80.0, "temperature_B": 80.0})
+        await asyncio.wait_for(first, 5.0)
+        # keep the server busy while 50 spectra and 3 readings arrive: the client cannot be served in between
+        server._call(time.sleep, 0.3)
+        for index in range(50):
+            server.publish_spectrum(WAVELENGTH, np.full(WAVELENGTH.size, float(index)))
+            if index % 20 == 0:
+                server.publish_temperature({"temperature_A": index, "temperature_B": index})
+        try:
+            return [await asyncio.wait_for(anext(client), 5.0) for _ in range(5)]
+        finally:
+            await client.aclose()
+
+    messages = asyncio.run(scenario())
+    kinds = [kind for kind, timestamp, payload in messages]
+    # every reading is kept, of the spectra only the newest is sent (after the axis it belongs to)
+    assert kinds == [KIND_TEMPERATURE] * 3 + [KIND_AXIS, KIND_SPECTRUM]
+    assert [payload["temperature_A"] for kind, timestamp, payload in messages[:3]] == [0.0, 20.0, 40.0]
+    assert messages[-1][2] == pytest.approx(np.full(WAVELENGTH.size, 49.0))
@@ -0,0 +1,288 @@
+import asyncio
+import enum
+import threading
+import numpy as np
+import pytest
+from core.orchestrator import Orchestrator, SpectrometerAdapter, Model335Adapter
+from core.spectral_axis import SpectralAxis
+from core.stability import ThermalStability
+
+N_PIXELS = 64
+
+
+class FakeSpectrometer:
+    def __init__(self, level: float = 1000.0, offset: float = 100.0):
+        self.level = level
+        self.offset = offset # dark counts
+        self.blocked = False
+        self.failing = False
+        self.integration_time = None
+        self.closed = False
+
+
+    def intensities(self) -> np.ndarray:
+        if self.failing:
+            raise OSError("device gone")
+        signal = 0.0 if self.blocked else self.level
+        return np.full(N_PIXELS, self.offset + signal)
+
+
+    def integration_time_micros(self, micros: int) -> None:
+        self.integration_time = micros
+
+
+    def close(self) -> None:
+        self.closed = True
+
+
+class FakeModel335:
+    """
+    sensors follow the setpoint at once unless stuck
+    """
+    class HeaterRange(enum.IntEnum):
+        OFF = 0
+        LOW = 1
+        MEDIUM = 2
+        HIGH = 3
+
+    def __init__(self, stuck: bool = False):
+        self.stuck = stuck
+        self.setpoint = 300.0
+        self.heater_range = self.HeaterRange.OFF
+
+
+    def get_heater_output(self, output: int) -> float:
+        return 10.0
+
+
+    def get_all_kelvin_reading(self) -> list:
+        temperature = 300.0 if self.stuck else self.setpoint
+        return [temperature, temperature]
+
+
+    def set_control_setpoint(self, output: int, value: float) -> None:
+        self.setpoint = value
+
+
+    def set_setpoint_ramp_parameter(self, output: int, ramp_enable: bool, rate_value: float) -> None:
+        pass
+
+
+    def set_heater_range(self, output: int, heater_range) -> None:
+        self.heater_range = heater_range
+
+
+    def all_heaters_off(self) -> None:
+        self.heater_range = self.HeaterRange.OFF
+
+
+class Reopener:
+    """
+    open_driver that takes `delay` seconds and keeps every device it opened
+    """
+    def __init__(self, delay: float = 0.0):
+        self.delay = delay
+        self.started = threading.Event()
+        self.opened = []
+
+
+    def __call__(self) -> FakeSpectrometer:
+        self.started.set()
+        threading.Event().wait(self.delay)
+        device = FakeSpectrometer()
+        self.opened.append(device)
+        return device
+
+
+def orchestrator_for(device, coefficients=None) -> Orchestrator:
+    axis = SpectralAxis(np.linspace(500.0, 700.0, N_PIXELS), coefficients)
+    return Orchestrator(SpectrometerAdapter(device), Model335Adapter(FakeModel335()), polling_interval=0.01,
+                        spectral_axis=axis)
+
+
+def test_raw_counts_are_not_corrected_without_dark():
+    async def scenario():
+        orchestrator = orchestrator_for(FakeSpectrometer(), coefficients=[0.5])
+        orchestrator.start()
+        try:
+            return await orchestrator.acquire(2), orchestrator
+        finally:
+            await orchestrator.stop()
+
+    spectrum, orchestrator = asyncio.run(scenario())
+    assert spectrum == pytest.approx(np.full(N_PIXELS, 1100.0))
+    assert not orchestrator.dark_corrected
+    assert not orchestrator.nonlinearity_corrected
+
+
+def test_correction_follows_dark_subtraction():
+    device = FakeSpectrometer()
+
+    async def scenario():
+        # constant correction factor 0.5: corrected = (raw - dark) / 0.5
+        orchestrator = orchestrator_for(device, coefficients=[0.5])
+        orchestrator.start()
+        try:
+            device.blocked = True
+            dark = await orchestrator.capture_dark(3)
+            device.blocked = False
+            return dark, await orchestrator.acquire(2), orchestrator
+        finally:
+            await orchestrator.stop()
+
+    dark, spectrum, orchestrator = asyncio.run(scenario())
+    assert dark == pytest.approx(np.full(N_PIXELS, 100.0))
+    assert spectrum == pytest.approx(np.full(N_PIXELS, 2000.0))
+    assert orchestrator.dark_corrected
+    assert orchestrator.nonlinearity_corrected
+
+
+def test_dark_without_coefficients_is_only_subtracted():
+    async def scenario():
+        orchestrator = orchestrator_for(FakeSpectrometer())
+        orchestrator.dark = np.full(N_PIXELS, 100.0)
+        orchestrator.start()
+        try:
+            return await orchestrator.acquire(1), orchestrator
+        finally:
+            await orchestrator.stop()
+
+    spectrum, orchestrator = asyncio.run(scenario())
+    assert spectrum == pytest.approx(np.full(N_PIXELS, 1000.0))
+    assert orchestrator.dark_corrected
+    assert not orchestrator.nonlinearity_corrected
+
+
+def sweep_orchestrator(controller: FakeModel335) -> Orchestrator:
+    return Orchestrator(SpectrometerAdapter(FakeSpectrometer()), Model335Adapter(controller), polling_interval=0.01,
+                        stability=ThermalStability(window=3))
+
+
+def test_sweep_records_every_setpoint_in_order_and_switches_heaters_off():
+    controller = FakeModel335()
+    records = []
+
+    def record(setpoint, spectrum, temperature):
+        records.append((setpoint, temperature["temperature_A"]))
+
+    async def scenario():
+        orchestrator = sweep_orchestrator(controller)
+        try:
+            await orchestrator.run_sweep([50.0, 60.0, 70.0], record, settle_timeout=5.0)
+        finally:
+            await orchestrator.close()
+        return orchestrator
+
+    orchestrator = asyncio.run(scenario())
+    assert records == [(50.0, 50.0), (60.0, 60.0), (70.0, 70.0)]
+    assert controller.heater_range == FakeModel335.HeaterRange.OFF
+    assert not orchestrator.running
+
+
+def test_failed_record_stops_sweep_with_heaters_off():
+    controller = FakeModel335()
+    records = []
+
+    def record(setpoint, spectrum, temperature):
+        if setpoint == 60.0:
+            raise OSError("disk full")
+        records.append(setpoint)
+
+    async def scenario():
+        orchestrator = sweep_orchestrator(controller)
+        try:
+            await orchestrator.run_sweep([50.0, 60.0, 70.0, 80.0, 90.0], record, settle_timeout=5.0)
+        finally:
+            await orchestrator.close()
+
+    with pytest.raises(OSError, match="disk full"):
+        asyncio.run(scenario())
+    assert records == [50.0]
+    assert controller.setpoint < 90.0
+    assert controller.heater_range == FakeModel335.HeaterRange.OFF
+
+
+def test_settle_timeout_ends_sweep_with_heaters_off():
+    controller = FakeModel335(stuck=True)
+
+    async def scenario():
+        orchestrator = sweep_orchestrator(controller)
+        try:
+            await orchestrator.run_sweep([50.0, 60.0], lambda *args: None, settle_timeout=0.2)
+        finally:
+            await orchestrator.close()
+
+    with pytest.raises(TimeoutError):
+        asyncio.run(scenario())
+    assert controller.heater_range == FakeModel335.HeaterRange.OFF
+
+
+def test_failing_spectrometer_is_reopened_with_its_integration_time():
+    device = FakeSpectrometer()
+    reopener = Reopener()
+
+    async def scenario():
+        spectrometer = SpectrometerAdapter(device, open_driver=reopener)
+        await spectrometer.set_integration_time(500)
+        orchestrator = Orchestrator(spectrometer, polling_interval=0.01, reconnect_after=2)
+        queue = orchestrator.subscribe()
+        device.failing = True
+        orchestrator.start()
+        try:
+            while (await queue.get())[0] != "reconnected":
+                pass
+            return await orchestrator.acquire(1)
+        finally:
+            await orchestrator.close()
+
+    spectrum = asyncio.run(scenario())
+    assert spectrum == pytest.approx(np.full(N_PIXELS, 1100.0))
+    assert device.closed
+    assert [opened.integration_time for opened in reopener.opened] == [500]
+
+
+def test_no_reconnect_after_disconnect():
+    reopener = Reopener()
+
+    async def scenario():
+        spectrometer = SpectrometerAdapter(FakeSpectrometer(), open_driver=reopener)
+        await spectrometer.disconnect()
+        return await spectrometer.reconnect()
+
+    assert not asyncio.run(scenario())
+    assert reopener.opened == []
+
+
+def test_device_opened_while_stopping_is_closed():
+    device = FakeSpectrometer()
+    device.failing = True
+    reopener = Reopener(delay=0.3)
+
+    async def scenario():
+        orchestrator = Orchestrator(SpectrometerAdapter(device, open_driver=reopener), polling_interval=0.01,
+                                    reconnect_after=1)
+        orchestrator.start()
+        while not reopener.started.is_set():
+            await asyncio.sleep(0.01)
+        await orchestrator.close() # cancels the poll while the reconnect is under way
+        await asyncio.sleep(0.5)
+
+    asyncio.run(scenario())
+    assert len(reopener.opened) == 1
+    assert reopener.opened[0].closed
+
+
+def test_device_of_late_reconnect_is_closed():
+    reopener = Reopener(delay=0.3)
+
+    async def scenario():
+        spectrometer = SpectrometerAdapter(FakeSpectrometer(), open_driver=reopener)
+        spectrometer.reconnect_timeout = 0.1
+        reconnected = await spectrometer.reconnect()
+        await asyncio.sleep(0.4)
+        spectrometer.close()
+        return reconnected
+
+    assert not asyncio.run(scenario())
+    assert len(reopener.opened) == 1
+    assert reopener.opened[0].closed
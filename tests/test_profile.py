@@ -0,0 +1,51 @@
+from pathlib import Path
+import pytest
+from core.profile import ScheduleProfile, load_profile
+
+EXAMPLE = Path(__file__).resolve().parent.parent / "profiles" / "example.toml"
+
+
+def write(tmp_path, text: str) -> Path:
+    path = tmp_path / "profile.toml"
+    path.write_text(text, encoding="utf-8")
+    return path
+
+
+def test_example_profile_loads():
+    profile = load_profile(EXAMPLE)
+    assert profile.path == EXAMPLE
+    assert all(isinstance(limits, tuple) for limits in profile.spectral.bands.values())
+
+
+def test_missing_keys_keep_defaults(tmp_path):
+    profile = load_profile(write(tmp_path, "[schedule]\nstart = 80\n"))
+    assert profile.schedule.start == 80.0 and isinstance(profile.schedule.start, float)
+    assert profile.schedule.stop == 310.0
+    assert profile.acquisition.integration_time_us == 300
+
+
+@pytest.mark.parametrize("text", [
+    "[schedule]\nstrat = 80\n",
+    "[schedule]\nstart = \"80\"\n",
+    "[acquisition]\nframes_per_point = 2.5\n",
+    "[schedule]\nheater_range = \"MAX\"\n",
+    "[spectral.bands]\nred = [650, 600]\n",
+    "[spectral.bands]\nintegral = [600, 650]\n",
+    "[spectral.bands]\nband_ratio = [600, 650]\n",
+    "[spectral]\nratio = [\"red\", \"blue\"]\n[spectral.bands]\nred = [600, 650]\n",
+    "[stability]\nspectral_window = 0\n",
+])
+def test_invalid_profiles_are_rejected(tmp_path, text):
+    with pytest.raises(ValueError):
+        load_profile(write(tmp_path, text))
+
+
+def test_paths_resolve_relative_to_profile(tmp_path):
+    profile = load_profile(write(tmp_path, "[output]\nfolder = \"runs\"\n"))
+    assert profile.resolve(profile.output.folder) == tmp_path / "runs"
+    assert profile.resolve(profile.schedule.tuning) is None
+
+
+def test_schedule_temperatures_include_both_ends():
+    assert list(ScheduleProfile(start=50, stop=70, step=10).temperatures()) == [50.0, 60.0, 70.0]
+    assert list(ScheduleProfile(start=70, stop=50, step=10).temperatures()) == [70.0, 60.0, 50.0]
@@ -0,0 +1,27 @@
+import json
+import numpy as np
+from core.run_output import RunOutput
+from core.run_reader import open_run
+
+
+def test_records_are_written_in_order(tmp_path):
+    run_output = RunOutput(tmp_path, name="run")
+    wavelength = np.linspace(500.0, 600.0, 8)
+    for setpoint in (50.0, 60.0, 70.0):
+        run_output.record(setpoint, wavelength, np.full(8, setpoint), setpoint, setpoint)
+    run = open_run(run_output.frames_path)
+    assert list(run.setpoints) == [50.0, 60.0, 70.0]
+    assert np.array_equal(run.frames[1], np.full(8, 60.0))
+    assert (tmp_path / "spectra").is_dir()
+    assert run_output.csv_path.exists()
+
+
+def test_metadata_set_before_first_frame_is_written(tmp_path):
+    run_output = RunOutput(tmp_path, name="run")
+    run_output.update_metadata(dark_corrected=True, nonlinearity_corrected=False)
+    run_output.record(50.0, np.linspace(500.0, 600.0, 4), np.ones(4), 50.0, 50.0)
+    with open(run_output.frames_path / "metadata.json", encoding="utf-8") as f:
+        metadata = json.load(f)
+    assert metadata["dark_corrected"] is True
+    assert metadata["nonlinearity_corrected"] is False
+    assert metadata["n_pixels"] == 4
@@ -0,0 +1,63 @@
+import numpy as np
+import pytest
+from core.run_output import RunOutput
+from core.run_reader import open_run
+from core.temperature_log import TemperatureLogger
+
+N_PIXELS = 8
+SETPOINTS = [50.0, 60.0, 70.0, 80.0, 90.0]
+
+
+@pytest.fixture
+def run_output(tmp_path):
+    run_output = RunOutput(tmp_path, name="run")
+    wavelength = np.linspace(500.0, 600.0, N_PIXELS)
+    for setpoint in SETPOINTS:
+        # sensor A 0.5 K above the setpoint, frame filled with its setpoint
+        run_output.record(setpoint, wavelength, np.full(N_PIXELS, setpoint), setpoint + 0.5, setpoint)
+    return run_output
+
+
+def test_select_uses_closed_ranges(run_output):
+    run = open_run(run_output.frames_path)
+    assert list(run.select(temperature=(60.5, 80.5))) == [1, 2, 3]
+    assert list(run.select(setpoint=(60.0, 80.0))) == [1, 2, 3]
+    assert list(run.select(temperature=(60.0, 80.0), sensor="temperature_B")) == [1, 2, 3]
+    assert list(run.select(time=(run.timestamps[0], run.timestamps[1]))) == [0, 1]
+    assert list(run.select(setpoint=(61.0, 69.0))) == []
+
+
+def test_read_keeps_requested_order(run_output):
+    run = open_run(run_output.frames_path)
+    frames = run.read([3, 0, 2])
+    assert list(frames[:, 0]) == [80.0, 50.0, 70.0]
+
+
+def test_iter_chunks_covers_every_frame_once(run_output):
+    run = open_run(run_output.frames_path)
+    chunks = list(run.iter_chunks(2))
+    assert [len(rows) for rows, block in chunks] == [2, 2, 1]
+    assert np.array_equal(np.concatenate([block for rows, block in chunks]), np.asarray(run.frames))
+    selected = list(run.iter_chunks(2, rows=[4, 1, 3]))
+    assert [list(rows) for rows, block in selected] == [[4, 1], [3]]
+    assert list(selected[0][1][:, 0]) == [90.0, 60.0]
+
+
+def test_interrupted_run_drops_frame_without_index(run_output):
+    with open(run_output.frames_path / "frames.bin", "ab") as f:
+        f.write(np.full(N_PIXELS, 100.0).tobytes()) # frame written, index record lost
+        f.write(np.zeros(N_PIXELS // 2).tobytes()) # partial frame
+    run = open_run(run_output.frames_path)
+    assert len(run) == len(SETPOINTS)
+    assert run.frames.shape == (len(SETPOINTS), N_PIXELS)
+    assert list(run.setpoints) == SETPOINTS
+
+
+def test_temperature_log_between_includes_both_ends(run_output):
+    logger = TemperatureLogger(run_output.temperature_log_path)
+    for timestamp in range(10):
+        logger.append(float(timestamp), 80.0, 80.0)
+    logger.close()
+    run = open_run(run_output.frames_path)
+    assert list(run.temperature_log_between(2.0, 5.0)["timestamp"]) == [2.0, 3.0, 4.0, 5.0]
+    assert len(run.temperature_log_between(5.5, 5.9)) == 0
@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+from core.spectral_axis import SpectralAxis
+
+
+@pytest.fixture
+def axis():
+    return SpectralAxis(np.linspace(500.0, 800.0, 301)) # 1 nm pixels
+
+
+def test_weights_integrate_constant(axis):
+    assert axis.integral(np.ones(len(axis))) == pytest.approx(300.0)
+
+
+def test_centroid_of_symmetric_peak(axis):
+    intensity = np.exp(-0.5 * ((axis.wavelength - 650.0) / 5.0) ** 2)
+    assert axis.centroid(intensity) == pytest.approx(650.0)
+    assert axis.peak_wavelength(intensity) == 650.0
+
+
+def test_band_covers_inclusive_limits(axis):
+    band = axis.add_band("red", 600.0, 650.0)
+    assert (band.start, band.stop) == (100, 151)
+    assert axis.band_integral("red", np.ones(len(axis))) == pytest.approx(band.weights.sum())
+
+
+def test_band_without_pixels_is_rejected(axis):
+    with pytest.raises(ValueError):
+        axis.add_band("outside", 900.0, 950.0)
+
+
+@pytest.mark.parametrize("name", ["integral", "peak_wavelength", "mean_wavelength", "band_ratio"])
+def test_reserved_band_names_are_rejected(axis, name):
+    with pytest.raises(ValueError):
+        axis.add_band(name, 520.0, 540.0)
+    assert name not in axis.bands
+
+
+def test_features_include_bands(axis):
+    axis.add_band("short", 500.0, 600.0)
+    axis.add_band("long", 700.0, 800.0)
+    features = axis.features(np.ones(len(axis)))
+    assert features["short"] == pytest.approx(features["long"])
+    assert features["mean_wavelength"] == pytest.approx(650.0)
+
+
+def test_correct_without_coefficients_is_noop(axis):
+    intensity = np.arange(len(axis), dtype=np.float64)
+    assert axis.correct(intensity) is intensity
+
+
+def test_correct_divides_by_polynomial(axis):
+    # coefficients are given lowest order first, as read from the spectrometer
+    corrected = SpectralAxis(axis.wavelength, [0.5, 1e-4]).correct(np.full(len(axis), 1000.0))
+    assert corrected == pytest.approx(np.full(len(axis), 1000.0 / 0.6))
+
+
+def test_band_ratio_feature(axis):
+    axis.add_band("short", 500.0, 600.0)
+    axis.add_band("long", 700.0, 800.0)
+    axis.set_ratio(("short", "long"))
+    intensity = np.where(axis.wavelength < 650.0, 2.0, 1.0)
+    assert axis.features(intensity)["band_ratio"] == pytest.approx(2.0)
+    axis.remove_band("long")
+    assert "band_ratio" not in axis.features(intensity)
+
+
+def test_ratio_needs_defined_bands(axis):
+    with pytest.raises(ValueError):
+        axis.set_ratio(("short", "long"))
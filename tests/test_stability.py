@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+from core.stability import ThermalStability, SpectralDrift, Readiness
+
+
+def feed(drift: SpectralDrift, seconds: float, interval: float, slope: float, noise: float = 0.0, seed: int = 0,
+         start: float = 0.0, extra: dict = None) -> None:
+    rng = np.random.default_rng(seed)
+    for t in np.arange(start, start + seconds, interval):
+        observables = {"mean_wavelength": 650.0 + slope * t / 60.0 + rng.normal(0.0, noise)}
+        observables.update({} if extra is None else {name: f(t) for name, f in extra.items()})
+        drift.append(t, observables)
+
+
+def test_thermal_needs_full_window_and_target():
+    stability = ThermalStability(window=5, tol_A=0.02, std_tol=0.01)
+    for _ in range(4):
+        stability.append(100.0, 100.0)
+    assert not stability.is_stable(100.0)
+    stability.append(100.0, 100.0)
+    assert stability.is_stable(100.0)
+    assert not stability.is_stable(101.0)
+
+
+def test_drift_is_nan_until_window_is_covered():
+    drift = SpectralDrift(duration=60.0)
+    feed(drift, 59.0, 0.5, slope=0.0)
+    assert np.isnan(drift.drifts()["mean_wavelength"])
+    feed(drift, 2.0, 0.5, slope=0.0, start=59.0)
+    assert drift.drifts()["mean_wavelength"] == pytest.approx(0.0)
+
+
+def test_slope_matches_least_squares():
+    drift = SpectralDrift(duration=120.0)
+    feed(drift, 300.0, 0.5, slope=0.05)
+    assert drift.drifts()["mean_wavelength"] == pytest.approx(0.05)
+    assert not drift.is_stable()
+
+
+def test_window_is_time_based():
+    # a ramp that stopped 130 s ago no longer shows up in a 120 s window, whatever the frame rate
+    for interval in (0.1, 1.0):
+        drift = SpectralDrift(duration=120.0)
+        feed(drift, 300.0, interval, slope=1.0)
+        last = 650.0 + 300.0 / 60.0
+        for t in np.arange(300.0, 430.0, interval):
+            drift.append(t, {"mean_wavelength": last})
+        assert drift.drifts()["mean_wavelength"] == pytest.approx(0.0, abs=1e-9)
+        assert drift.is_stable()
+
+
+def test_noise_below_default_threshold():
+    drift = SpectralDrift(duration=120.0, thresholds={"mean_wavelength": 0.01})
+    feed(drift, 130.0, 0.5, slope=0.0, noise=0.005)
+    assert drift.is_stable()
+
+
+def test_long_session_stays_accurate():
+    drift = SpectralDrift(duration=60.0, max_samples=256)
+    feed(drift, 3 * 3600.0, 1.0, slope=0.02)
+    assert drift.drifts()["mean_wavelength"] == pytest.approx(0.02, rel=1e-6)
+
+
+def test_relative_threshold_on_band_ratio():
+    drift = SpectralDrift(duration=60.0, relative_thresholds={"band_ratio": 0.001})
+    feed(drift, 90.0, 0.5, slope=0.0, extra={"band_ratio": lambda t: 2.0 + 0.01 * t / 60.0})
+    assert drift.drifts()["band_ratio"] == pytest.approx(0.01)
+    assert not drift.is_stable() # 0.005 per minute relative
+    drift.clear()
+    feed(drift, 90.0, 0.5, slope=0.0, extra={"band_ratio": lambda t: 2.0})
+    assert drift.is_stable()
+
+
+def test_readiness_needs_both():
+    thermal = ThermalStability(window=3)
+    spectral = SpectralDrift(duration=10.0)
+    readiness = Readiness(thermal, spectral)
+    for _ in range(3):
+        thermal.append(50.0, 50.0)
+    assert not readiness.is_ready(50.0)
+    feed(spectral, 12.0, 0.5, slope=0.0)
+    assert readiness.is_ready(50.0)
+    readiness.clear()
+    assert not readiness.is_ready(50.0)
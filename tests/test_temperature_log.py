@@ -0,0 +1,64 @@
+from pathlib import Path
+import numpy as np
+import pytest
+from core.temperature_log import TemperatureLogger, consolidate, load_temperature_log, CHUNK_PATTERN
+
+
+def write_log(directory, rows: int, block_size: int = 4, start: float = 0.0) -> TemperatureLogger:
+    logger = TemperatureLogger(directory, block_size=block_size)
+    for i in range(rows):
+        logger.append(start + i, 100.0 + i, 101.0 + i, setpoint=100.0, heater_range=3)
+    return logger
+
+
+def test_close_merges_chunks(tmp_path):
+    logger = write_log(tmp_path, 10)
+    assert logger.close() is not None
+    log = load_temperature_log(tmp_path)
+    assert np.array_equal(log["timestamp"], np.arange(10.0))
+    assert not list(tmp_path.glob(CHUNK_PATTERN))
+
+
+def test_consolidate_is_idempotent(tmp_path):
+    write_log(tmp_path, 10).close()
+    write_log(tmp_path, 6, start=10.0).close() # appends to the merged file
+    consolidate(tmp_path)
+    log = load_temperature_log(tmp_path)
+    assert np.array_equal(log["timestamp"], np.arange(16.0))
+    assert list(log["heater_range"]) == [3] * 16
+
+
+def test_failed_move_keeps_rows_once(tmp_path, monkeypatch):
+    logger = write_log(tmp_path, 10)
+    logger.flush()
+    original = Path.replace
+    calls = []
+
+    def failing_replace(self, target):
+        calls.append(self)
+        if len(calls) == 2: # second chunk cannot be moved (file locked)
+            raise PermissionError("locked")
+        return original(self, target)
+
+    monkeypatch.setattr(Path, "replace", failing_replace)
+    with pytest.raises(PermissionError):
+        consolidate(tmp_path)
+    monkeypatch.undo()
+    assert len(load_temperature_log(tmp_path)) == 10
+    consolidate(tmp_path)
+    assert np.array_equal(load_temperature_log(tmp_path)["timestamp"], np.arange(10.0))
+
+
+def test_interrupted_merge_is_finished(tmp_path):
+    logger = write_log(tmp_path, 10)
+    logger.flush()
+    # state after the chunks were moved aside but before the merged file replaced the target
+    data = load_temperature_log(tmp_path)
+    merged = tmp_path / "merged_chunks"
+    merged.mkdir()
+    with open(tmp_path / "temperature_log.npy.tmp", "wb") as f:
+        np.save(f, np.asarray(data))
+    for chunk in sorted(tmp_path.glob(CHUNK_PATTERN)):
+        chunk.replace(merged / chunk.name)
+    assert np.array_equal(load_temperature_log(tmp_path)["timestamp"], np.arange(10.0))
+    assert not merged.exists()
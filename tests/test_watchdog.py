@@ -0,0 +1,77 @@
+import threading
+import pytest
+from core.watchdog import DeadlineCaller, CallTimeout, Backoff
+
+
+def test_call_returns_result_and_raises_errors():
+    caller = DeadlineCaller("test", timeout=1.0)
+    assert caller.call(lambda x: x + 1, 1) == 2
+    with pytest.raises(ZeroDivisionError):
+        caller.call(lambda: 1 / 0)
+    caller.close()
+
+
+def test_calls_blocked_while_timed_out_call_is_hung():
+    caller = DeadlineCaller("test", timeout=0.05)
+    release = threading.Event()
+    with pytest.raises(CallTimeout):
+        caller.call(release.wait)
+    assert caller.busy
+    calls = []
+    with pytest.raises(CallTimeout):
+        caller.call(calls.append, 1) # must not reach the driver next to the hung call
+    assert calls == []
+    release.set()
+    for _ in range(100):
+        if not caller.busy:
+            break
+        threading.Event().wait(0.01)
+    assert caller.call(calls.append, 2) is None
+    assert calls == [2]
+    assert caller.hung_workers == 1
+
+
+def test_recover_replaces_hung_call():
+    caller = DeadlineCaller("test", timeout=0.05)
+    release = threading.Event()
+    with pytest.raises(CallTimeout):
+        caller.call(release.wait)
+    assert caller.recover(lambda: "new device") == "new device"
+    assert not caller.busy
+    assert caller.call(lambda: 3) == 3
+    release.set()
+
+
+def test_failed_recover_keeps_calls_blocked():
+    caller = DeadlineCaller("test", timeout=0.05)
+    release = threading.Event()
+    with pytest.raises(CallTimeout):
+        caller.call(release.wait)
+    with pytest.raises(OSError):
+        caller.recover(lambda: (_ for _ in ()).throw(OSError("not found")))
+    assert caller.busy
+    release.set()
+
+
+def test_backoff_doubles_up_to_maximum():
+    backoff = Backoff(initial=1.0, maximum=4.0)
+    assert [backoff.failed() for _ in range(4)] == [1.0, 2.0, 4.0, 4.0]
+    backoff.reset()
+    assert backoff.ready()
+
+
+def test_late_recover_result_goes_to_on_late():
+    caller = DeadlineCaller("test", timeout=0.05)
+    release = threading.Event()
+    late = []
+    with pytest.raises(CallTimeout):
+        caller.recover(lambda: release.wait() and "device", on_late=late.append)
+    release.set()
+    for _ in range(100):
+        if late:
+            break
+        threading.Event().wait(0.01)
+    assert late == ["device"]
+    assert caller.recover(lambda: "device", on_late=late.append) == "device"
+    assert late == ["device"]
+    caller.close()
@@ -0,0 +1,82 @@
+from PyQt6.QtWidgets import QMessageBox
+from PyQt6.QtCore import QObject, Qt, pyqtSignal
+import numpy as np
+import asyncio
+import logging
+
+_tasks = set() # the event loop only keeps weak references to tasks
+
+
+def spawn(coro, description: str) -> asyncio.Task:
+    """
+    run a coroutine on the GUI's event loop (qasync) from a Qt slot; a failure is logged
+    """
+    task = asyncio.ensure_future(coro)
+    _tasks.add(task)
+    task.add_done_callback(lambda done: _finished(done, description))
+    return task
+
+
+def _finished(task: asyncio.Task, description: str) -> None:
+    _tasks.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        logging.error(f"Failed to {description}: {task.exception()}")
+
+
+def notify(parent, title: str, text: str, icon=QMessageBox.Icon.Information) -> None:
+    """
+    message box that does not block: a modal exec() inside a coroutine would stall every other task
+    """
+    box = QMessageBox(icon, title, text, parent=parent)
+    box.setAttribute(Qt.WidgetAttribute.WA_DeleteOnClose)
+    box.open()
+
+
+class OrchestratorBridge(QObject):
+    """
+    Qt signals for the events of a core.orchestrator.Orchestrator that runs on the same (qasync) event loop
+    """
+    spectrum = pyqtSignal(np.ndarray) # processed frame
+    temperature = pyqtSignal(float, dict) # timestamp, reading
+    stale = pyqtSignal(str, bool) # kind, stale
+    reconnected = pyqtSignal(str) # kind
+    setpoint = pyqtSignal(float)
+    progress = pyqtSignal(int, int, float) # index, number of setpoints, next setpoint (index == number when finished)
+
+    def __init__(self, orchestrator, parent=None):
+        super().__init__(parent)
+        self.orchestrator = orchestrator
+        self._task = None
+
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = spawn(self._forward(), "forward orchestrator events")
+
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+    async def _forward(self) -> None:
+        queue = self.orchestrator.subscribe()
+        try:
+            while True:
+                kind, timestamp, payload = await queue.get()
+                if kind == "spectrum":
+                    self.spectrum.emit(payload)
+                elif kind == "temperature":
+                    self.temperature.emit(timestamp, payload)
+                elif kind == "stale":
+                    self.stale.emit(*payload)
+                elif kind == "reconnected":
+                    self.reconnected.emit(payload)
+                elif kind == "setpoint":
+                    self.setpoint.emit(payload)
+                elif kind == "progress":
+                    self.progress.emit(*payload)
+        finally:
+            self.orchestrator.unsubscribe(queue)
@@ -2,13 +2,13 @@ from PyQt6.QtWidgets import (
     QGroupBox, QPushButton, QLabel, QComboBox, QVBoxLayout, QHBoxLayout, QFormLayout,
     QSpinBox, QDoubleSpinBox, QMessageBox, QWidget
 )
-from PyQt6.QtCore import pyqtSignal
 from lakeshore import Model335
 import serial.tools.list_ports
-from widgets.base_polling_thread import BasePollingThread
-from datetime import datetime
-from collections import deque
-import numpy as np
+from core.orchestrator import Model335Adapter
+from widgets.event_bridge import spawn
+from typing import Optional
+import asyncio
+import functools
 import logging
 
 lake_shore_log = logging.getLogger("lakeshore")
@@ -20,17 +20,15 @@ BAUD_RATE = 57600 # fixed baud rate for Model 335
 
 
 class LakeShoreModel335Widget(QGroupBox):
-
-    def __init__(self, parent=None, polling_interval=0.5):
+    """
+    Connection, manual heater control and readings of the Model335; polling, stability and the sweep run in the
+    shared core.orchestrator.Orchestrator, whose events arrive through an OrchestratorBridge
+    """
+    def __init__(self, orchestrator, bridge, parent=None):
         super().__init__("Lake Shore Model335 Control", parent)
 
-        self.controller = None
-        self.polling_thread = None
-        self._polling_interval = polling_interval
-        self._last_temp_A = 0.0
-        self._last_temp_B = 0.0
-        self._buffer_A = deque(maxlen=60)
-        self._buffer_B = deque(maxlen=60)
+        self.orchestrator = orchestrator
+        self.connecting = False
 
         # UI Elements
         self.scan_port_btn = QPushButton("Scan COM Port")
@@ -47,6 +45,7 @@ class LakeShoreModel335Widget(QGroupBox):
 
         self.heater_channel_spin = QSpinBox()
         self.heater_channel_spin.setRange(1, 2)
+        self.heater_channel_spin.valueChanged.connect(self.set_output)
         self.heater_range_combo = QComboBox()
         self.heater_range_combo.addItems(["HIGH", "MEDIUM", "LOW"])
         self.heater_range_combo.setCurrentText("HIGH")
@@ -89,123 +88,122 @@ class LakeShoreModel335Widget(QGroupBox):
         layout.addWidget(self.heater_on_btn)
         layout.addWidget(self.heater_off_btn)
         self.setLayout(layout)
-    
+
+        bridge.temperature.connect(self.update_values_display)
+        bridge.stale.connect(self.set_stale)
+        bridge.setpoint.connect(self.heater_target_spin.setValue)
+
 
     def scan_com_port(self):
         self.ports_combo.clear()
         ports = serial.tools.list_ports.comports()
         for port in ports:
             self.ports_combo.addItem(f"{port.description}", port.device)
-    
+
+
+    @property
+    def controller(self) -> Optional[Model335Adapter]:
+        return self.orchestrator.controller
+
 
     def toggle_connect(self):
+        if self.connecting:
+            return
         if self.controller is None:
             # connect
             port = self.ports_combo.currentData()
             if port is None:
                 QMessageBox.warning(self, "Warning", "Please selet a COM port.")
                 return
-            try:
-                self.controller = Model335(com_port=port, baud_rate=BAUD_RATE)
-            except Exception as e:
-                logging.error(f"Failed to create Lake Shore Model 335 instance: {e}")
-                return
-            try:
-                self.scan_port_btn.setEnabled(False)
-                self.ports_combo.setEnabled(False)
-                self.connect_btn.setText("Disconnect")
-                self.serial_number_label.setText(f"Serial Number: {self.controller.query("*IDN?")}")
-            except Exception as e:
-                logging.error(e)
-                return
-            # start polling
-            try:
-                self.polling_thread = LakeShoreModel335PollingThread(self.controller, self._polling_interval, parent=self)
-                self.polling_thread.updated.connect(self.update_values_display)
-                self.polling_thread.start()
-            except Exception as e:
-                logging.error(f"Failed to start polling thread: {e}")
-                return
+            spawn(self.connect_controller(com_port=port), "connect Lake Shore Model 335")
         else:
-            # disconnect
-            if self.polling_thread is not None:
-                self.polling_thread.stop()
-                self.polling_thread = None
-            try:
-                self.controller.disconnect_usb()
-                self.controller = None
-            except Exception as e:
-                logging.error(e)
-                return
-            self.scan_port_btn.setEnabled(True)
-            self.ports_combo.setEnabled(True)
-            self.connect_btn.setText("Connect")
-    
+            spawn(self.disconnect_controller(), "disconnect Lake Shore Model 335")
+
+
+    async def disconnect_controller(self) -> None:
+        await self.orchestrator.detach("temperature")
+        self.scan_port_btn.setEnabled(True)
+        self.ports_combo.setEnabled(True)
+        self.connect_btn.setText("Connect")
+        self.control_status_label.setText("----")
+
+
+    async def connect_controller(self, serial_number: Optional[str] = None, com_port: Optional[str] = None) -> bool:
+        """
+        connect by USB serial number or COM port (first Model335 found if neither is given) and start polling
+        """
+        self.connecting = True
+        try:
+            return await self._connect(serial_number, com_port)
+        finally:
+            self.connecting = False
+
+
+    async def _connect(self, serial_number: Optional[str], com_port: Optional[str]) -> bool:
+        try:
+            controller = await asyncio.to_thread(Model335, baud_rate=BAUD_RATE, serial_number=serial_number or None,
+                                                 com_port=com_port or None)
+        except Exception as e:
+            logging.error(f"Failed to create Lake Shore Model 335 instance: {e}")
+            return False
+        port = getattr(getattr(controller, "device_serial", None), "port", com_port)
+        # reopened by the orchestrator after repeated failures
+        reopen = None if port is None else functools.partial(Model335, com_port=port, baud_rate=BAUD_RATE)
+        adapter = Model335Adapter(controller, output=self.heater_channel_spin.value(), open_driver=reopen)
+        try:
+            identification = await adapter.identify()
+            setpoint = await adapter.read_setpoint()
+        except Exception as e:
+            logging.error(f"Failed to initialize Lake Shore Model 335: {e}")
+            await adapter.disconnect()
+            return False
+        self.orchestrator.controller = adapter
+        self.orchestrator.setpoint = setpoint
+        self.orchestrator.start("temperature")
+        self.heater_target_spin.setValue(setpoint)
+        self.scan_port_btn.setEnabled(False)
+        self.ports_combo.setEnabled(False)
+        self.connect_btn.setText("Disconnect")
+        self.serial_number_label.setText(f"Serial Number: {identification}")
+        return True
+
+
+    def set_output(self, output: int) -> None:
+        if self.controller is not None:
+            self.controller.output = output
+
 
     def heater_on(self):
-        output_channel = self.heater_channel_spin.value()
-        range = self.heater_range_combo.currentText()
-        if range == "HIGH":
-            self.controller.set_heater_range(output=output_channel, heater_range=self.controller.HeaterRange.HIGH)
-        elif range == "MEDIUM":
-            self.controller.set_heater_range(output=output_channel, heater_range=self.controller.HeaterRange.MEDIUM)
-        elif range == "LOW":
-            self.controller.set_heater_range(output=output_channel, heater_range=self.controller.HeaterRange.LOW)
-    
+        if self.controller is None:
+            return
+        spawn(self.controller.heater_on(self.heater_range_combo.currentText()), "switch the heater on")
+
 
     def heater_off(self):
-        self.controller.all_heaters_off()
-    
+        if self.controller is None:
+            return
+        spawn(self.controller.heaters_off(), "switch the heaters off")
+
 
     def change_target(self):
-        target_temperature = self.heater_target_spin.value()
-        channel = self.heater_channel_spin.value()
-        self.controller.set_control_setpoint(output=channel, value=target_temperature)
-    
-
-    def set_target(self, target_temperature: float):
-        channel = self.heater_channel_spin.value()
-        self.controller.set_control_setpoint(output=channel, value=target_temperature)
-        self.heater_target_spin.setValue(target_temperature)
-    
-
-    def update_values_display(self, data: dict):
+        if self.controller is None or self.orchestrator.running:
+            return
+        spawn(self.orchestrator.go_to(self.heater_target_spin.value()), "change the target temperature")
+
+
+    def set_stale(self, kind: str, stale: bool) -> None:
+        if kind == "temperature" and stale:
+            self.control_status_label.setText("stale")
+
+
+    def update_values_display(self, timestamp: float, data: dict):
         temperatureA = float(data.get("temperature_A", float("nan")))
         temperatureB = float(data.get("temperature_B", float("nan")))
-        heater_output_1 = data["heater_output_1"]
-        heater_output_2 = data["heater_output_2"]
         self.temp_A_label.setText(f"{temperatureA:.5g} K")
         self.temp_B_label.setText(f"{temperatureB:.5g} K")
-        self.heater_output1_label.setText(f"{heater_output_1:.1f}%")
-        self.heater_output2_label.setText(f"{heater_output_2:.1f}%")
-        self._last_temp_A = temperatureA
-        self._last_temp_B = temperatureB
-        self._buffer_A.append(temperatureA)
-        self._buffer_B.append(temperatureB)
-        self.control_status_label.setText(str(self.is_temperature_stable))
-        
-    
-    @property
-    def temperatures(self) -> tuple[float, float]:
-        return self._last_temp_A, self._last_temp_B
-
-
-    def get_data_dict(self) -> dict:
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        temperatures = self.temperatures
-        return {"timestamp": timestamp, "temperature_A": temperatures[0], "temperature_B": temperatures[1]}
-    
-
-    @property
-    def is_temperature_stable(self, tol_A: float = 0.02, std_tol: float = 0.01) -> bool:
-        if len(self._buffer_A) < 60: # length of buffer
-            return False
-        target_A = self.heater_target_spin.value()
-        temps_A = np.array(self._buffer_A)
-        temps_B = np.array(self._buffer_B)
-        std_A = np.std(temps_A)
-        std_B = np.std(temps_B)
-        return (abs(self._buffer_A[-1] - target_A) < tol_A) and (std_A < std_tol) and (std_B < std_tol)
+        self.heater_output1_label.setText(f"{data['heater_output_1']:.1f}%")
+        self.heater_output2_label.setText(f"{data['heater_output_2']:.1f}%")
+        self.control_status_label.setText(str(self.orchestrator.is_temperature_stable))
 
 
     def enable_widget(self, enable: bool) -> None:
@@ -216,39 +214,3 @@ class LakeShoreModel335Widget(QGroupBox):
         self.heater_range_combo.setEnabled(enable)
         self.heater_on_btn.setEnabled(enable)
         self.heater_off_btn.setEnabled(enable)
-
-
-    def __del__(self):
-        if self.polling_thread is not None:
-            self.polling_thread.stop()
-            self.polling_thread = None
-        try:
-            self.controller.disconnect_usb()
-            self.controller = None
-        except Exception as e:
-            return
-
-
-# polling thread class
-class LakeShoreModel335PollingThread(BasePollingThread):
-    updated = pyqtSignal(dict)
-
-    def get_data(self) -> dict:
-        heater_output1 = self.controller.get_heater_output(1)
-        heater_output2 = self.controller.get_heater_output(2)
-        temperature_reading = self.controller.get_all_kelvin_reading()
-        data = {
-            "temperature_A": temperature_reading[0],
-            "temperature_B": temperature_reading[1],
-            "heater_output_1": heater_output1,
-            "heater_output_2": heater_output2 
-            # "heater_status": ... ON OFF status (bool)
-        }
-        return data
-    
-
-    def emit_data(self, data: dict) -> None:
-        self.updated.emit(data)
-
-            
-            
\ No newline at end of file
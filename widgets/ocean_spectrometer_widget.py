@@ -1,37 +1,53 @@
 from PyQt6.QtWidgets import (
     QGroupBox, QPushButton, QLabel, QVBoxLayout,
-    QSpinBox, QFormLayout
+    QSpinBox, QFormLayout, QFileDialog, QCheckBox, QMessageBox
 )
-from PyQt6.QtCore import QThread, pyqtSignal
 import pyqtgraph as pg
 import numpy as np
 import seabreeze
 seabreeze.use('cseabreeze')
 from seabreeze.spectrometers import Spectrometer
+from core.orchestrator import SpectrometerAdapter
+from core.spectral_axis import SpectralAxis
+from core.stability import SpectralDrift
+from core.calibration import load_calibration
+from core.despike import SpikeRejector
+from core.device_cache import query_capabilities
+from widgets.event_bridge import spawn
+import asyncio
+import functools
 import logging
 from typing import Optional
-import time
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
 
 class OceanSpectrometerWidget(QGroupBox):
-
-    def __init__(self, parent=None, polling_interval=0.5):
+    """
+    Connection, settings and live view of the spectrometer; polling, dark subtraction, non-linearity correction,
+    spike rejection, features and drift run in the shared core.orchestrator.Orchestrator
+    """
+    def __init__(self, orchestrator, bridge, parent=None):
         super().__init__("Ocean Optics Spectrometer Control", parent)
 
-        self.spectrometer = None
-        self.polling_thread = None
-        self._polling_interval = polling_interval
+        self.orchestrator = orchestrator
+        self.connecting = False
+        self.device_cache = None # core.device_cache.DeviceCache, capabilities of known spectrometers
         self.wavelength = np.array([])
-        self.intensity = np.array([])
-        self.dark = np.array([])
+        self.band_definitions = {} # name -> (lower, upper) in nm
+        self.ratio_bands = None # (numerator, denominator) band names
+        self.spike_rejector = SpikeRejector(window=5, threshold=6.0)
+        self.orchestrator.spike_rejector = self.spike_rejector
+        self.dark_frames = 1 # frames averaged by "Capture Dark"
+        self.calibration = None # core.calibration.CalibrationModel, bound to the current wavelength axis
+        self.dlt_temperature = (float("nan"), float("nan")) # temperature, sigma [K]
+        self.reference_temperature = float("nan") # Model335 reading of the sensor the model was fitted to
 
         self.plot_widget = pg.PlotWidget()
         self.plot_widget.setBackground("w")
         self.plot_widget.setLabel("left", "Intensity", units="counts")
         self.plot_widget.setLabel("bottom", "Wavelength", units="nm")
-        self.plot = self.plot_widget.plot(self.wavelength, self.intensity, pen="b")
+        self.plot = self.plot_widget.plot(self.wavelength, np.array([]), pen="b")
 
         # UI Elements
         self.connect_btn = QPushButton("Connect")
@@ -55,9 +71,23 @@ class OceanSpectrometerWidget(QGroupBox):
         self.dark_btn = QPushButton("Capture Dark")
         self.dark_btn.clicked.connect(self.capture_dark)
         self.dark_btn.setEnabled(False)
+        self.dark_label = QLabel("none (raw counts)")
+
+        self.spike_rejection_check = QCheckBox("Reject Spikes")
+        self.spike_rejection_check.setChecked(True)
+        self.spike_rejection_check.toggled.connect(self.set_spike_rejection)
+        self.spikes_label = QLabel("---")
+        self.nonlinearity_check = QCheckBox("Correct Non-linearity")
+        self.nonlinearity_check.setChecked(True)
+        self.nonlinearity_check.toggled.connect(self.set_nonlinearity_correction)
 
         self.peak_wavelength_label = QLabel("---")
         self.mean_wavelength_label = QLabel("---")
+        self.spectral_status_label = QLabel("---")
+        self.bands_label = QLabel("---")
+        self.dlt_temperature_label = QLabel("---")
+        self.calibration_btn = QPushButton("Load Calibration")
+        self.calibration_btn.clicked.connect(self.load_calibration)
 
         # layout
         layout = QVBoxLayout()
@@ -75,94 +105,298 @@ class OceanSpectrometerWidget(QGroupBox):
 
         layout.addWidget(self.start_btn)
         layout.addWidget(self.dark_btn)
+        layout.addWidget(self.spike_rejection_check)
+        layout.addWidget(self.nonlinearity_check)
 
         wavelength_form = QFormLayout()
+        wavelength_form.addRow("Dark:", self.dark_label)
         wavelength_form.addRow("Peak Wavelength", self.peak_wavelength_label)
         wavelength_form.addRow("Mean Wavelength", self.mean_wavelength_label)
+        wavelength_form.addRow("Band Integrals:", self.bands_label)
+        wavelength_form.addRow("Spectrum Stabilized:", self.spectral_status_label)
+        wavelength_form.addRow("Rejected Spikes:", self.spikes_label)
+        wavelength_form.addRow("DLT Temperature:", self.dlt_temperature_label)
         layout.addLayout(wavelength_form)
+        layout.addWidget(self.calibration_btn)
 
         layout.addWidget(self.plot_widget)
 
         self.setLayout(layout)
 
+        bridge.spectrum.connect(self.update_spectrum)
+        bridge.stale.connect(self.set_stale)
+
+
+    @property
+    def spectrometer(self) -> Optional[SpectrometerAdapter]:
+        return self.orchestrator.spectrometer
+
 
     def toggle_connect(self):
+        if self.connecting:
+            return
         if self.spectrometer is None:
-            try:
-                self.spectrometer = Spectrometer.from_first_available()
-                # self.spectrometer.from_first_available()
-                logging.info("Spectrometer connected")
-            except (seabreeze.cseabreeze._wrapper.SeaBreezeError, TypeError, TimeoutError, RuntimeError, OSError) as e:
-                logging.error(f"Failed to connect spectrometer: {e}")
-                return
-            try: # initialize spectrometer
-                self.model_type_label.setText(self.spectrometer.model)
-                self.serial_number_label.setText(self.spectrometer.serial_number)
-                min_integration_time, max_integration_time = self.spectrometer.integration_time_micros_limits
-                self.integration_time_spin.setRange(min_integration_time, max_integration_time)
-                self.connect_btn.setText("Disconnect")
-                self.integration_time_spin.setEnabled(True)
-                self.start_btn.setEnabled(True)
-                self.dark_btn.setEnabled(True)
-                self.wavelength = self.spectrometer.wavelengths()
-                self.intensity = np.zeros_like(self.wavelength)
-                self.dark = np.zeros_like(self.wavelength)
-            except (TypeError, TimeoutError, RuntimeError, OSError, Exception) as e:
-                logging.error(f"Failed to initialize spectrometer: {e}")
+            spawn(self.connect_spectrometer(), "connect the spectrometer")
         else:
-            if not self.polling_thread is None:
-                self.polling_thread.stop()
-                self.polling_thread = None
-            self.spectrometer = None
-            self.model_type_label.setText("---")
-            self.serial_number_label.setText("---")
-            self.connect_btn.setText("Connect")
-            self.integration_time_spin.setEnabled(False)
-            self.start_btn.setEnabled(False)
-            self.dark_btn.setEnabled(False)
-            self.start_btn.setText("Start")
-            logging.info("Spectrometer disconnected")
-    
+            spawn(self.disconnect_spectrometer(), "disconnect the spectrometer")
+
+
+    async def disconnect_spectrometer(self) -> None:
+        await self.orchestrator.detach("spectrum")
+        self.orchestrator.spectral_axis = None
+        self.orchestrator.dark = None
+        self.dark_label.setText("none (raw counts)")
+        self.model_type_label.setText("---")
+        self.serial_number_label.setText("---")
+        self.connect_btn.setText("Connect")
+        self.integration_time_spin.setEnabled(False)
+        self.start_btn.setEnabled(False)
+        self.dark_btn.setEnabled(False)
+        self.start_btn.setText("Start")
+        logging.info("Spectrometer disconnected")
+
+
+    async def connect_spectrometer(self, serial_number: Optional[str] = None) -> bool:
+        """
+        connect the given spectrometer (first available if None); capabilities come from device_cache when known
+        """
+        self.connecting = True
+        try:
+            return await self._connect(serial_number)
+        finally:
+            self.connecting = False
+
+
+    async def _connect(self, serial_number: Optional[str]) -> bool:
+        try:
+            if serial_number:
+                device = await asyncio.to_thread(Spectrometer.from_serial_number, serial_number)
+            else:
+                device = await asyncio.to_thread(Spectrometer.from_first_available)
+            logging.info("Spectrometer connected")
+        except (seabreeze.cseabreeze._wrapper.SeaBreezeError, TypeError, TimeoutError, RuntimeError, OSError) as e:
+            logging.error(f"Failed to connect spectrometer: {e}")
+            return False
+        adapter = SpectrometerAdapter(device)
+        try: # initialize spectrometer
+            if self.device_cache is None:
+                capabilities = await asyncio.to_thread(query_capabilities, device)
+            else:
+                capabilities = await asyncio.to_thread(self.device_cache.capabilities, device)
+            # reopened by the orchestrator after repeated failures
+            adapter.open_driver = functools.partial(Spectrometer.from_serial_number, capabilities.serial_number)
+            min_integration_time, max_integration_time = capabilities.integration_time_limits
+            self.integration_time_spin.setRange(min_integration_time, max_integration_time)
+            await adapter.set_integration_time(self.integration_time_spin.value())
+            spectral_axis = SpectralAxis(capabilities.wavelength, capabilities.nonlinearity_coefficients)
+        except (TypeError, TimeoutError, RuntimeError, OSError, Exception) as e:
+            logging.error(f"Failed to initialize spectrometer: {e}")
+            await adapter.disconnect()
+            return False
+        self.model_type_label.setText(capabilities.model)
+        self.serial_number_label.setText(capabilities.serial_number)
+        self.connect_btn.setText("Disconnect")
+        self.integration_time_spin.setEnabled(True)
+        self.start_btn.setEnabled(True)
+        self.dark_btn.setEnabled(True)
+        self.wavelength = capabilities.wavelength
+        self.spike_rejector.clear()
+        self.orchestrator.dark = None # a dark belongs to one device and integration time
+        self.dark_label.setText("none (raw counts)")
+        self.orchestrator.spectral_axis = spectral_axis
+        self.orchestrator.spectrometer = adapter
+        self.nonlinearity_check.setEnabled(spectral_axis.nonlinearity_coefficients is not None)
+        for name, (lower, upper) in self.band_definitions.items():
+            self.add_axis_band(name, lower, upper)
+        if self.ratio_bands is not None:
+            self.set_ratio_bands(self.ratio_bands, self.orchestrator.spectral_drift.relative_thresholds["band_ratio"])
+        self.bind_calibration()
+        return True
+
+
+    def load_calibration(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Select Calibration Model", "", "Calibration model (*.npz)")
+        if not path:
+            return
+        try:
+            self.calibration = load_calibration(path)
+        except (OSError, KeyError, ValueError) as e:
+            logging.error(f"Failed to load calibration model: {e}")
+            self.calibration = None
+            return
+        logging.info(f"Calibration model loaded: {self.calibration.observable.describe()}, "
+                     f"degree {self.calibration.degree}, residual {self.calibration.residual_std:.3f} K")
+        self.bind_calibration()
+
+
+    def bind_calibration(self) -> None:
+        """
+        precompute the model's band weights for the connected spectrometer's wavelength axis
+        """
+        if self.calibration is None or self.orchestrator.spectral_axis is None:
+            return
+        try:
+            self.calibration.bind(self.wavelength)
+        except ValueError as e:
+            logging.error(f"Calibration model does not fit this spectrometer: {e}")
+            self.calibration = None
+
+
+    def set_reference_temperature(self, timestamp: float, data: dict) -> None:
+        """
+        connected to the temperature readings: sensor reading shown next to the DLT temperature
+        """
+        sensor = "temperature_A" if self.calibration is None else self.calibration.metadata.get("sensor", "temperature_A")
+        self.reference_temperature = float(data.get(sensor, float("nan")))
+
+
+    def set_band(self, name: str, lower: float, upper: float) -> None:
+        """
+        band integrated live on every frame (nm), kept across reconnects
+        """
+        self.band_definitions[name] = (lower, upper)
+        if self.orchestrator.spectral_axis is not None:
+            self.add_axis_band(name, lower, upper)
+
 
-    def set_integration_time(self, new_value:int):
-        self.spectrometer.integration_time_micros(new_value)
+    def add_axis_band(self, name: str, lower: float, upper: float) -> None:
+        try:
+            self.orchestrator.spectral_axis.add_band(name, lower, upper)
+        except ValueError as e:
+            logging.error(f"Band {name} not available on this spectrometer: {e}")
+
+
+    def remove_band(self, name: str) -> None:
+        self.band_definitions.pop(name, None)
+        if self.orchestrator.spectral_axis is not None:
+            self.orchestrator.spectral_axis.remove_band(name)
+        if self.ratio_bands is not None and name in self.ratio_bands:
+            self.set_ratio_bands(None)
+
+
+    def set_ratio_bands(self, bands: Optional[tuple[str, str]], relative_threshold: float = 0.001) -> None:
+        """
+        track the ratio of two set_band() bands (numerator, denominator) in addition to the centroid;
+        relative_threshold: limit on |drift| / ratio per minute
+        """
+        spectral_axis = self.orchestrator.spectral_axis
+        if spectral_axis is not None:
+            try:
+                spectral_axis.set_ratio(bands)
+            except ValueError as e:
+                # without the ratio in the features the drift window would never fill
+                logging.error(f"Band ratio not tracked: {e}")
+                spectral_axis.set_ratio(None)
+                bands = None
+        self.ratio_bands = bands
+        relative_thresholds = {} if bands is None else {"band_ratio": relative_threshold}
+        spectral_drift = self.orchestrator.spectral_drift
+        self.orchestrator.spectral_drift = SpectralDrift(
+            duration=spectral_drift.duration,
+            thresholds=spectral_drift.thresholds,
+            relative_thresholds=relative_thresholds,
+        )
+
+
+    def set_integration_time(self, new_value: int):
+        if self.spectrometer is None:
+            return
+        spawn(self._set_integration_time(new_value), "set the integration time")
+
+
+    async def _set_integration_time(self, new_value: int) -> None:
+        await self.spectrometer.set_integration_time(new_value)
+        self.spike_rejector.clear() # signal level changes, history no longer comparable
         logging.info(f"Integration Time changed to {new_value} us")
-    
+
+
+    def set_spike_rejection(self, enable: bool) -> None:
+        self.spike_rejector.clear()
+        self.orchestrator.spike_rejector = self.spike_rejector if enable else None
+
+
+    def set_nonlinearity_correction(self, enable: bool) -> None:
+        self.orchestrator.nonlinearity_correction = enable
+
 
     def capture_dark(self):
-        if self.spectrometer is None:
+        if not self.orchestrator.polling("spectrum"):
+            QMessageBox.warning(self, "Warning", "Start the acquisition to capture a dark.")
             return
-        self.dark = self.intensity
-        logging.info(f"Capture current spectrum as dark")
-    
+        spawn(self._capture_dark(), "capture the dark")
+
+
+    async def _capture_dark(self) -> None:
+        self.dark_btn.setEnabled(False)
+        self.dark_label.setText("capturing...")
+        try:
+            await self.orchestrator.capture_dark(self.dark_frames)
+        finally:
+            self.dark_btn.setEnabled(self.spectrometer is not None and not self.orchestrator.running)
+            self.dark_label.setText("none (raw counts)" if self.orchestrator.dark is None
+                                    else f"captured ({self.dark_frames} frames)")
+
 
     def start(self):
         if self.spectrometer is None:
             return
-        if self.polling_thread is None:
-            self.polling_thread = SpectrometerPollingThread(self.spectrometer, interval=self._polling_interval)
-            self.polling_thread.updated.connect(self.update_spectrum)
-            self.polling_thread.start()
+        if not self.orchestrator.polling("spectrum"):
+            self.orchestrator.start("spectrum")
             self.start_btn.setText("Stop")
         else:
-            self.polling_thread.stop()
-            self.polling_thread = None
+            spawn(self.orchestrator.stop("spectrum"), "stop the acquisition")
             self.start_btn.setText("Start")
-    
 
-    def update_spectrum(self, intensity_array):
-        self.intensity = intensity_array
-        intensity_corrected = self.intensity - self.dark
-        self.plot.setData(self.wavelength, intensity_corrected)
-        self.update_wavelength(intensity_corrected)
+
+    @property
+    def acquiring(self) -> bool:
+        return self.orchestrator.polling("spectrum")
+
+
+    def set_stale(self, kind: str, stale: bool) -> None:
+        if kind == "spectrum" and stale:
+            self.peak_wavelength_label.setText("stale")
+            self.mean_wavelength_label.setText("stale")
+
+
+    def update_spectrum(self, intensity_array: np.ndarray):
+        # spikes were replaced, the dark subtracted and non-linearity corrected in the core
+        self.plot.setData(self.wavelength, intensity_array)
+        if self.orchestrator.spike_rejector is not None:
+            self.spikes_label.setText(f"{self.spike_rejector.rejected_pixels} px in "
+                                      f"{self.spike_rejector.rejected_frames} frames")
+        self.update_wavelength(intensity_array)
 
 
     def update_wavelength(self, intensity_array):
-        peak_wavelength = self.wavelength[np.argmax(intensity_array)]
-        mean_wavelength = np.sum(self.wavelength * intensity_array) / np.sum(intensity_array)
-        self.peak_wavelength_label.setText(f"{peak_wavelength:.2f} nm")
-        self.mean_wavelength_label.setText(f"{mean_wavelength:.2f} nm")
-    
+        spectral_axis = self.orchestrator.spectral_axis
+        features = self.orchestrator.features
+        if spectral_axis is None or not features:
+            return
+        self.peak_wavelength_label.setText(f"{features['peak_wavelength']:.2f} nm")
+        self.mean_wavelength_label.setText(f"{features['mean_wavelength']:.2f} nm")
+        if spectral_axis.bands:
+            text = ", ".join(f"{name} {features[name]:.4g}" for name in spectral_axis.bands)
+            if "band_ratio" in features:
+                text += f" (ratio {features['band_ratio']:.5g})"
+            self.bands_label.setText(text)
+        self.spectral_status_label.setText(str(self.is_spectrum_stable))
+        self.update_dlt_temperature(intensity_array)
+
+
+    def update_dlt_temperature(self, intensity_array):
+        if self.calibration is None:
+            return
+        temperature, sigma = self.calibration.predict(intensity_array)
+        self.dlt_temperature = (float(temperature), float(sigma))
+        if not np.isfinite(temperature):
+            self.dlt_temperature_label.setText("out of calibrated range")
+            return
+        text = f"{temperature:.2f} ± {sigma:.2f} K"
+        if np.isfinite(self.reference_temperature):
+            text += f" (sensor {self.reference_temperature:.2f} K, diff {temperature - self.reference_temperature:+.2f} K)"
+        self.dlt_temperature_label.setText(text)
+
 
     def enable_widget(self, enable: bool) -> None:
         self.connect_btn.setEnabled(enable)
@@ -170,58 +404,17 @@ class OceanSpectrometerWidget(QGroupBox):
         self.start_btn.setEnabled(enable)
         self.dark_btn.setEnabled(enable)
 
-    
-    def __del__(self):
-        if not self.spectrometer is None:
-            self.spectrometer.close()
-    
 
     @property
-    def spectrum_dict(self) -> dict:
-        return {"wavelength": self.wavelength, "intensity": self.intensity - self.dark}
-    
+    def dark_corrected(self) -> bool:
+        return self.orchestrator.dark_corrected
 
-    @property
-    def peak_wavelength(self) -> Optional[float]:
-        try:
-            text = self.peak_wavelength_label.text()
-            return float(text[:-len("nm")].strip())
-        except (TypeError, Exception) as e:
-            # logging.error(f"Failed to read peak wavelength for data export: {e}")
-            return None
 
-    
     @property
-    def mean_wavelength(self) -> Optional[float]:
-        try:
-            text = self.mean_wavelength_label.text()
-            return float(text[:-len("nm")].strip())
-        except (TypeError, Exception) as e:
-            # logging.error(f"Failed to read mean wavelength for data export: {e}")
-            return None
-
-
-class SpectrometerPollingThread(QThread):
-    
-    updated = pyqtSignal(np.ndarray)
-
-    def __init__(self, spectrometer, interval, parent=None):
-        super().__init__(parent)
-        self.spectrometer = spectrometer
-        self.interval = interval
-        self._running = True
-
-    
-    def run(self):
-        while self._running:
-            try:
-                intensity_array = self.spectrometer.intensities()
-                self.updated.emit(intensity_array)
-            except Exception as e:
-                logging.error(f"Polling spectrum failed: {e}")
-            time.sleep(self.interval)
+    def nonlinearity_corrected(self) -> bool:
+        return self.orchestrator.nonlinearity_corrected
 
 
-    def stop(self):
-        self._running = False
-        self.wait()
\ No newline at end of file
+    @property
+    def is_spectrum_stable(self) -> bool:
+        return self.orchestrator.spectral_drift.is_stable()
@@ -1,13 +1,11 @@
 from PyQt6.QtWidgets import (
     QGroupBox, QPushButton, QFileDialog, QMessageBox, QVBoxLayout, QFormLayout, QSpinBox
 )
-from PyQt6.QtCore import QTimer
-import os
 import pyqtgraph as pg
 from pathlib import Path
 import logging
 from datetime import datetime
-import csv
+from core.temperature_log import TemperatureLogger
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
@@ -20,11 +18,15 @@ def default_filename() -> str:
 
 
 class TemperatureChartWidget(QGroupBox):
-    def __init__(self, temperature_control_widget, parent=None):
+    """
+    Chart and log of the temperature readings published by the shared orchestrator, one point per record interval
+    """
+    def __init__(self, orchestrator, bridge, parent=None):
         super().__init__("Temperature Chart", parent)
-        self.temperature_control_widget = temperature_control_widget
-        self.record_timer = None
-        self.data_dict = None
+        self.orchestrator = orchestrator
+        self.recording = False
+        self.last_record_time = None # timestamp of the last recorded reading
+        self.logger = None
 
         # UI elements
         self.record_interval_spin = QSpinBox()
@@ -49,6 +51,8 @@ class TemperatureChartWidget(QGroupBox):
         layout.addWidget(self.plot_widget)
         self.setLayout(layout)
 
+        bridge.temperature.connect(self.update_data)
+
 
     def initialize_chart(self):
         self.plot_widget.clear()
@@ -59,62 +63,58 @@ class TemperatureChartWidget(QGroupBox):
         self.plot_Ta = self.plot_widget.plot(self.t_data, self.Ta_data, pen="r", name="Temperature A")
         self.plot_Tb = self.plot_widget.plot(self.t_data, self.Tb_data, pen="b", name="Temperature B")
         self.plot_widget.enableAutoRange()
-    
 
-    def __del__(self):
-        try:
-            self.record_timer.stop()
-        except Exception:
-            pass
-    
 
-    def update_data(self) -> None:
-        try:
-            self.data_dict = self.temperature_control_widget.get_data_dict()
-        except Exception as e:
-            logging.error(f"Failed to load data from controller widget: {e}")
+    def update_data(self, timestamp: float, data: dict) -> None:
+        """
+        connected to the temperature readings; keeps one reading per record interval
+        """
+        if not self.recording:
             return
-        self.update_chart()
-        self.write_data()
-    
+        if self.last_record_time is not None and timestamp - self.last_record_time < self.record_interval_spin.value():
+            return
+        self.last_record_time = timestamp
+        self.update_chart(timestamp, data)
+        self.write_data(timestamp, data)
+
 
-    def update_chart(self) -> None:
+    def update_chart(self, timestamp: float, data: dict) -> None:
         try:
-            timestamp = datetime.fromisoformat(self.data_dict["timestamp"])
-            Ta = self.data_dict["temperature_A"]
-            Tb = self.data_dict["temperature_B"]
             if self.start_timestamp is None:
                 self.start_timestamp = timestamp
-            elapsed_min = (timestamp - self.start_timestamp).total_seconds() / 60.0
+            elapsed_min = (timestamp - self.start_timestamp) / 60.0
             self.t_data.append(elapsed_min)
-            self.Ta_data.append(Ta)
-            self.Tb_data.append(Tb)
+            self.Ta_data.append(data["temperature_A"])
+            self.Tb_data.append(data["temperature_B"])
             self.plot_Ta.setData(self.t_data, self.Ta_data)
             self.plot_Tb.setData(self.t_data, self.Tb_data)
-            # print(self.t_data, self.Ta_data, self.Tb_data)
         except Exception as e:
             logging.error(f"Fail to plot data: {e}")
             return
-    
 
-    def write_data(self) -> None:
+
+    def write_data(self, timestamp: float, data: dict) -> None:
+        # buffered append, written to disk in blocks and exported to csv when recording stops
         try:
-            # write header if file not existing
-            if not os.path.exists(self.csv_path):
-                with open(self.csv_path, "w", newline="", encoding=ENCODING) as f_csv:
-                    writer = csv.DictWriter(f_csv, fieldnames=self.data_dict.keys())
-                    writer.writeheader()
-            # add data
-            with open(self.csv_path, "a", newline="", encoding=ENCODING) as f_csv:
-                writer = csv.DictWriter(f_csv, fieldnames=self.data_dict.keys())
-                writer.writerow(self.data_dict)
+            self.logger.append(**self.orchestrator.log_row(timestamp, data))
         except Exception as e:
-            logging.error(f"Fail to write data to csv: {e}")
+            logging.error(f"Fail to write data to log: {e}")
             return
 
 
+    def close_log(self) -> None:
+        if self.logger is None:
+            return
+        try:
+            self.logger.close()
+            self.logger.export_csv(self.csv_path)
+        except Exception as e:
+            logging.error(f"Fail to export data to csv: {e}")
+        self.logger = None
+
+
     def toggle_record(self):
-        if self.record_timer is None:
+        if not self.recording:
             folder = QFileDialog.getExistingDirectory(self, "Select Folder to Save Data")
             if not folder:
                 QMessageBox.warning(self, "Warning", "No folder selected.")
@@ -122,25 +122,21 @@ class TemperatureChartWidget(QGroupBox):
             folder_path = Path(folder)
             default_name = default_filename()
             self.csv_path = folder_path / f"{default_name}.csv"
-            # plot and write first data
-            self.initialize_chart()
-            self.update_chart()
-            self.write_data()
-            self.record_timer = QTimer(self)
-            self.record_timer.timeout.connect(self.update_data)
             try:
-                self.record_timer.start(int(self.record_interval_spin.value() * 1000)) # sec -> millisec
-            except TypeError as e:
-                logging.error(f"Failed to start timer: {e}")
-                self.record_timer = None
+                self.logger = TemperatureLogger(folder_path / default_name)
+            except OSError as e:
+                QMessageBox.critical(self, "Error", f"Failed to create log folder:\n{e}")
                 return
+            self.initialize_chart()
+            self.last_record_time = None
+            self.recording = True # the next reading is the first point
             self.record_btn.setText("Stop Record")
             QMessageBox.information(self, "Recording Start", f"save path: \n{self.csv_path}\nRecording start")
             logging.info("Data recording started")
         else:
-            self.record_timer.stop()
-            self.record_timer = None
+            self.recording = False
             self.start_timestamp = None
+            self.close_log()
             QMessageBox.information(self, "Recording Stop", f"save path: \n{self.csv_path}\nRecording stop")
             logging.info("Data recording stopped")
-            self.record_btn.setText("Start Record")
\ No newline at end of file
+            self.record_btn.setText("Start Record")